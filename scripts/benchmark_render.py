@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from rohbau3d.data.synthetic import write_synthetic_scene
+from rohbau3d.misc.tracing import record_stages
+from rohbau3d.render.projection_renderer import (
+    RenderOptions,
+    _close_writer,
+    _render_one_scene,
+    _resolve_engine,
+)
+from rohbau3d.render.writer import ImageCodec
+
+ROHBAU3D_HEADER = """
+    ____        __    __               _____ ____     __  __      __
+   / __ \\____  / /_  / /_  ____ ___  _|__  // __ \\   / / / /_  __/ /_
+  / /_/ / __ \\/ __ \\/ __ \\/ __ `/ / / //_ </ / / /  / /_/ / / / / __ \
+ / _, _/ /_/ / / / / /_/ / /_/ / /_/ /__/ / /_/ /  / __  / /_/ / /_/ /
+/_/ |_|\\____/_/ /_/_.___/\\__,_/\\__,_/____/_____/  /_/ /_/\\__,_/_.___/
+>>> Rohbau3D Hub <<<
+\n"""
+
+
+_STAGES = ("load", "project", "zbuffer", "colorize", "maps", "encode", "write")
+_WARMUP_POINTS = 20_000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the projection renderer stage by stage on synthetic scans.")
+    parser.add_argument(
+        "--points",
+        type=int,
+        nargs="+",
+        default=[1_000_000, 10_000_000],
+        help="Point counts of the synthetic scenes.")
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        default=["2048x1024", "4096x2048"],
+        help="Panorama resolutions as WIDTHxHEIGHT.")
+    parser.add_argument(
+        "--cube-size",
+        type=int,
+        default=None,
+        help="Cube map face size (default: half the panorama height).")
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=["numpy", "numba"],
+        help="Render engines to compare.")
+    parser.add_argument(
+        "--features",
+        nargs="+",
+        default=["color", "depth", "intensity", "normal", "class", "instance"],
+        help="Features to render.")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Stream coord in blocks of this many points (render.chunk_size).")
+    parser.add_argument(
+        "--image-format",
+        default="png",
+        choices=["png", "webp", "npy"],
+        help="Image format of the rendered features.")
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=0,
+        help="Background image writers; 0 writes synchronously, so that stage times do not overlap.")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per case; the fastest time of every stage is reported.")
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=None,
+        help="Directory for the synthetic scenes and renderings (default: a temporary directory). "
+             "Scenes in a given workdir are reused by later runs.")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed of the synthetic scenes.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Write the results to this JSON file; it can serve as a later --baseline.")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        help="Results of an earlier run; exit with status 1 if a stage got slower.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown per stage against the baseline.")
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.05,
+        help="Ignore slowdowns smaller than this many seconds (timer noise on short stages).")
+    return parser.parse_args()
+
+
+def _parse_resolution(text: str) -> tuple[int, int]:
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def _case_key(case: dict) -> str:
+    key = (f"{case['points']}pts/{case['width']}x{case['height']}"
+           f"/cube{case['cube_size']}/{case['engine']}")
+    if case["chunk_size"] is not None:
+        key += f"/chunk{case['chunk_size']}"
+    return key
+
+
+def _synthetic_scene(data_root: Path, index: int, points: int, seed: int) -> Path:
+    scene_dir = data_root / "rohbau3d" / "site_99" / f"scene_99{index:03d}"
+    coord = scene_dir / "coord.npy"
+    if coord.exists() and np.load(coord, mmap_mode="r").shape[0] == points:
+        return scene_dir
+    return write_synthetic_scene(scene_dir, points, seed=seed + index)
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_case(case: dict, scene_dir: str, warmup_dir: str, out_dir: str,
+              features: list, image_format: str, writers: int, repeat: int) -> dict:
+    """Runs in a fresh process, so that the peak RSS belongs to this case."""
+    options = RenderOptions(
+        output_root=Path(out_dir),
+        render_pano=True,
+        render_cube=True,
+        pano_width=case["width"],
+        pano_height=case["height"],
+        cube_size=case["cube_size"],
+        selected_features=tuple(features),
+        chunk_size=case["chunk_size"],
+        engine=_resolve_engine(case["engine"]),
+        image_codecs={"default": ImageCodec(format=image_format)},
+        image_writers=writers,
+        force=True,
+    )
+
+    # compiles the numba kernels and warms up imports and caches
+    _render_one_scene(Path(warmup_dir), options)
+
+    runs = []
+    for _ in range(repeat):
+        with record_stages() as times:
+            start = time.perf_counter()
+            _render_one_scene(Path(scene_dir), options)
+            total = time.perf_counter() - start
+        stages = {stage: entry["seconds"] for stage, entry in times.as_dict().items()}
+        runs.append({"total": total, **stages})
+
+    _close_writer()
+    best = {name: min(run.get(name, 0.0) for run in runs) for name in runs[0]}
+    return {
+        **case,
+        "engine": options.engine,
+        "seconds": best,
+        "points_per_second": case["points"] / best["total"],
+        "peak_rss": _peak_rss(),
+    }
+
+
+def _log_result(log: logging.Logger, result: dict) -> None:
+    seconds = result["seconds"]
+    log.info(
+        "%-40s total %7.3fs  %6.2f Mpts/s  peak RSS %6.2f GB",
+        _case_key(result),
+        seconds["total"],
+        result["points_per_second"] / 1e6,
+        result["peak_rss"] / 1e9,
+    )
+    log.info("    %s", "  ".join(
+        f"{stage} {seconds[stage]:.3f}s" for stage in _STAGES if stage in seconds))
+
+
+def _compare(
+        log: logging.Logger,
+        results: list,
+        baseline: dict,
+        threshold: float,
+        min_seconds: float) -> int:
+    base_cases = {_case_key(case): case for case in baseline.get("cases", [])}
+    regressions = 0
+
+    for result in results:
+        key = _case_key(result)
+        base = base_cases.get(key)
+        if base is None:
+            log.warning("No baseline for case %s.", key)
+            continue
+
+        for stage, seconds in result["seconds"].items():
+            base_seconds = base["seconds"].get(stage)
+            if base_seconds is None:
+                continue
+            slower = seconds - base_seconds
+            if slower > min_seconds and seconds > base_seconds * (1.0 + threshold):
+                regressions += 1
+                log.error(
+                    "Regression in %s, stage %s: %.3fs vs. %.3fs baseline (+%.0f%%).",
+                    key, stage, seconds, base_seconds, 100.0 * slower / base_seconds)
+
+    if regressions:
+        log.error("%d stage regressions beyond %.0f%%.", regressions, 100.0 * threshold)
+    else:
+        log.info("No stage slower than %.0f%% against the baseline.", 100.0 * threshold)
+    return regressions
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s")
+    log = logging.getLogger(__name__)
+    log.info(f"\n{ROHBAU3D_HEADER}")
+    log.info("/" * 50)
+    log.info("/// Renderer benchmark ...")
+
+    tmp = None
+    if args.workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="rohbau3d_bench_")
+        workdir = Path(tmp.name)
+    else:
+        workdir = args.workdir.expanduser().resolve()
+
+    try:
+        data_root = workdir / "data"
+        warmup_dir = _synthetic_scene(data_root, 999, _WARMUP_POINTS, args.seed)
+
+        scenes = {}
+        for i, points in enumerate(args.points):
+            start = time.perf_counter()
+            scenes[points] = _synthetic_scene(data_root, i, points, args.seed)
+            log.info("Synthetic scene with %d points ready (%.1fs).",
+                     points, time.perf_counter() - start)
+
+        cases = [
+            {
+                "points": points,
+                "width": width,
+                "height": height,
+                "cube_size": args.cube_size or height // 2,
+                "engine": engine,
+                "chunk_size": args.chunk_size,
+            }
+            for points in args.points
+            for width, height in map(_parse_resolution, args.resolutions)
+            for engine in args.engines
+        ]
+
+        results = []
+        spawn = multiprocessing.get_context("spawn")
+        for case in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                result = executor.submit(
+                    _run_case,
+                    case,
+                    str(scenes[case["points"]]),
+                    str(warmup_dir),
+                    str(workdir / "out"),
+                    args.features,
+                    args.image_format,
+                    args.writers,
+                    args.repeat,
+                ).result()
+            results.append(result)
+            _log_result(log, result)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "features": args.features,
+        "image_format": args.image_format,
+        "writers": args.writers,
+        "repeat": args.repeat,
+        "cases": results,
+    }
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        log.info("Results written to %s", args.output)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if _compare(log, results, baseline, args.threshold, args.min_seconds):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
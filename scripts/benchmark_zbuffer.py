@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from rohbau3d.render.projection_renderer import (
+    _CUBE_FACES,
+    _best_point_per_pixel,
+    _project_cube,
+    _project_equirectangular,
+)
+
+ROHBAU3D_HEADER = """
+    ____        __    __               _____ ____     __  __      __
+   / __ \\____  / /_  / /_  ____ ___  _|__  // __ \\   / / / /_  __/ /_
+  / /_/ / __ \\/ __ \\/ __ \\/ __ `/ / / //_ </ / / /  / /_/ / / / / __ \
+ / _, _/ /_/ / / / / /_/ / /_/ / /_/ /__/ / /_/ /  / __  / /_/ / /_/ /
+/_/ |_|\\____/_/ /_/_.___/\\__,_/\\__,_/____/_____/  /_/ /_/\\__,_/_.___/
+>>> Rohbau3D Hub <<<
+\n"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check the scatter-min z-buffer against the argsort reference and benchmark both.")
+    parser.add_argument(
+        "--points",
+        type=int,
+        default=10_000_000,
+        help="Number of synthetic points.")
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=4096,
+        help="Panorama width.")
+    parser.add_argument(
+        "--height",
+        type=int,
+        default=2048,
+        help="Panorama height.")
+    parser.add_argument(
+        "--cube-size",
+        type=int,
+        default=1024,
+        help="Cube map face size.")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed of the synthetic scene.")
+    return parser.parse_args()
+
+
+def _reference_best_point_per_pixel(
+        linear_pix: np.ndarray,
+        depth: np.ndarray,
+        num_pixels: int) -> np.ndarray:
+    """The previous O(N log N) argsort + unique implementation."""
+    best_point = np.full((num_pixels,), -1, dtype=np.int64)
+
+    order = np.argsort(depth, kind="stable")
+    sorted_pix = linear_pix[order]
+    _, first_pos = np.unique(sorted_pix, return_index=True)
+
+    selected = order[first_pos]
+    best_point[linear_pix[selected]] = selected
+    return best_point
+
+
+def _reference_cube(face_idx, u, v, depth, size) -> np.ndarray:
+    """The previous per-face cube map z-buffer on masked copies."""
+    faces = []
+    for face_i in range(len(_CUBE_FACES)):
+        mask = face_idx == face_i
+        local_point_ids = np.where(mask)[0]
+        best_local = _reference_best_point_per_pixel(
+            v[mask] * size + u[mask], depth[mask], size * size)
+
+        best_global = np.full((size * size,), -1, dtype=np.int64)
+        valid = best_local >= 0
+        best_global[valid] = local_point_ids[best_local[valid]]
+        faces.append(best_global)
+    return np.concatenate(faces)
+
+
+def _synthetic_coord(n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    direction = rng.normal(size=(n, 3))
+    direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+    return (direction * rng.uniform(0.5, 40.0, size=(n, 1))).astype(np.float32)
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s")
+    log = logging.getLogger(__name__)
+    log.info(f"\n{ROHBAU3D_HEADER}")
+    log.info("/" * 50)
+    log.info("/// Z-buffer equivalence check and benchmark ...")
+
+    coord = _synthetic_coord(args.points, args.seed)
+    ok = True
+
+    u, v, depth = _project_equirectangular(coord, args.width, args.height)
+    linear = v * args.width + u
+    num_pixels = args.width * args.height
+
+    ref, t_ref = _timed(_reference_best_point_per_pixel, linear, depth, num_pixels)
+    new, t_new = _timed(_best_point_per_pixel, linear, depth, num_pixels)
+    same = np.array_equal(ref, new)
+    ok &= same
+    log.info(
+        "Panorama %dx%d, %d points: argsort %.3fs, scatter-min %.3fs (%.1fx), identical=%s",
+        args.width, args.height, args.points, t_ref, t_new, t_ref / t_new, same)
+
+    size = args.cube_size
+    face_idx, u, v, depth = _project_cube(coord, size)
+
+    ref, t_ref = _timed(_reference_cube, face_idx, u, v, depth, size)
+
+    def _single_pass():
+        key = face_idx.astype(np.int64) * size * size + v * size + u
+        return _best_point_per_pixel(key, depth, len(_CUBE_FACES) * size * size)
+
+    new, t_new = _timed(_single_pass)
+    same = np.array_equal(ref, new)
+    ok &= same
+    log.info(
+        "Cube map 6x%dx%d, %d points: per-face argsort %.3fs, single-pass scatter-min %.3fs (%.1fx), identical=%s",
+        size, size, args.points, t_ref, t_new, t_ref / t_new, same)
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from rohbau3d.data.synthetic import write_synthetic_scene
+
+ROHBAU3D_HEADER = """
+    ____        __    __               _____ ____     __  __      __
+   / __ \\____  / /_  / /_  ____ ___  _|__  // __ \\   / / / /_  __/ /_
+  / /_/ / __ \\/ __ \\/ __ \\/ __ `/ / / //_ </ / / /  / /_/ / / / / __ \
+ / _, _/ /_/ / / / / /_/ / /_/ / /_/ /__/ / /_/ /  / __  / /_/ / /_/ /
+/_/ |_|\\____/_/ /_/_.___/\\__,_/\\__,_/____/_____/  /_/ /_/\\__,_/_.___/
+>>> Rohbau3D Hub <<<
+\n"""
+
+
+_FINISHED_RE = re.compile(r"Rendering finished: (\d+)/\d+ scenes completed, (\d+) failed")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Start several --claim nodes on a synthetic tree and check that "
+                    "every scene is rendered exactly once.")
+    parser.add_argument(
+        "--nodes",
+        type=int,
+        default=3,
+        help="Number of node processes.")
+    parser.add_argument(
+        "--scenes",
+        type=int,
+        default=6,
+        help="Number of synthetic scenes; one more scene is broken and must fail once.")
+    parser.add_argument(
+        "--points",
+        type=int,
+        default=200_000,
+        help="Points per synthetic scene.")
+    parser.add_argument(
+        "--stagger",
+        type=float,
+        default=1.0,
+        help="Seconds between the starts of the nodes.")
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=None,
+        help="Directory for the data, outputs and node logs (default: a temporary directory).")
+    return parser.parse_args()
+
+
+def _write_config(workdir: Path) -> Path:
+    cfg = {
+        "data": {"root": str(workdir / "data")},
+        "output": {"root": str(workdir / "out")},
+        "selection": {"site": None, "scene": None},
+        "render": {
+            "panorama": True,
+            "cube_map": False,
+            "features": ["color", "depth"],
+            "engine": "numpy",
+            "on_error": "skip",
+            "parallel": {"backend": "serial", "workers": 1},
+        },
+        "panorama": {"width": 512, "height": 256},
+        "cube_map": {"size": 128},
+    }
+    path = workdir / "check_claims.yaml"
+    with open(path, "w") as f:
+        yaml.safe_dump(cfg, f, sort_keys=False)
+    return path
+
+
+def _start_node(config: Path, workdir: Path, index: int) -> subprocess.Popen:
+    log_file = open(workdir / f"node{index}.log", "w")
+    return subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name("render_projections.py")),
+         "--config", str(config), "--claim", "--force", "--node", f"node{index}"],
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s")
+    log = logging.getLogger(__name__)
+    log.info(f"\n{ROHBAU3D_HEADER}")
+    log.info("/" * 50)
+    log.info("/// Scene claiming check ...")
+
+    tmp = None
+    if args.workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="rohbau3d_claims_")
+        workdir = Path(tmp.name)
+    else:
+        workdir = args.workdir.expanduser().resolve()
+        workdir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        site_dir = workdir / "data" / "site_00"
+        scenes = [
+            write_synthetic_scene(site_dir / f"scene_{i:05d}", args.points, seed=i)
+            for i in range(args.scenes)
+        ]
+        broken = site_dir / f"scene_{args.scenes:05d}"
+        broken.mkdir(parents=True, exist_ok=True)
+        (broken / "coord.npy").write_bytes(b"not a npy file")
+        config = _write_config(workdir)
+
+        nodes = []
+        for i in range(args.nodes):
+            if i:
+                time.sleep(args.stagger)
+            nodes.append(_start_node(config, workdir, i))
+        codes = [node.wait() for node in nodes]
+
+        completed = failed = 0
+        for i, code in enumerate(codes):
+            text = (workdir / f"node{i}.log").read_text()
+            m = _FINISHED_RE.search(text)
+            if m is None:
+                log.error("node%d exited with %d without finishing:\n%s", i, code, text)
+                return 1
+            log.info("node%d: %s scenes rendered, %s failed.", i, m.group(1), m.group(2))
+            completed += int(m.group(1))
+            failed += int(m.group(2))
+
+        missing = [p.name for p in scenes if not (workdir / "out" / p.parent.name / p.name).is_dir()]
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    ok = completed == len(scenes) and failed == 1 and not missing
+    if ok:
+        log.info("Every scene was rendered exactly once by %d nodes.", args.nodes)
+    else:
+        log.error(
+            "Expected %d renders and 1 failure, got %d renders and %d failures; "
+            "scenes without output: %s.",
+            len(scenes), completed, failed, ", ".join(missing) or "none")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
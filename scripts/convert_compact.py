@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from rohbau3d.data.compact import COMPACT_FEATURES, CompactSettings, convert_scene
+from rohbau3d.data.scene import discover_scenes
+
+ROHBAU3D_HEADER = """
+    ____        __    __               _____ ____     __  __      __
+   / __ \\____  / /_  / /_  ____ ___  _|__  // __ \\   / / / /_  __/ /_
+  / /_/ / __ \\/ __ \\/ __ \\/ __ `/ / / //_ </ / / /  / /_/ / / / / __ \
+ / _, _/ /_/ / / / / /_/ / /_/ / /_/ /__/ / /_/ /  / __  / /_/ / /_/ /
+/_/ |_|\\____/_/ /_/_.___/\\__,_/\\__,_/____/_____/  /_/ /_/\\__,_/_.___/
+>>> Rohbau3D Hub <<<
+\n"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Convert Rohbau3D point features to the quantized compact storage format.")
+    parser.add_argument(
+        "--data",
+        type=Path,
+        default=Path("data/extract"),
+        help="Path to the extracted dataset root.")
+    parser.add_argument(
+        "--features",
+        nargs="+",
+        default=list(COMPACT_FEATURES),
+        help="Features to convert: coord, normal, intensity.")
+    parser.add_argument(
+        "--coord-step",
+        type=float,
+        default=0.001,
+        help="Coordinate quantization step in metres.")
+    parser.add_argument(
+        "--normal-bits",
+        type=int,
+        default=16,
+        choices=(8, 16),
+        help="Bits per oct-encoded normal component.")
+    parser.add_argument(
+        "--intensity-bits",
+        type=int,
+        default=16,
+        choices=(8, 16),
+        help="Bits of the intensity encoding.")
+    parser.add_argument(
+        "--remove-source",
+        action="store_true",
+        help="Delete the float32 source files after a successful conversion.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of parallel workers.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s")
+    log = logging.getLogger(__name__)
+    log.info(f"\n{ROHBAU3D_HEADER}")
+    log.info("/" * 50)
+    log.info("/// Start compact conversion ...")
+
+    settings = CompactSettings(
+        coord_step=args.coord_step,
+        normal_bits=args.normal_bits,
+        intensity_bits=args.intensity_bits,
+    )
+
+    scenes = discover_scenes(args.data)
+    log.info("Converting %d scenes with %d workers.", len(scenes), args.workers)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        futures = {
+            executor.submit(
+                convert_scene,
+                scene_dir,
+                settings,
+                features=tuple(args.features),
+                remove_source=args.remove_source,
+            ): scene_dir
+            for scene_dir in scenes
+        }
+
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception:
+                failed += 1
+                log.exception("Conversion failed for scene: %s", futures[future])
+
+    log.info("Done. %d/%d scenes converted.", len(scenes) - failed, len(scenes))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
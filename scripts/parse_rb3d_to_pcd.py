@@ -8,6 +8,7 @@ from typing import Optional, Tuple
 
 import numpy as np
 from rohbau3d.core.io import save_feature_dict_pcd, pack_rgb
+from rohbau3d.data.scene import load_feature
 from rohbau3d.misc._logging import setup_logging
 
 
@@ -16,12 +17,12 @@ from rohbau3d.misc._logging import setup_logging
 # -----------------------------
 
 def _parse_scene_worker(
-        args: Tuple[int, Path, Path, Path]) -> Tuple[int, str, bool, str]:
+        args: Tuple[int, Path, Path, Path, bool]) -> Tuple[int, str, bool, str]:
     """Parse a single scene directory into a .pcd file.
 
     Returns (idx, scene_name, success, message)
     """
-    idx, scene_dir, source_dir, target_dir = args
+    idx, scene_dir, source_dir, target_dir, subsampled = args
 
     try:
         # Ensure paths
@@ -37,21 +38,17 @@ def _parse_scene_worker(
         out_dir.mkdir(parents=True, exist_ok=True)
         target_path = out_dir / f"{scene_name}.pcd"
 
-        # Mandatory coord
-        coord_path = source_path / "coord.npy"
-        if not coord_path.exists():
+        # Mandatory coord (raw or compact storage)
+        coord = load_feature(source_path, "coord", subsampled=subsampled)
+        if coord is None:
             return idx, scene_name, False, f"No coord.npy in {source_path}"
-        coord = np.load(coord_path)
 
         # Optional features
         def _try_load(name: str) -> Optional[np.ndarray]:
-            p = source_path / f"{name}.npy"
-            if p.exists():
-                try:
-                    return np.load(p)
-                except Exception as e:
-                    return None
-            return None
+            try:
+                return load_feature(source_path, name, subsampled=subsampled)
+            except Exception as e:
+                return None
 
         color = _try_load("color")
         intensity = _try_load("intensity")
@@ -116,6 +113,8 @@ def main():
         r"D:\PunktWolken\rohbau3d_v2\basic ai\20250916_datatransfer\rohbau3d")
     # max_workers = max(1, (os.cpu_count() or 4) - 1)  # leave one core free
     max_workers = 2
+    # export only the points in sample_idx.npy
+    subsampled = False
     # -------------
 
     log.info("/" * 50)
@@ -124,6 +123,7 @@ def main():
     log.info(f"Source: {source_dir}")
     log.info(f"Target: {target_dir}")
     log.info(f"Workers: {max_workers}")
+    log.info(f"Subsampled: {subsampled}")
 
     # Find sites and scenes
     site_list = [p for p in source_dir.iterdir() if p.is_dir()
@@ -142,7 +142,7 @@ def main():
         return
 
     # Build task args
-    tasks = [(i, scenes_list[i], source_dir, target_dir)
+    tasks = [(i, scenes_list[i], source_dir, target_dir, subsampled)
              for i in range(num_scenes)]
 
     # Submit to process pool
@@ -5,6 +5,7 @@ import logging
 from pathlib import Path
 
 from rohbau3d.render import render_from_config
+from rohbau3d.render.sharding import parse_shard
 
 ROHBAU3D_HEADER = """
     ____        __    __               _____ ____     __  __      __
@@ -25,6 +26,40 @@ def parse_args() -> argparse.Namespace:
         default=Path("config/render_projections.yaml"),
         help="Path to renderer YAML configuration.",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Render all selected scenes again, even if their outputs are up to date.",
+    )
+    parser.add_argument(
+        "--failed-only",
+        action="store_true",
+        help="Render only the scenes listed in <output root>/render_failures*.json.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="Render only the I-th of N equal parts of the selection (0 <= I < N), one per node.",
+    )
+    parser.add_argument(
+        "--claim",
+        action="store_true",
+        help="Claim scenes one at a time through lease files in the output root, "
+             "so that any number of nodes can share the selection.",
+    )
+    parser.add_argument(
+        "--node",
+        default=None,
+        help="Name of this node in leases and run files. Default=<hostname>.",
+    )
+    parser.add_argument(
+        "--run-id",
+        default=None,
+        help="With --claim: nodes with the same run id render every scene once. "
+             "Default=render.claim.run_id, else derived from the config file and options.",
+    )
     return parser.parse_args()
 
 
@@ -38,9 +73,17 @@ def main() -> int:
     log.info("/" * 50)
     log.info("/// Start rendering projections ...")
 
-    render_from_config(args.config)
+    failed = render_from_config(
+        args.config,
+        force=args.force,
+        failed_only=args.failed_only,
+        shard=args.shard,
+        claim=args.claim,
+        node=args.node,
+        run_id=args.run_id,
+    )
 
-    return 0
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+from pathlib import Path
+
+from rohbau3d.misc.config import load_config
+from rohbau3d.render.service import RenderService, make_server
+
+ROHBAU3D_HEADER = """
+    ____        __    __               _____ ____     __  __      __
+   / __ \\____  / /_  / /_  ____ ___  _|__  // __ \\   / / / /_  __/ /_
+  / /_/ / __ \\/ __ \\/ __ \\/ __ `/ / / //_ </ / / /  / /_/ / / / / __ \
+ / _, _/ /_/ / / / / /_/ / /_/ / /_/ /__/ / /_/ /  / __  / /_/ / /_/ /
+/_/ |_|\\____/_/ /_/_.___/\\__,_/\\__,_/____/_____/  /_/ /_/\\__,_/_.___/
+>>> Rohbau3D Hub <<<
+\n"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve panorama, cube map and perspective images of Rohbau3D scenes on demand.")
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=Path("config/render_projections.yaml"),
+        help="Path to renderer YAML configuration; see its service section.",
+    )
+    parser.add_argument(
+        "--host",
+        default=None,
+        help="Address to listen on (overrides service.host).",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="Port to listen on (overrides service.port).",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Listen on this Unix socket instead of host:port (overrides service.socket).",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s")
+    log = logging.getLogger(__name__)
+    log.info(f"\n{ROHBAU3D_HEADER}")
+    log.info("/" * 50)
+    log.info("/// Start render service ...")
+
+    cfg = load_config(args.config)
+    service_cfg = getattr(cfg, "service", None)
+
+    def _get(key, default):
+        value = getattr(service_cfg, key, None) if service_cfg is not None else None
+        return default if value is None else value
+
+    service = RenderService.from_config(cfg)
+    service.warm_up()
+    service.preload(
+        _get("preload", []), features=tuple(getattr(cfg.render, "features", ())))
+
+    socket_path = args.socket or _get("socket", None)
+    server = make_server(
+        service,
+        host=args.host or _get("host", "127.0.0.1"),
+        port=args.port or int(_get("port", 8765)),
+        socket_path=socket_path,
+    )
+
+    log.info("  Input Directory:    %s", str(service.data_root))
+    log.info("  Engine:             %s", service.engine)
+    log.info("  Workers:            %d", service.workers)
+    log.info("  Scene Cache:        %.2f GB", service.scenes.max_bytes / 1e9)
+    log.info("  Projection Cache:   %.2f GB", service.projections.max_bytes / 1e9)
+    log.info("  Image Cache:        %.2f GB", service.images.max_bytes / 1e9)
+    if socket_path is not None:
+        log.info("Serving on unix socket %s", socket_path)
+    else:
+        host, port = server.server_address[:2]
+        log.info("Serving on http://%s:%d/render", host, port)
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Shutting down.")
+    finally:
+        server.server_close()
+        if socket_path is not None:
+            Path(socket_path).expanduser().unlink(missing_ok=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
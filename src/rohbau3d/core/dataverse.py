@@ -8,6 +8,7 @@ from pooch import DOIDownloader
 from time import time
 
 from rohbau3d.misc.helper import read_json_dict
+from rohbau3d.misc.metrics import JobMetrics, MetricsExporter
 
 import logging
 log = logging.getLogger(__name__)
@@ -79,41 +80,62 @@ class Dataverse:
 
         downloader = DOIDownloader(progressbar=True)
 
+        metrics = JobMetrics(
+            "download",
+            total=sum(len(files) for sites in self.data_selection.values()
+                      for files in sites.values()),
+            unit="files",
+        )
+        exporter = MetricsExporter.from_config(self.cfg.get("metrics"), metrics)
+
         start_time = time()
-        for feature, sites in self.data_selection.items():
-            for site_id, files in sites.items():
-                for file_name in files:
-                    # Construct the full URL for the file
-                    url = f"{self.base_url}/{file_name}"
-
-                    output_file = join(self.output_dir, feature, file_name)
-
-                    if exists(output_file,):
-                        log.info(
-                            f"File {file_name} already exists, skipping download.")
-                        self.stats["num_files_skipped"] += 1
-                        self.stats["skipped_files"] = self.stats.get(
-                            "skipped_files", []) + [file_name]
-                        continue
-
-                    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-                    # Download the file
-                    try:
-                        log.info(
-                            f"🍕 Downloading {file_name} from {url} to {output_file}")
-                        downloader(
-                            url=url, output_file=output_file, pooch=None)
-                        self.stats["num_files_downloaded"] += 1
-                    except Exception as e:
-                        log.error(f"Failed to download {file_name}: {e}")
-                        self.stats["corrupted_files"].append(file_name)
+        exporter.start()
+        try:
+            for feature, sites in self.data_selection.items():
+                for site_id, files in sites.items():
+                    for file_name in files:
+                        self._download_file(
+                            downloader, feature, file_name, metrics)
+        finally:
+            exporter.close()
 
         self.stats["total_time"] = time() - start_time
 
         log.info("/// Download completed.\n")
         return self.stats
 
+    def _download_file(self, downloader, feature, file_name, metrics):
+        # Construct the full URL for the file
+        url = f"{self.base_url}/{file_name}"
+
+        output_file = join(self.output_dir, feature, file_name)
+
+        if exists(output_file,):
+            log.info(
+                f"File {file_name} already exists, skipping download.")
+            self.stats["num_files_skipped"] += 1
+            self.stats["skipped_files"] = self.stats.get(
+                "skipped_files", []) + [file_name]
+            metrics.skip()
+            return
+
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+        # Download the file
+        slot = metrics.start()
+        try:
+            log.info(
+                f"🍕 Downloading {file_name} from {url} to {output_file}")
+            downloader(
+                url=url, output_file=output_file, pooch=None)
+            self.stats["num_files_downloaded"] += 1
+            metrics.finish(
+                slot, ok=True, bytes_written=os.path.getsize(output_file))
+        except Exception as e:
+            log.error(f"Failed to download {file_name}: {e}")
+            self.stats["corrupted_files"].append(file_name)
+            metrics.finish(slot, ok=False)
+
     def _get_data_selection(self):
         database = self.feature_index
 
@@ -0,0 +1,36 @@
+from rohbau3d.data.cache import CacheStats, SceneCache
+from rohbau3d.data.compact import CompactFeature, CompactSettings, convert_scene
+from rohbau3d.data.loader import LoaderStats, PointBatchLoader, read_data_split
+from rohbau3d.data.subsample import SubsampledFeature, gather_chunked
+from rohbau3d.data.synthetic import write_synthetic_scene
+from rohbau3d.data.upsample import upsample_predictions, upsample_scene
+from rohbau3d.data.scene import (
+    SCENE_FEATURES,
+    discover_scenes,
+    load_feature,
+    num_points,
+    open_feature,
+    resolve_data_root,
+)
+
+__all__ = [
+    "CacheStats",
+    "CompactFeature",
+    "CompactSettings",
+    "LoaderStats",
+    "PointBatchLoader",
+    "SCENE_FEATURES",
+    "SceneCache",
+    "SubsampledFeature",
+    "convert_scene",
+    "discover_scenes",
+    "gather_chunked",
+    "load_feature",
+    "num_points",
+    "open_feature",
+    "read_data_split",
+    "resolve_data_root",
+    "upsample_predictions",
+    "upsample_scene",
+    "write_synthetic_scene",
+]
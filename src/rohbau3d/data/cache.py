@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import zstandard as zstd
+
+from rohbau3d.data.scene import load_feature
+
+_Key = Tuple[str, str]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    compressed_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    compressed_evictions: int = 0
+    bytes: int = 0
+    compressed_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.compressed_hits + self.misses
+        return (self.hits + self.compressed_hits) / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+@dataclass(frozen=True)
+class _Compressed:
+    blob: bytes
+    dtype: str
+    shape: Tuple[int, ...]
+
+
+class SceneCache:
+    """LRU cache of per-scene feature arrays, bounded by a byte budget.
+
+    Arrays evicted from the primary tier can be kept zstd-compressed in a
+    second in-memory tier (``compressed_max_bytes > 0``) before they are
+    dropped completely. Cached arrays are shared between callers and are
+    therefore returned read-only. (De)compression runs outside the lock, so
+    a thread that hits the primary tier never waits for it.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        *,
+        compressed_max_bytes: int = 0,
+        compression_level: int = 3,
+    ) -> None:
+        if max_bytes < 0 or compressed_max_bytes < 0:
+            raise ValueError("Cache budgets must be >= 0.")
+
+        self.max_bytes = int(max_bytes)
+        self.compressed_max_bytes = int(compressed_max_bytes)
+        self.stats = CacheStats()
+
+        self._entries: OrderedDict[_Key, np.ndarray] = OrderedDict()
+        self._compressed: OrderedDict[_Key, _Compressed] = OrderedDict()
+        # evicted arrays whose compression is still running
+        self._demoting: Dict[_Key, np.ndarray] = {}
+        self.compression_level = int(compression_level)
+        self._lock = threading.Lock()
+        # zstd contexts must not be shared between threads
+        self._local = threading.local()
+
+    def _codec(self) -> Tuple[zstd.ZstdCompressor, zstd.ZstdDecompressor]:
+        local = self._local
+        if not hasattr(local, "compressor"):
+            local.compressor = zstd.ZstdCompressor(level=self.compression_level)
+            local.decompressor = zstd.ZstdDecompressor()
+        return local.compressor, local.decompressor
+
+    @staticmethod
+    def _key(scene_dir: str | Path, feature: str, subsampled: bool = False) -> _Key:
+        return os.path.abspath(scene_dir), f"{feature}@sample_idx" if subsampled else feature
+
+    def __contains__(self, key: Tuple[str | Path, str]) -> bool:
+        k = self._key(*key)
+        with self._lock:
+            return k in self._entries or k in self._demoting or k in self._compressed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(
+            self,
+            scene_dir: str | Path,
+            feature: str,
+            *,
+            subsampled: bool = False) -> np.ndarray | None:
+        """Return a feature array of a scene, loading it on a miss."""
+        key = self._key(scene_dir, feature, subsampled)
+        packed = None
+
+        with self._lock:
+            arr = self._entries.get(key)
+            if arr is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return arr
+
+            arr = self._demoting.pop(key, None)
+            if arr is not None:
+                self.stats.hits += 1
+                evicted = self._insert(key, arr)
+            else:
+                # stays in the compressed tier until the decompressed copy
+                # is inserted, so concurrent lookups do not go to disk
+                packed = self._compressed.get(key)
+                if packed is not None:
+                    self.stats.compressed_hits += 1
+                else:
+                    self.stats.misses += 1
+
+        if arr is not None:
+            self._demote(evicted)
+            return arr
+
+        # decompression and disk reads happen outside the lock
+        if packed is not None:
+            arr = np.frombuffer(
+                self._codec()[1].decompress(packed.blob),
+                dtype=np.dtype(packed.dtype),
+            ).reshape(packed.shape)
+        else:
+            arr = load_feature(key[0], feature, subsampled=subsampled)
+            if arr is None:
+                return None
+            arr.flags.writeable = False
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                # loaded by another thread meanwhile
+                return cached
+            evicted = self._insert(key, arr)
+        self._demote(evicted)
+        return arr
+
+    def discard(self, scene_dir: str | Path) -> None:
+        """Drop the cached arrays of a scene, e.g. after its files changed."""
+        scene = os.path.abspath(scene_dir)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == scene]:
+                self.stats.bytes -= self._entries.pop(key).nbytes
+            for key in [k for k in self._compressed if k[0] == scene]:
+                self.stats.compressed_bytes -= len(self._compressed.pop(key).blob)
+            for key in [k for k in self._demoting if k[0] == scene]:
+                del self._demoting[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._compressed.clear()
+            self._demoting.clear()
+            self.stats.bytes = 0
+            self.stats.compressed_bytes = 0
+
+    def _insert(self, key: _Key, arr: np.ndarray) -> List[Tuple[_Key, np.ndarray]]:
+        """Insert under the lock; returns the evicted entries to demote."""
+        if arr.nbytes > self.max_bytes:
+            return []
+
+        old = self._compressed.pop(key, None)
+        if old is not None:
+            self.stats.compressed_bytes -= len(old.blob)
+        self._entries[key] = arr
+        self.stats.bytes += arr.nbytes
+
+        evicted = []
+        while self.stats.bytes > self.max_bytes:
+            old_key, old_arr = self._entries.popitem(last=False)
+            self.stats.bytes -= old_arr.nbytes
+            self.stats.evictions += 1
+            if self.compressed_max_bytes > 0:
+                self._demoting[old_key] = old_arr
+                evicted.append((old_key, old_arr))
+        return evicted
+
+    def _demote(self, evicted: List[Tuple[_Key, np.ndarray]]) -> None:
+        """Move evicted arrays to the compressed tier; called without the lock."""
+        if self.compressed_max_bytes <= 0:
+            return
+
+        for key, arr in evicted:
+            blob = self._codec()[0].compress(np.ascontiguousarray(arr))
+
+            with self._lock:
+                if self._demoting.get(key) is not arr:
+                    # fetched again or discarded meanwhile
+                    continue
+                del self._demoting[key]
+                if key in self._entries or key in self._compressed:
+                    continue
+                if len(blob) > self.compressed_max_bytes:
+                    self.stats.compressed_evictions += 1
+                    continue
+
+                self._compressed[key] = _Compressed(blob, arr.dtype.str, arr.shape)
+                self.stats.compressed_bytes += len(blob)
+
+                while self.stats.compressed_bytes > self.compressed_max_bytes:
+                    _, old = self._compressed.popitem(last=False)
+                    self.stats.compressed_bytes -= len(old.blob)
+                    self.stats.compressed_evictions += 1
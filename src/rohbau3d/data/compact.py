@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+COMPACT_VERSION = 1
+COMPACT_SPEC_FILE = "compact.json"
+COMPACT_FEATURES = ("coord", "normal", "intensity")
+
+_CONVERT_CHUNK = 4_000_000
+
+
+@dataclass(frozen=True)
+class CompactSettings:
+    """Per-feature quantization settings of the compact storage format.
+
+    coord_step:           coordinate quantization step in metres.
+    normal_bits:          bits per oct-encoded normal component (8 or 16).
+    intensity_bits:       bits of the unsigned intensity encoding (8 or 16).
+    *_tolerance:          maximum accepted reconstruction error; None derives
+                          it from the quantization step. Conversion fails if
+                          the measured error exceeds it.
+    """
+    coord_step: float = 0.001
+    coord_tolerance: float | None = None
+    normal_bits: int = 16
+    normal_tolerance_deg: float | None = None
+    intensity_bits: int = 16
+    intensity_tolerance: float | None = None
+
+    def __post_init__(self) -> None:
+        if self.coord_step <= 0:
+            raise ValueError("coord_step must be > 0.")
+        if self.normal_bits not in (8, 16):
+            raise ValueError("normal_bits must be 8 or 16.")
+        if self.intensity_bits not in (8, 16):
+            raise ValueError("intensity_bits must be 8 or 16.")
+
+
+def compact_path(scene_dir: str | Path, name: str) -> Path:
+    return Path(scene_dir) / f"{name}.compact.npy"
+
+
+def read_compact_spec(scene_dir: str | Path) -> Dict[str, dict]:
+    p = Path(scene_dir) / COMPACT_SPEC_FILE
+    if not p.exists():
+        return {}
+    with open(p, "r") as f:
+        return json.load(f).get("features", {})
+
+
+def has_compact(scene_dir: str | Path, name: str) -> bool:
+    return compact_path(scene_dir, name).exists() and name in read_compact_spec(scene_dir)
+
+
+# -----------------------------
+# Encodings
+# -----------------------------
+
+def _oct_encode(normal: np.ndarray, bits: int) -> np.ndarray:
+    n = normal.astype(np.float64)
+    l1 = np.abs(n).sum(axis=1, keepdims=True)
+    n = np.divide(n, l1, out=np.zeros_like(n), where=l1 > 0)
+    x, y, z = n[:, 0], n[:, 1], n[:, 2]
+
+    sx = np.where(x >= 0, 1.0, -1.0)
+    sy = np.where(y >= 0, 1.0, -1.0)
+    lower = z < 0
+    ox = np.where(lower, (1.0 - np.abs(y)) * sx, x)
+    oy = np.where(lower, (1.0 - np.abs(x)) * sy, y)
+
+    qmax = 2 ** (bits - 1) - 1
+    q = np.round(np.stack([ox, oy], axis=1) * qmax)
+    return q.astype(np.int8 if bits == 8 else np.int16)
+
+
+def _oct_decode(q: np.ndarray, bits: int) -> np.ndarray:
+    qmax = 2 ** (bits - 1) - 1
+    o = q.astype(np.float32) / np.float32(qmax)
+    x = o[:, 0]
+    y = o[:, 1]
+    z = 1.0 - np.abs(x) - np.abs(y)
+    t = np.clip(-z, 0.0, None)
+    x = x - np.where(x >= 0, t, -t)
+    y = y - np.where(y >= 0, t, -t)
+
+    n = np.stack([x, y, z], axis=1)
+    n /= np.linalg.norm(n, axis=1, keepdims=True)
+    return n
+
+
+def _angle_deg(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+    cross = np.linalg.norm(np.cross(a, b), axis=1)
+    dot = np.einsum("ij,ij->i", a, b)
+    return np.degrees(np.arctan2(cross, dot))
+
+
+def _decode(data: np.ndarray, spec: dict) -> np.ndarray:
+    encoding = spec["encoding"]
+
+    if encoding == "fixed":
+        origin = np.asarray(spec["origin"], dtype=np.float64)
+        out = data.astype(np.float64) * spec["step"] + origin
+    elif encoding == "oct":
+        out = _oct_decode(data, spec["bits"])
+    elif encoding == "unorm":
+        scale = (spec["max"] - spec["min"]) / (2 ** spec["bits"] - 1)
+        out = data.astype(np.float64) * scale + spec["min"]
+    else:
+        raise ValueError(f"Unknown compact encoding '{encoding}'.")
+
+    out = out.astype(np.dtype(spec["source_dtype"]), copy=False)
+    return out.reshape((data.shape[0],) + tuple(spec["source_shape"]))
+
+
+class CompactFeature:
+    """Read-only, array-like view of a compact feature that dequantizes on access.
+
+    Indexing along the point axis only decodes the selected rows, so gathers
+    from memory-mapped compact files stay cheap.
+    """
+
+    def __init__(self, data: np.ndarray, spec: dict) -> None:
+        self.data = data
+        self.spec = spec
+        self.shape = (data.shape[0],) + tuple(spec["source_shape"])
+        self.dtype = np.dtype(spec["source_dtype"])
+        self.ndim = len(self.shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, idx) -> np.ndarray:
+        if isinstance(idx, tuple):
+            return self[idx[0]][(slice(None),) + idx[1:]]
+        rows = self.data[idx]
+        if rows.ndim < self.data.ndim:
+            return _decode(rows[None], self.spec)[0]
+        return _decode(rows, self.spec)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        out = _decode(np.asarray(self.data), self.spec)
+        return out if dtype is None else out.astype(dtype)
+
+
+def open_compact(
+        scene_dir: str | Path,
+        name: str,
+        *,
+        mmap_mode: str | None = "r") -> CompactFeature | None:
+    spec = read_compact_spec(scene_dir).get(name)
+    p = compact_path(scene_dir, name)
+    if spec is None or not p.exists():
+        return None
+    return CompactFeature(np.load(p, mmap_mode=mmap_mode), spec)
+
+
+def load_compact(scene_dir: str | Path, name: str) -> np.ndarray | None:
+    view = open_compact(scene_dir, name, mmap_mode=None)
+    return None if view is None else np.asarray(view)
+
+
+# -----------------------------
+# Converter
+# -----------------------------
+
+def _chunks(n: int):
+    for start in range(0, n, _CONVERT_CHUNK):
+        yield start, min(start + _CONVERT_CHUNK, n)
+
+
+def _encode_coord(src: np.ndarray, settings: CompactSettings) -> Tuple[dict, callable]:
+    if src.shape[0] == 0:
+        # no points: an empty array around origin 0
+        lo = hi = np.zeros(src.shape[1:], dtype=np.float64)
+    else:
+        lo = np.asarray(src.min(axis=0), dtype=np.float64)
+        hi = np.asarray(src.max(axis=0), dtype=np.float64)
+    step = float(settings.coord_step)
+    origin = np.round((lo + hi) / 2.0 / step) * step
+
+    extent = float(np.max(np.maximum(np.abs(lo - origin), np.abs(hi - origin)))) / step
+    if extent < np.iinfo(np.int16).max:
+        dtype = np.int16
+    elif extent < np.iinfo(np.int32).max:
+        dtype = np.int32
+    else:
+        raise ValueError(
+            f"Coordinate extent {extent * step:.1f} m exceeds the int32 range at step {step} m.")
+
+    # half a quantization step plus the float32 rounding of the decoded value
+    bound = step / 2.0 + float(np.spacing(np.float32(np.max(np.abs(np.stack([lo, hi]))))))
+    spec = {
+        "encoding": "fixed",
+        "dtype": np.dtype(dtype).str,
+        "origin": origin.tolist(),
+        "step": step,
+        "tolerance": settings.coord_tolerance if settings.coord_tolerance is not None else bound,
+    }
+
+    def encode(block: np.ndarray) -> np.ndarray:
+        return np.round((block.astype(np.float64) - origin) / step).astype(dtype)
+
+    return spec, encode
+
+
+def _encode_normal(src: np.ndarray, settings: CompactSettings) -> Tuple[dict, callable]:
+    bits = settings.normal_bits
+    qmax = 2 ** (bits - 1) - 1
+    default_tol = 1.5 * np.degrees(2.0 / qmax)
+    spec = {
+        "encoding": "oct",
+        "dtype": np.dtype(np.int8 if bits == 8 else np.int16).str,
+        "bits": bits,
+        "tolerance": settings.normal_tolerance_deg if settings.normal_tolerance_deg is not None else default_tol,
+    }
+    return spec, lambda block: _oct_encode(block.reshape(-1, 3), bits)
+
+
+def _encode_intensity(src: np.ndarray, settings: CompactSettings) -> Tuple[dict, callable]:
+    bits = settings.intensity_bits
+    vmin = float(np.min(src)) if src.size else 0.0
+    vmax = float(np.max(src)) if src.size else 0.0
+    levels = 2 ** bits - 1
+    scale = (vmax - vmin) / levels if vmax > vmin else 1.0
+    dtype = np.uint8 if bits == 8 else np.uint16
+
+    bound = scale / 2.0 + float(np.spacing(np.float32(max(abs(vmin), abs(vmax)))))
+    spec = {
+        "encoding": "unorm",
+        "dtype": np.dtype(dtype).str,
+        "bits": bits,
+        "min": vmin,
+        "max": vmin + scale * levels,
+        "tolerance": settings.intensity_tolerance if settings.intensity_tolerance is not None else bound,
+    }
+
+    def encode(block: np.ndarray) -> np.ndarray:
+        values = block.astype(np.float64).reshape(block.shape[0], -1)[:, 0] if block.size else np.zeros(0)
+        q = np.round((values - vmin) / scale)
+        return np.clip(q, 0, levels).astype(dtype)
+
+    return spec, encode
+
+
+_ENCODERS = {
+    "coord": _encode_coord,
+    "normal": _encode_normal,
+    "intensity": _encode_intensity,
+}
+
+
+def _reconstruction_error(name: str, src: np.ndarray, decoded: np.ndarray) -> float:
+    if name == "normal":
+        src = src.reshape(-1, 3)
+        valid = np.linalg.norm(src.astype(np.float64), axis=1) > 1e-6
+        if not np.any(valid):
+            return 0.0
+        return float(np.max(_angle_deg(src[valid], decoded.reshape(-1, 3)[valid])))
+
+    diff = np.abs(src.astype(np.float64) - decoded.astype(np.float64))
+    return float(np.max(diff)) if diff.size else 0.0
+
+
+def convert_scene(
+        scene_dir: str | Path,
+        settings: CompactSettings = CompactSettings(),
+        *,
+        features=COMPACT_FEATURES,
+        remove_source: bool = False) -> Dict[str, dict]:
+    """Write compact copies of the selected features of one scene.
+
+    The reconstruction error of every feature is measured against the source
+    and recorded in compact.json; a feature whose error exceeds its tolerance
+    raises ValueError and is not written.
+    """
+    scene_dir = Path(scene_dir)
+    specs = read_compact_spec(scene_dir)
+    converted: Dict[str, dict] = {}
+
+    for name in features:
+        if name not in _ENCODERS:
+            raise ValueError(
+                f"Feature '{name}' has no compact encoding. Available: {list(_ENCODERS)}")
+
+        src_path = scene_dir / f"{name}.npy"
+        if not src_path.exists():
+            continue
+
+        src = np.load(src_path, mmap_mode="r")
+        n = src.shape[0]
+
+        spec, encode = _ENCODERS[name](src, settings)
+        spec["source_dtype"] = src.dtype.str
+        spec["source_shape"] = list(src.shape[1:])
+        if name == "normal":
+            spec["error_unit"] = "deg"
+
+        first = encode(src[:1]) if n else encode(src)
+        tmp_path = compact_path(scene_dir, name).with_suffix(".tmp.npy")
+        out = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.dtype(spec["dtype"]),
+            shape=(n,) + first.shape[1:])
+
+        max_error = 0.0
+        for start, stop in _chunks(n):
+            block = np.asarray(src[start:stop])
+            out[start:stop] = encode(block)
+            decoded = _decode(np.asarray(out[start:stop]), spec)
+            max_error = max(max_error, _reconstruction_error(name, block, decoded))
+
+        out.flush()
+        del out
+
+        if max_error > spec["tolerance"]:
+            tmp_path.unlink()
+            raise ValueError(
+                f"{name}.npy in {scene_dir}: reconstruction error {max_error:.6g} "
+                f"exceeds tolerance {spec['tolerance']:.6g}.")
+
+        tmp_path.replace(compact_path(scene_dir, name))
+        spec["max_error"] = max_error
+        specs[name] = spec
+        converted[name] = spec
+
+        log.info(
+            "%s/%s: %s %s -> %s, max error %.3g%s",
+            scene_dir.parent.name,
+            scene_dir.name,
+            name,
+            src.dtype,
+            spec["dtype"],
+            max_error,
+            " deg" if name == "normal" else "",
+        )
+
+    with open(scene_dir / COMPACT_SPEC_FILE, "w") as f:
+        json.dump({"version": COMPACT_VERSION, "features": specs}, f, indent=2)
+
+    if remove_source:
+        for name in converted:
+            (scene_dir / f"{name}.npy").unlink()
+
+    return converted
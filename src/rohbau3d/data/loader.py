@@ -0,0 +1,459 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from functools import lru_cache
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from rohbau3d.data.scene import (
+    discover_scenes,
+    num_points as scene_num_points,
+    open_feature,
+    resolve_data_root,
+)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FEATURES = ("coord", "color", "intensity", "normal", "class")
+
+# (scene_dir, start, stop, seed) -> one sample of num_points points
+_Sample = Tuple[str, int, int, int]
+
+
+@dataclass(frozen=True)
+class _FeatureLayout:
+    name: str
+    dtype: str
+    shape: Tuple[int, ...]
+    offset: int
+    nbytes: int
+
+
+@dataclass
+class LoaderStats:
+    batches: int = 0
+    samples: int = 0
+    points: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def samples_per_second(self) -> float:
+        return self.samples / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def points_per_second(self) -> float:
+        return self.points / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def read_data_split(
+        data_root: str | Path,
+        split_file: str | Path | None = None) -> Dict[str, List[Path]]:
+    """Read metadata/data_split.json and resolve every entry to a scene directory.
+
+    Split entries may be scene names (scene_00000), site/scene paths
+    (site_00/scene_00000) or integer scene ids. A split may also be grouped
+    by site ({"train": {"site_00": [...], ...}}).
+    """
+    data_root = resolve_data_root(data_root)
+    split_path = Path(split_file) if split_file is not None else (
+        data_root / "metadata" / "data_split.json")
+
+    if not split_path.exists():
+        raise FileNotFoundError(f"Data split file not found: {split_path}")
+
+    with open(split_path, "r") as f:
+        raw = json.load(f)
+
+    by_name: Dict[str, Path] = {}
+    for scene_dir in discover_scenes(data_root):
+        by_name[scene_dir.name] = scene_dir
+        by_name[f"{scene_dir.parent.name}/{scene_dir.name}"] = scene_dir
+
+    def _entries(value) -> Iterable[str]:
+        if isinstance(value, dict):
+            for site, items in value.items():
+                for item in _entries(items):
+                    yield item if "/" in item else f"{site}/{item}"
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                yield from _entries(item)
+        elif isinstance(value, int):
+            yield f"scene_{value:05d}"
+        else:
+            yield str(value).strip("/").replace("\\", "/")
+
+    splits: Dict[str, List[Path]] = {}
+    for split, value in raw.items():
+        resolved: List[Path] = []
+        missing = 0
+        for entry in _entries(value):
+            scene_dir = by_name.get(entry) or by_name.get(entry.split("/")[-1])
+            if scene_dir is None:
+                missing += 1
+                continue
+            resolved.append(scene_dir)
+
+        if missing:
+            log.warning(
+                "Split '%s': %d scenes listed in %s are not available in %s.",
+                split,
+                missing,
+                split_path.name,
+                data_root,
+            )
+        splits[split] = resolved
+
+    return splits
+
+
+@lru_cache(maxsize=64)
+def _open_feature(scene_dir: str, name: str, subsampled: bool):
+    return open_feature(scene_dir, name, subsampled=subsampled)
+
+
+def _batch_arrays(
+        buffer,
+        layouts: Sequence[_FeatureLayout],
+        batch_size: int,
+        num_points: int) -> Dict[str, np.ndarray]:
+    return {
+        layout.name: np.ndarray(
+            (batch_size, num_points) + layout.shape,
+            dtype=np.dtype(layout.dtype),
+            buffer=buffer,
+            offset=layout.offset,
+        )
+        for layout in layouts
+    }
+
+
+def _fill_samples(
+        arrays: Dict[str, np.ndarray],
+        samples: Sequence[_Sample],
+        num_points: int,
+        subsampled: bool) -> None:
+    for i, (scene_dir, start, stop, seed) in enumerate(samples):
+        rng = np.random.default_rng(seed)
+        count = stop - start
+        idx = rng.choice(count, size=num_points, replace=count < num_points)
+        # sorted gathers keep the mmap reads sequential
+        idx.sort()
+        idx += start
+
+        for name, out in arrays.items():
+            feature = _open_feature(scene_dir, name, subsampled)
+            out[i] = feature[idx].reshape(out.shape[1:])
+
+
+def _fill_shared_batch(
+        shm_name: str,
+        layouts: Sequence[_FeatureLayout],
+        num_points: int,
+        subsampled: bool,
+        samples: Sequence[_Sample]) -> None:
+    """
+    Worker entry point: gather one batch directly into a shared memory slot.
+    Must be a top-level function for ProcessPoolExecutor.
+    """
+    shm = SharedMemory(name=shm_name)
+    try:
+        arrays = _batch_arrays(shm.buf, layouts, len(samples), num_points)
+        _fill_samples(arrays, samples, num_points, subsampled)
+        del arrays
+    finally:
+        shm.close()
+
+
+class PointBatchLoader:
+    """Framework-agnostic loader of fixed-size point batches from a data split.
+
+    Every scene is cut into contiguous chunks of about ``chunk_size`` points.
+    Each epoch shuffles the scene order and the chunk order inside each scene,
+    and every sample draws ``num_points`` points from one chunk. Batches are
+    dicts of arrays shaped (batch_size, num_points, ...) per feature.
+
+    With ``workers > 0`` batches are gathered by a process pool into a ring
+    of shared memory slots, so no array is pickled. A yielded batch is only
+    valid until the next one is requested; pass ``copy=True`` to keep it.
+
+    With ``subsampled=True`` every scene is read through its sample_idx.npy.
+    """
+
+    def __init__(
+        self,
+        data_root: str | Path,
+        split: str | None = "train",
+        *,
+        scenes: Sequence[Path] | None = None,
+        batch_size: int = 8,
+        num_points: int = 65536,
+        features: Sequence[str] = DEFAULT_FEATURES,
+        chunk_size: int = 1_000_000,
+        shuffle: bool = True,
+        seed: int = 0,
+        workers: int = 4,
+        prefetch: int = 8,
+        split_file: str | Path | None = None,
+        copy: bool = False,
+        subsampled: bool = False,
+    ) -> None:
+        if batch_size < 1 or num_points < 1 or chunk_size < 1:
+            raise ValueError(
+                "batch_size, num_points and chunk_size must be >= 1.")
+        if workers < 0 or prefetch < 1:
+            raise ValueError("workers must be >= 0 and prefetch must be >= 1.")
+
+        if scenes is None:
+            if split is None:
+                scenes = discover_scenes(data_root)
+            else:
+                splits = read_data_split(data_root, split_file)
+                if split not in splits:
+                    raise ValueError(
+                        f"Split '{split}' not found. Available splits: {list(splits)}")
+                scenes = splits[split]
+
+        if not scenes:
+            raise FileNotFoundError("No scenes found for the provided split.")
+
+        scenes = [Path(p) for p in scenes]
+        points = [scene_num_points(p, subsampled=subsampled) for p in scenes]
+        empty = [p for p, n in zip(scenes, points) if n == 0]
+        if empty:
+            # nothing to sample from
+            log.warning("Skipping %d scenes without points: %s", len(empty),
+                        ", ".join(f"{p.parent.name}/{p.name}" for p in empty))
+        if len(empty) == len(scenes):
+            raise ValueError("None of the selected scenes has any points.")
+
+        self.scenes = [p for p, n in zip(scenes, points) if n > 0]
+        self.batch_size = int(batch_size)
+        self.num_points = int(num_points)
+        self.features = tuple(features)
+        self.chunk_size = int(chunk_size)
+        self.shuffle = shuffle
+        self.seed = seed
+        self.workers = int(workers)
+        self.prefetch = int(prefetch)
+        self.copy = copy
+        self.subsampled = subsampled
+
+        self.stats = LoaderStats()
+
+        self._scene_points = [n for n in points if n > 0]
+        self._layouts, self._batch_nbytes = self._build_layouts()
+        self._epoch = 0
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots: List[SharedMemory] = []
+
+    def __len__(self) -> int:
+        return sum(self._num_chunks(n)
+                   for n in self._scene_points) // self.batch_size
+
+    def __enter__(self) -> "PointBatchLoader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+        for shm in self._slots:
+            try:
+                shm.close()
+            except BufferError:
+                # a yielded batch still references the slot; the mapping
+                # is released together with the last view
+                pass
+            shm.unlink()
+        self._slots = []
+
+    def __iter__(self) -> Iterator[Dict[str, np.ndarray]]:
+        batches = self._plan_epoch(self._epoch)
+        epoch = self._epoch
+        self._epoch += 1
+
+        start = time.monotonic()
+        epoch_stats = LoaderStats()
+
+        if self.workers == 0:
+            source = (self._gather_local(b) for b in batches)
+        else:
+            source = self._gather_pool(batches)
+
+        for batch in source:
+            epoch_stats.batches += 1
+            epoch_stats.samples += self.batch_size
+            epoch_stats.points += self.batch_size * self.num_points
+            epoch_stats.elapsed = time.monotonic() - start
+            yield batch
+
+        epoch_stats.elapsed = time.monotonic() - start
+        self.stats.batches += epoch_stats.batches
+        self.stats.samples += epoch_stats.samples
+        self.stats.points += epoch_stats.points
+        self.stats.elapsed += epoch_stats.elapsed
+
+        log.info(
+            "Epoch %d: %d batches, %d samples, %.1f samples/s, %.0f points/s.",
+            epoch,
+            epoch_stats.batches,
+            epoch_stats.samples,
+            epoch_stats.samples_per_second,
+            epoch_stats.points_per_second,
+        )
+
+    def _build_layouts(self) -> Tuple[List[_FeatureLayout], int]:
+        reference = self.scenes[0]
+        layouts: List[_FeatureLayout] = []
+        offset = 0
+
+        for name in self.features:
+            arr = open_feature(reference, name, subsampled=self.subsampled)
+            if arr is None:
+                raise FileNotFoundError(f"Missing {name}.npy in {reference}")
+
+            shape = tuple(arr.shape[1:])
+            nbytes = self.batch_size * self.num_points * \
+                int(np.prod(shape, dtype=np.int64)) * arr.dtype.itemsize
+
+            # keep every feature block aligned for the ndarray views
+            offset = (offset + 63) // 64 * 64
+            layouts.append(_FeatureLayout(
+                name, arr.dtype.str, shape, offset, nbytes))
+            offset += nbytes
+
+        for scene_dir in self.scenes[1:]:
+            for layout in layouts:
+                arr = open_feature(
+                    scene_dir, layout.name, subsampled=self.subsampled)
+                if arr is None:
+                    raise FileNotFoundError(
+                        f"Missing {layout.name}.npy in {scene_dir}")
+                if tuple(arr.shape[1:]) != layout.shape or arr.dtype.str != layout.dtype:
+                    raise ValueError(
+                        f"{layout.name}.npy in {scene_dir} has shape "
+                        f"{arr.shape}/{arr.dtype}, expected (N, *{layout.shape})/{layout.dtype}.")
+
+        return layouts, max(offset, 1)
+
+    def _num_chunks(self, n: int) -> int:
+        return max(1, n // self.chunk_size)
+
+    def _plan_epoch(self, epoch: int) -> List[List[_Sample]]:
+        rng = np.random.default_rng((self.seed, epoch))
+
+        scene_order = np.arange(len(self.scenes))
+        if self.shuffle:
+            rng.shuffle(scene_order)
+
+        samples: List[_Sample] = []
+        for scene_i in scene_order:
+            n = self._scene_points[scene_i]
+            bounds = np.linspace(
+                0, n, self._num_chunks(n) + 1).astype(np.int64)
+
+            chunk_order = np.arange(bounds.shape[0] - 1)
+            if self.shuffle:
+                rng.shuffle(chunk_order)
+
+            for chunk_i in chunk_order:
+                samples.append((
+                    str(self.scenes[scene_i]),
+                    int(bounds[chunk_i]),
+                    int(bounds[chunk_i + 1]),
+                    int(rng.integers(0, 2**63 - 1)),
+                ))
+
+        # fixed-size batches: the incomplete remainder is dropped
+        num_batches = len(samples) // self.batch_size
+        return [samples[i * self.batch_size:(i + 1) * self.batch_size]
+                for i in range(num_batches)]
+
+    def _gather_local(self, samples: List[_Sample]) -> Dict[str, np.ndarray]:
+        buffer = bytearray(self._batch_nbytes)
+        arrays = _batch_arrays(
+            buffer, self._layouts, self.batch_size, self.num_points)
+        _fill_samples(arrays, samples, self.num_points, self.subsampled)
+        return arrays
+
+    def _ensure_pool(self) -> None:
+        if self._executor is not None:
+            return
+
+        # one slot per in-flight batch plus the one held by the consumer;
+        # created before the pool so the workers share the resource tracker
+        self._slots = [
+            SharedMemory(create=True, size=self._batch_nbytes)
+            for _ in range(self.prefetch + 1)
+        ]
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def _gather_pool(
+            self, batches: List[List[_Sample]]) -> Iterator[Dict[str, np.ndarray]]:
+        self._ensure_pool()
+
+        free = deque(range(len(self._slots)))
+        pending = deque()
+        queue = iter(batches)
+        held = None
+
+        def _submit() -> None:
+            while free and len(pending) < self.prefetch:
+                samples = next(queue, None)
+                if samples is None:
+                    return
+                slot = free.popleft()
+                future = self._executor.submit(
+                    _fill_shared_batch,
+                    self._slots[slot].name,
+                    self._layouts,
+                    self.num_points,
+                    self.subsampled,
+                    samples,
+                )
+                pending.append((slot, future))
+
+        try:
+            _submit()
+            while pending:
+                slot, future = pending.popleft()
+                future.result()
+
+                arrays = _batch_arrays(
+                    self._slots[slot].buf,
+                    self._layouts,
+                    self.batch_size,
+                    self.num_points,
+                )
+
+                if self.copy:
+                    arrays = {k: v.copy() for k, v in arrays.items()}
+                    free.append(slot)
+                else:
+                    held = slot
+
+                _submit()
+                yield arrays
+
+                if held is not None:
+                    free.append(held)
+                    held = None
+        finally:
+            for _, future in pending:
+                future.cancel()
+            # running workers still write into their slots, which the next
+            # epoch hands out again
+            wait([future for _, future in pending])
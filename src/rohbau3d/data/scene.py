@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from rohbau3d.data.compact import CompactFeature, has_compact, open_compact
+from rohbau3d.data.subsample import SubsampledFeature, open_sample_idx
+
+SCENE_FEATURES = (
+    "coord",
+    "color",
+    "intensity",
+    "normal",
+    "class",
+    "instance",
+)
+
+
+def resolve_data_root(data_root: str | Path) -> Path:
+    data_root = Path(data_root).expanduser().resolve()
+
+    # automatically handle nested "rohbau3d" subdirectories
+    while (data_root / "rohbau3d").is_dir():
+        data_root = data_root / "rohbau3d"
+
+    return data_root
+
+
+def discover_scenes(data_root: str | Path) -> List[Path]:
+    data_root = resolve_data_root(data_root)
+
+    scenes: List[Path] = []
+    for site_dir in sorted(data_root.iterdir(), key=lambda p: p.name):
+        if not site_dir.is_dir() or not site_dir.name.startswith("site_"):
+            continue
+
+        scenes.extend(sorted(
+            [p for p in site_dir.iterdir() if p.is_dir() and p.name.startswith("scene_")],
+            key=lambda p: p.name,
+        ))
+
+    return scenes
+
+
+def feature_path(scene_dir: str | Path, name: str) -> Path:
+    return Path(scene_dir) / f"{name}.npy"
+
+
+def has_feature(scene_dir: str | Path, name: str) -> bool:
+    return feature_path(scene_dir, name).exists() or has_compact(scene_dir, name)
+
+
+def open_feature(
+        scene_dir: str | Path,
+        name: str,
+        *,
+        subsampled: bool = False) -> np.ndarray | CompactFeature | SubsampledFeature | None:
+    """Memory-map a per-point feature without decoding it.
+
+    Compact features are returned as a CompactFeature, which dequantizes
+    only the rows that are indexed. With subsampled=True the feature is
+    wrapped in a SubsampledFeature view through sample_idx.npy.
+    """
+    p = feature_path(scene_dir, name)
+    if p.exists():
+        base = np.load(p, mmap_mode="r")
+    else:
+        base = open_compact(scene_dir, name)
+
+    if base is None or not subsampled:
+        return base
+    return SubsampledFeature(base, open_sample_idx(scene_dir))
+
+
+def load_feature(
+        scene_dir: str | Path,
+        name: str,
+        *,
+        mmap_mode: str | None = None,
+        subsampled: bool = False) -> np.ndarray | None:
+    """Load a per-point feature of a scene, or None if it is not available.
+
+    The raw <name>.npy is preferred; otherwise a compact copy is dequantized
+    transparently (mmap_mode does not apply to decoded arrays). With
+    subsampled=True only the points in sample_idx.npy are gathered.
+    """
+    if subsampled:
+        view = open_feature(scene_dir, name, subsampled=True)
+        return None if view is None else np.asarray(view)
+
+    p = feature_path(scene_dir, name)
+    if p.exists():
+        return np.load(p, mmap_mode=mmap_mode)
+
+    view = open_compact(scene_dir, name)
+    return None if view is None else np.asarray(view)
+
+
+def num_points(scene_dir: str | Path, *, subsampled: bool = False) -> int:
+    """Number of points in a scene, read from the coord header only."""
+    coord = open_feature(scene_dir, "coord", subsampled=subsampled)
+    if coord is None:
+        raise FileNotFoundError(f"Missing coord.npy in {scene_dir}")
+    return int(coord.shape[0])
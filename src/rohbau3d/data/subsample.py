@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_IDX_FILE = "sample_idx.npy"
+INV_SAMPLE_IDX_FILE = "inv_sample_idx.npy"
+
+_GATHER_CHUNK = 2_000_000
+
+
+def open_sample_idx(scene_dir: str | Path) -> np.ndarray:
+    p = Path(scene_dir) / SAMPLE_IDX_FILE
+    if not p.exists():
+        raise FileNotFoundError(f"Missing {SAMPLE_IDX_FILE} in {scene_dir}")
+    return np.load(p, mmap_mode="r").reshape(-1)
+
+
+def open_inv_sample_idx(scene_dir: str | Path) -> np.ndarray:
+    p = Path(scene_dir) / INV_SAMPLE_IDX_FILE
+    if not p.exists():
+        raise FileNotFoundError(f"Missing {INV_SAMPLE_IDX_FILE} in {scene_dir}")
+    return np.load(p, mmap_mode="r").reshape(-1)
+
+
+def gather_chunked(
+        base,
+        index: np.ndarray,
+        *,
+        out: np.ndarray | None = None,
+        chunk_size: int = _GATHER_CHUNK) -> np.ndarray:
+    """Gather base[index] block by block, so only one index chunk is resident at a time."""
+    if out is None:
+        out = np.empty((index.shape[0],) + tuple(base.shape[1:]), dtype=base.dtype)
+
+    for start in range(0, index.shape[0], chunk_size):
+        stop = min(start + chunk_size, index.shape[0])
+        out[start:stop] = base[np.asarray(index[start:stop], dtype=np.int64)]
+
+    return out
+
+
+class SubsampledFeature:
+    """Lazy view of a full-resolution feature through sample_idx.
+
+    Nothing is read until the view is indexed or converted to an array;
+    indexing only gathers the requested rows.
+    """
+
+    def __init__(self, base, index: np.ndarray) -> None:
+        self.base = base
+        self.index = index
+        self.shape = (index.shape[0],) + tuple(base.shape[1:])
+        self.dtype = np.dtype(base.dtype)
+        self.ndim = len(self.shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, idx) -> np.ndarray:
+        if isinstance(idx, tuple):
+            return self[idx[0]][(slice(None),) + idx[1:]]
+        rows = np.asarray(self.index[idx], dtype=np.int64)
+        return self.base[rows]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        out = gather_chunked(self.base, self.index)
+        return out if dtype is None else out.astype(dtype)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+# (class id, base color) of the room surfaces: floor, ceiling, walls
+_FLOOR = (1, (150, 144, 136))
+_CEILING = (2, (205, 205, 200))
+_WALL = (3, (182, 176, 168))
+
+_MIN_PITCH = np.radians(-60.0)
+_RANGE_NOISE = 0.002
+
+
+def _room(rng: np.random.Generator) -> np.ndarray:
+    """(lo, hi) corners of an axis-aligned room around the scanner origin."""
+    half = rng.uniform([4.0, 3.0], [25.0, 18.0])
+    offset = rng.uniform(-0.6, 0.6, size=2) * half
+    lo = np.array([offset[0] - half[0], offset[1] - half[1], -rng.uniform(1.3, 1.7)])
+    hi = np.array([offset[0] + half[0], offset[1] + half[1], rng.uniform(1.5, 4.5)])
+    return np.stack([lo, hi]).astype(np.float32)
+
+
+def _objects(rng: np.random.Generator, room: np.ndarray, count: int) -> np.ndarray:
+    """(count, 2, 3) boxes standing on the floor, clear of the scanner."""
+    boxes = []
+    while len(boxes) < count:
+        size = rng.uniform([0.2, 0.2, 0.3], [3.0, 3.0, room[1, 2] - room[0, 2]])
+        lo = rng.uniform(room[0], room[1] - size)
+        lo[2] = room[0, 2]
+        hi = lo + size
+        if np.all(lo[:2] < 0.5) and np.all(hi[:2] > -0.5):
+            continue
+        boxes.append((lo, hi))
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 2, 3)
+
+
+def _cast(direction: np.ndarray, room: np.ndarray, objects: np.ndarray):
+    """Nearest hit of each ray: range, surface id and hit axis/sign."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / direction
+
+        # leaving the room: the nearest of the three walls ahead of each ray
+        exit_t = np.where(inv > 0, room[1] * inv, room[0] * inv)
+        axis = np.argmin(exit_t, axis=1)
+        t = exit_t[np.arange(direction.shape[0]), axis]
+        surface = np.where(
+            axis < 2, 2, np.where(direction[:, 2] < 0, 0, 1)).astype(np.int32)
+
+        for k, (lo, hi) in enumerate(objects):
+            t1 = lo * inv
+            t2 = hi * inv
+            near = np.minimum(t1, t2)
+            t_in = near.max(axis=1)
+            t_out = np.maximum(t1, t2).min(axis=1)
+            hit = (t_in <= t_out) & (t_in > 0) & (t_in < t)
+            t[hit] = t_in[hit]
+            axis[hit] = near[hit].argmax(axis=1)
+            surface[hit] = 3 + k
+
+    normal = np.zeros_like(direction)
+    rows = np.arange(direction.shape[0])
+    normal[rows, axis] = -np.sign(direction[rows, axis])
+    return t, surface, normal
+
+
+def write_synthetic_scene(
+        scene_dir: str | Path,
+        num_points: int,
+        *,
+        seed: int = 0,
+        num_objects: int = 24,
+        chunk_size: int = 1_000_000) -> Path:
+    """
+    Write a synthetic, scanner-centred scan with the layout of an extracted
+    scene: coord, color, intensity, normal, class and instance .npy files.
+
+    Rays are drawn uniformly over yaw and pitch like a terrestrial laser
+    scanner (with the blind cone below it) and cast against a box-shaped
+    room with cuboid clutter, so point density falls off with range and
+    surfaces occlude each other. Generated in chunks; any size fits into
+    memory.
+    """
+    scene_dir = Path(scene_dir)
+    scene_dir.mkdir(parents=True, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    room = _room(rng)
+    objects = _objects(rng, room, num_objects)
+
+    # per surface: floor, ceiling, walls, then one entry per object
+    num_surfaces = 3 + num_objects
+    classes = np.array(
+        [_FLOOR[0], _CEILING[0], _WALL[0]]
+        + rng.integers(4, 18, size=num_objects).tolist(), dtype=np.uint8)
+    colors = np.array(
+        [_FLOOR[1], _CEILING[1], _WALL[1]]
+        + rng.integers(30, 230, size=(num_objects, 3)).tolist(), dtype=np.float32)
+    albedo = rng.uniform(0.2, 0.9, size=num_surfaces).astype(np.float32)
+    instances = np.arange(1, num_surfaces + 1, dtype=np.uint16)
+
+    specs = {
+        "coord": ((3,), np.float32),
+        "color": ((3,), np.uint8),
+        "intensity": ((), np.float32),
+        "normal": ((3,), np.float32),
+        "class": ((), np.uint8),
+        "instance": ((), np.uint16),
+    }
+    out: Dict[str, np.ndarray] = {
+        name: np.lib.format.open_memmap(
+            scene_dir / f"{name}.npy", mode="w+", dtype=dtype,
+            shape=(num_points,) + shape)
+        for name, (shape, dtype) in specs.items()
+    }
+
+    for chunk, start in enumerate(range(0, num_points, chunk_size)):
+        stop = min(start + chunk_size, num_points)
+        n = stop - start
+        chunk_rng = np.random.default_rng((seed, chunk))
+
+        yaw = chunk_rng.uniform(-np.pi, np.pi, size=n)
+        pitch = chunk_rng.uniform(_MIN_PITCH, np.pi / 2.0, size=n)
+        direction = np.stack([
+            np.cos(pitch) * np.cos(yaw),
+            np.cos(pitch) * np.sin(yaw),
+            np.sin(pitch),
+        ], axis=1).astype(np.float32)
+
+        t, surface, normal = _cast(direction, room, objects)
+        t = t * (1.0 + chunk_rng.normal(0.0, _RANGE_NOISE, size=n).astype(np.float32))
+
+        incidence = np.abs(np.einsum("ij,ij->i", direction, normal))
+        shade = 0.55 + 0.45 * incidence
+        noise = chunk_rng.normal(0.0, 6.0, size=(n, 3)).astype(np.float32)
+
+        normal = normal + chunk_rng.normal(0.0, 0.03, size=(n, 3)).astype(np.float32)
+        normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+
+        out["coord"][start:stop] = direction * t[:, None]
+        out["color"][start:stop] = np.clip(
+            colors[surface] * shade[:, None] + noise, 0, 255).astype(np.uint8)
+        out["intensity"][start:stop] = np.clip(
+            albedo[surface] * incidence / (1.0 + 0.03 * t), 0.0, 1.0)
+        out["normal"][start:stop] = normal
+        out["class"][start:stop] = classes[surface]
+        out["instance"][start:stop] = instances[surface]
+
+    for array in out.values():
+        array.flush()
+    return scene_dir
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Mapping
+
+import numpy as np
+
+from rohbau3d.data.subsample import open_inv_sample_idx
+
+_UPSAMPLE_CHUNK = 1_000_000
+
+
+def _check_index(idx: np.ndarray, num_sampled: int, start: int) -> None:
+    if idx.size == 0:
+        return
+    lo = int(idx.min())
+    hi = int(idx.max())
+    if lo < 0 or hi >= num_sampled:
+        raise ValueError(
+            f"inv_sample_idx[{start}:{start + idx.size}] references point {hi if hi >= num_sampled else lo}, "
+            f"but the prediction has only {num_sampled} points.")
+
+
+def upsample_predictions(
+        predictions: Mapping[str, np.ndarray],
+        inv_sample_idx: np.ndarray,
+        *,
+        out: Mapping[str, np.ndarray] | None = None,
+        chunk_size: int = _UPSAMPLE_CHUNK) -> Dict[str, np.ndarray]:
+    """Propagate per-point predictions of the subsampled cloud to full resolution.
+
+    full[i] = prediction[inv_sample_idx[i]] for every array in ``predictions``
+    (labels, logits, embeddings, ...). inv_sample_idx is streamed in chunks
+    and read once for all arrays; each chunk is gathered straight into the
+    output, so dtypes such as float16 or uint16 are never upcast. ``out`` may
+    hold preallocated outputs, e.g. memory-mapped .npy files.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1.")
+
+    num_full = inv_sample_idx.shape[0]
+    num_sampled = {arr.shape[0] for arr in predictions.values()}
+    if len(num_sampled) > 1:
+        raise ValueError(
+            f"All predictions must have the same number of points, got {sorted(num_sampled)}.")
+
+    results: Dict[str, np.ndarray] = {}
+    for name, pred in predictions.items():
+        shape = (num_full,) + pred.shape[1:]
+        target = None if out is None else out.get(name)
+        if target is None:
+            target = np.empty(shape, dtype=pred.dtype)
+        elif target.shape != shape or target.dtype != pred.dtype:
+            raise ValueError(
+                f"out['{name}'] must have shape {shape} and dtype {pred.dtype}, "
+                f"got {target.shape} and {target.dtype}.")
+        results[name] = target
+
+    if not predictions:
+        return results
+
+    m = next(iter(num_sampled))
+    for start in range(0, num_full, chunk_size):
+        stop = min(start + chunk_size, num_full)
+        idx = np.asarray(inv_sample_idx[start:stop])
+        _check_index(idx, m, start)
+        idx = idx.astype(np.intp, copy=False)
+
+        for name, pred in predictions.items():
+            # the index range is checked above, so clip never alters it and
+            # np.take writes into the output without an intermediate buffer
+            np.take(pred, idx, axis=0, out=results[name][start:stop], mode="clip")
+
+    return results
+
+
+def upsample_scene(
+        scene_dir: str | Path,
+        predictions: Mapping[str, np.ndarray],
+        *,
+        out_dir: str | Path | None = None,
+        chunk_size: int = _UPSAMPLE_CHUNK) -> Dict[str, np.ndarray]:
+    """Upsample predictions of one scene through its inv_sample_idx.npy.
+
+    With ``out_dir`` every prediction is streamed into ``<out_dir>/<name>.npy``
+    and returned memory-mapped, so peak memory stays bounded by the chunk
+    size rather than the full-resolution point count.
+    """
+    inv = open_inv_sample_idx(scene_dir)
+
+    out = None
+    if out_dir is not None:
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out = {
+            name: np.lib.format.open_memmap(
+                out_dir / f"{name}.npy",
+                mode="w+",
+                dtype=pred.dtype,
+                shape=(inv.shape[0],) + pred.shape[1:],
+            )
+            for name, pred in predictions.items()
+        }
+
+    results = upsample_predictions(
+        predictions, inv, out=out, chunk_size=chunk_size)
+
+    for arr in results.values():
+        if isinstance(arr, np.memmap):
+            arr.flush()
+
+    return results
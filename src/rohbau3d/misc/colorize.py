@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import Mapping, Sequence
+
+import numpy as np
+
+# instance ids up to this bound are colorized through a dense lookup table,
+# larger or negative ids are hashed point by point
+_MAX_DENSE_LUT = 1 << 22
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def hex_to_rgb(hex_color: str) -> np.ndarray:
+    h = hex_color.lstrip("#")
+    return np.array([int(h[0:2], 16), int(h[2:4], 16),
+                    int(h[4:6], 16)], dtype=np.uint8)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer, relies on wrapping uint64 arithmetic
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def hash_colors(
+        ids: np.ndarray,
+        *,
+        seed: int = 0,
+        low: int = 0) -> np.ndarray:
+    """
+    Pseudo-random uint8 RGB color per integer id, with channels in
+    [low, 255]. The color depends only on (id, seed), so it is stable across
+    runs, platforms, scenes and chunks of the same scene.
+    """
+    if not 0 <= low <= 255:
+        raise ValueError("low must be in [0, 255].")
+
+    x = np.asarray(ids).astype(np.int64).reshape(-1).view(np.uint64)
+    with np.errstate(over="ignore"):
+        h = _mix64(x + np.uint64(seed + 1) * _GOLDEN)
+
+    rgb = np.empty((x.shape[0], 3), dtype=np.uint8)
+    span = np.uint64(256 - low)
+    for c in range(3):
+        byte = (h >> np.uint64(8 * c)) & np.uint64(0xFF)
+        rgb[:, c] = low + ((byte * span) >> np.uint64(8))
+    return rgb
+
+
+def label_lut(
+        colors: Mapping[int, Sequence[int]],
+        default: Sequence[int] = (255, 255, 255)) -> np.ndarray:
+    """
+    Dense (max_id + 2, 3) lookup table for non-negative label ids. The last
+    row holds the default color for ids that are not in ``colors``.
+    """
+    if any(int(k) < 0 for k in colors):
+        raise ValueError("Label ids must be non-negative.")
+
+    size = max((int(k) for k in colors), default=-1) + 1
+    lut = np.empty((size + 1, 3), dtype=np.uint8)
+    lut[:] = np.asarray(default, dtype=np.uint8)
+    for k, color in colors.items():
+        lut[int(k)] = np.asarray(color, dtype=np.uint8)
+    return lut
+
+
+def apply_lut(ids: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """Colorize label ids with a single gather; unknown ids get lut[-1]."""
+    idx = np.asarray(ids).astype(np.int64, copy=False).reshape(-1)
+    default = lut.shape[0] - 1
+    idx = np.where((idx >= 0) & (idx < default), idx, default)
+    return lut[idx]
+
+
+def colorize_instances(
+        ids: np.ndarray,
+        *,
+        seed: int = 0,
+        low: int = 0,
+        background_id: int | None = 0,
+        background_color: Sequence[int] = (114, 114, 116)) -> np.ndarray:
+    """
+    uint8 RGB colors of instance ids from ``hash_colors``. Points with
+    ``background_id`` get ``background_color``.
+    """
+    idx = np.asarray(ids).astype(np.int64, copy=False).reshape(-1)
+    if idx.size == 0:
+        return np.zeros((0, 3), dtype=np.uint8)
+
+    lo, hi = int(idx.min()), int(idx.max())
+    if lo >= 0 and hi < _MAX_DENSE_LUT:
+        lut = hash_colors(np.arange(hi + 1), seed=seed, low=low)
+        if background_id is not None and 0 <= background_id <= hi:
+            lut[background_id] = np.asarray(background_color, dtype=np.uint8)
+        return lut[idx]
+
+    rgb = hash_colors(idx, seed=seed, low=low)
+    if background_id is not None:
+        rgb[idx == background_id] = np.asarray(
+            background_color, dtype=np.uint8)
+    return rgb
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+_PREFIX = "rohbau3d"
+
+
+class JobMetrics:
+    """
+    Live counters of a batch job (scenes of a render run, files of a
+    download). Items move from the queue to a worker slot (``start``) and
+    leave it completed, failed or back into the queue for a retry
+    (``finish``). Thread-safe; read by the exporter while the job runs.
+    """
+
+    def __init__(self, task: str, *, total: int, unit: str = "items",
+                 workers: int = 1) -> None:
+        self.task = task
+        self.unit = unit
+        self.total = total
+        self.workers = workers
+        self.start_time = time.monotonic()
+
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.points = 0
+        self.bytes_written = 0
+
+        # busy slots: slot -> [items in flight, busy since]; busy seconds per slot
+        self._active: Dict[int, list] = {}
+        self._busy: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def start(self, slot: int | None = None) -> int:
+        """
+        Put an item on a worker slot, by default the lowest free one. Items
+        may share a slot (e.g. a serial worker that projects the next scene
+        while the images of the last one are written); the slot counts as
+        busy while any of them is in flight.
+        """
+        with self._lock:
+            if slot is None:
+                slot = 0
+                while slot in self._active:
+                    slot += 1
+            entry = self._active.setdefault(slot, [0, time.monotonic()])
+            entry[0] += 1
+            return slot
+
+    def finish(
+            self,
+            slot: int | None,
+            *,
+            ok: bool | None,
+            skipped: bool = False,
+            points: int = 0,
+            bytes_written: int = 0) -> None:
+        """
+        Release a slot. ok=True counts the item as completed (``skipped`` if
+        it was already done), False as failed and None puts it back into
+        the queue (retry).
+        """
+        with self._lock:
+            entry = self._active.get(slot)
+            if entry is not None:
+                entry[0] -= 1
+                if entry[0] == 0:
+                    del self._active[slot]
+                    busy = time.monotonic() - entry[1]
+                    self._busy[slot] = self._busy.get(slot, 0.0) + busy
+
+            if ok is True:
+                self.completed += 1
+                self.skipped += int(skipped)
+            elif ok is False:
+                self.failed += 1
+            self.points += points
+            self.bytes_written += bytes_written
+
+    def skip(self) -> None:
+        """An item that was already done and never took a slot."""
+        self.finish(None, ok=True, skipped=True)
+
+    def drop(self, n: int = 1) -> None:
+        """Remove items from the job, e.g. ones another node handles."""
+        with self._lock:
+            self.total -= n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(now - self.start_time, 1e-9)
+            in_flight = sum(entry[0] for entry in self._active.values())
+            processed = self.completed - self.skipped
+            rate = processed / elapsed
+            remaining = max(self.total - self.completed - self.failed, 0)
+
+            utilization = {}
+            for slot in sorted({*self._busy, *self._active}):
+                busy = self._busy.get(slot, 0.0)
+                if slot in self._active:
+                    busy += now - self._active[slot][1]
+                utilization[slot] = min(busy / elapsed, 1.0)
+
+            return {
+                "total": self.total,
+                "completed": self.completed,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "in_flight": in_flight,
+                "queue_depth": max(remaining - in_flight, 0),
+                "workers": self.workers,
+                "elapsed_seconds": elapsed,
+                "items_per_second": rate,
+                "points": self.points,
+                "points_per_second": self.points / elapsed,
+                "bytes_written": self.bytes_written,
+                "bytes_written_per_second": self.bytes_written / elapsed,
+                "eta_seconds": remaining / rate if rate > 0 else None,
+                "worker_utilization": utilization,
+            }
+
+    def prometheus(self) -> str:
+        """The snapshot in the Prometheus text exposition format."""
+        s = self.snapshot()
+        labels = f'task="{self.task}",unit="{self.unit}"'
+
+        metrics: List[Tuple[str, str, str, list]] = [
+            ("items_total", "gauge", "Items selected for the job.",
+             [("", s["total"])]),
+            ("items_completed_total", "counter", "Items completed, including skipped ones.",
+             [("", s["completed"])]),
+            ("items_failed_total", "counter", "Items that failed for good.",
+             [("", s["failed"])]),
+            ("items_skipped_total", "counter", "Items skipped as already done.",
+             [("", s["skipped"])]),
+            ("items_in_flight", "gauge", "Items currently being processed.",
+             [("", s["in_flight"])]),
+            ("queue_depth", "gauge", "Items waiting to be started.",
+             [("", s["queue_depth"])]),
+            ("workers", "gauge", "Configured number of workers.",
+             [("", s["workers"])]),
+            ("items_per_second", "gauge", "Average rate of processed (not skipped) items.",
+             [("", s["items_per_second"])]),
+            ("points_total", "counter", "Points of the processed items.",
+             [("", s["points"])]),
+            ("points_per_second", "gauge", "Average point throughput.",
+             [("", s["points_per_second"])]),
+            ("bytes_written_total", "counter", "Bytes written by the job.",
+             [("", s["bytes_written"])]),
+            ("bytes_written_per_second", "gauge", "Average write throughput.",
+             [("", s["bytes_written_per_second"])]),
+            ("worker_utilization", "gauge", "Share of the elapsed time a worker slot was busy.",
+             [(f',worker="{slot}"', u) for slot, u in s["worker_utilization"].items()]),
+            ("elapsed_seconds", "gauge", "Seconds since the job started.",
+             [("", s["elapsed_seconds"])]),
+            ("eta_seconds", "gauge", "Estimated seconds until the job is done.",
+             [("", s["eta_seconds"])] if s["eta_seconds"] is not None else []),
+            ("last_update_timestamp_seconds", "gauge", "Unix time of this sample.",
+             [("", time.time())]),
+        ]
+
+        lines = []
+        for name, kind, help_text, samples in metrics:
+            lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {_PREFIX}_{name} {kind}")
+            for extra, value in samples:
+                lines.append(f"{_PREFIX}_{name}{{{labels}{extra}}} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: int | float) -> str:
+    # counters stay exact; repr keeps all digits of a float
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class MetricsExporter:
+    """
+    Publishes JobMetrics as a Prometheus text file, rewritten atomically
+    every ``interval`` seconds (e.g. for the node_exporter textfile
+    collector), and/or on http://host:port/metrics. Without a target it
+    does nothing.
+    """
+
+    def __init__(
+            self,
+            metrics: JobMetrics,
+            *,
+            textfile: str | Path | None = None,
+            port: int | None = None,
+            host: str = "127.0.0.1",
+            interval: float = 15.0) -> None:
+        if interval <= 0:
+            raise ValueError("metrics.interval must be > 0.")
+
+        self.metrics = metrics
+        self.textfile = None if textfile is None else Path(textfile).expanduser()
+        self.interval = float(interval)
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._server: ThreadingHTTPServer | None = None
+        self._serving = False
+
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, int(port)), _handler(metrics))
+
+    @classmethod
+    def from_config(cls, cfg, metrics: JobMetrics) -> MetricsExporter:
+        """From a ``metrics`` config section (textfile, port, host, interval)."""
+        if cfg is None:
+            return cls(metrics)
+        return cls(
+            metrics,
+            textfile=getattr(cfg, "textfile", None),
+            port=getattr(cfg, "port", None),
+            host=getattr(cfg, "host", "127.0.0.1"),
+            interval=float(getattr(cfg, "interval", 15.0)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.textfile is not None or self._server is not None
+
+    def start(self) -> MetricsExporter:
+        log = logging.getLogger(__name__)
+
+        if self._server is not None:
+            host, port = self._server.server_address[:2]
+            threading.Thread(
+                target=self._server.serve_forever,
+                name="metrics-http",
+                daemon=True,
+            ).start()
+            self._serving = True
+            log.info("Serving metrics on http://%s:%d/metrics", host, port)
+
+        if self.textfile is not None:
+            self.write()
+            self._thread = threading.Thread(
+                target=self._run, name="metrics-textfile", daemon=True)
+            self._thread.start()
+            log.info("Writing metrics to %s every %gs", self.textfile, self.interval)
+        return self
+
+    def _run(self) -> None:
+        log = logging.getLogger(__name__)
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as exc:
+                log.warning("Could not write metrics to %s: %s", self.textfile, exc)
+
+    def write(self) -> None:
+        self.textfile.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.textfile.with_name(self.textfile.name + f".{os.getpid()}.tmp")
+        tmp.write_text(self.metrics.prometheus())
+        os.replace(tmp, self.textfile)
+
+    def close(self) -> None:
+        """Stop publishing; the text file keeps the final values."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.write()
+        if self._server is not None:
+            if self._serving:
+                self._server.shutdown()
+                self._serving = False
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> MetricsExporter:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _handler(metrics: JobMetrics) -> type:
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    return _MetricsHandler
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+MEMORY_MODES = ("none", "rss", "tracemalloc")
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+class StageTimes:
+    """
+    Accumulated wall time and call count per pipeline stage. Spans from all
+    threads of the process are added up, so stages that overlap (e.g. image
+    encoding on writer threads) can sum to more than the elapsed time.
+    """
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def as_dict(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                stage: {"seconds": self.seconds[stage], "calls": self.calls[stage]}
+                for stage in self.seconds
+            }
+
+
+@dataclass(frozen=True)
+class TraceSettings:
+    """
+    directory: where every process appends its span events (trace_<pid>.jsonl)
+    memory: none | rss | tracemalloc; samples taken at the end of every span.
+        tracemalloc also records the traced Python/numpy allocations, but
+        slows down allocation-heavy code.
+    """
+    directory: Path
+    memory: str = "rss"
+
+    def __post_init__(self) -> None:
+        if self.memory not in MEMORY_MODES:
+            raise ValueError(
+                f"Trace memory mode must be one of: {', '.join(map(repr, MEMORY_MODES))}.")
+
+
+def _current_rss() -> int | None:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Tracer:
+    """Span events of one process, buffered until ``flush``."""
+
+    def __init__(self, settings: TraceSettings) -> None:
+        self.settings = settings
+        self.pid = os.getpid()
+        self.path = Path(settings.directory) / f"trace_{self.pid}.jsonl"
+        self._events: List[dict] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+        if settings.memory == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add(self, stage: str, start_ns: int, seconds: float, args: dict) -> None:
+        event = {
+            "stage": stage,
+            "ts": start_ns // 1000,
+            "dur": seconds * 1e6,
+            "pid": self.pid,
+            "tid": threading.get_native_id(),
+        }
+        if args:
+            event["args"] = args
+        if self.settings.memory != "none":
+            event["rss"] = _current_rss()
+        if self.settings.memory == "tracemalloc":
+            event["traced"], event["traced_peak"] = tracemalloc.get_traced_memory()
+
+        with self._lock:
+            self._events.append(event)
+
+    def flush(self) -> None:
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return
+
+        with self._write_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                for event in events:
+                    f.write(json.dumps(event, default=str) + "\n")
+
+
+_active: StageTimes | None = None
+_tracer: Tracer | None = None
+
+
+def start_tracing(settings: TraceSettings) -> Tracer:
+    """
+    Install the tracer of this process. A tracer inherited through fork
+    belongs to the parent and is replaced.
+    """
+    global _tracer
+    if (_tracer is None or _tracer.pid != os.getpid()
+            or _tracer.settings != settings):
+        _tracer = Tracer(settings)
+    return _tracer
+
+
+def flush_tracing() -> None:
+    if _tracer is not None and _tracer.pid == os.getpid():
+        _tracer.flush()
+
+
+def stop_tracing() -> None:
+    global _tracer
+    flush_tracing()
+    _tracer = None
+
+
+@contextmanager
+def record_stages(times: StageTimes | None = None) -> Iterator[StageTimes]:
+    """Collect the spans of this process into ``times`` while active."""
+    global _active
+    times = StageTimes() if times is None else times
+    previous, _active = _active, times
+    try:
+        yield times
+    finally:
+        _active = previous
+
+
+@contextmanager
+def span(stage: str, **args) -> Iterator[None]:
+    """
+    Time a block as one call of ``stage``; a no-op unless recording or
+    tracing. ``args`` are attached to the trace event.
+    """
+    times = _active
+    tracer = _tracer
+    if times is None and tracer is None:
+        yield
+        return
+
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if times is not None:
+            times.add(stage, seconds)
+        if tracer is not None:
+            tracer.add(stage, start_ns, seconds, args)
+
+
+@contextmanager
+def traced(settings: TraceSettings | None, stage: str, **args) -> Iterator[None]:
+    """
+    Top-level span of a unit of work, e.g. a scene rendered by a worker:
+    installs the process' tracer and flushes its events afterwards.
+    """
+    if settings is None:
+        yield
+        return
+
+    start_tracing(settings)
+    try:
+        with span(stage, **args):
+            yield
+    finally:
+        flush_tracing()
+
+
+# -----------------------------
+# Reports
+# -----------------------------
+
+def collect_trace(directory: str | Path) -> List[dict]:
+    """Events of all processes, ordered by start time."""
+    events = []
+    for path in sorted(Path(directory).glob("trace_*.jsonl")):
+        with open(path, "r") as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    events.sort(key=lambda e: e["ts"])
+    return events
+
+
+def _max(values) -> int | None:
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def summarize_trace(events: List[dict]) -> dict:
+    """
+    Per-stage call counts and times (nested stages are included in their
+    parents' times), memory peaks, and per-process totals.
+    """
+    by_stage: Dict[str, List[dict]] = {}
+    by_pid: Dict[int, List[dict]] = {}
+    for event in events:
+        by_stage.setdefault(event["stage"], []).append(event)
+        by_pid.setdefault(event["pid"], []).append(event)
+
+    stages = {}
+    for stage, items in by_stage.items():
+        durations = [e["dur"] / 1e6 for e in items]
+        stages[stage] = {
+            "calls": len(items),
+            "seconds": sum(durations),
+            "mean_seconds": sum(durations) / len(durations),
+            "max_seconds": max(durations),
+            "max_rss": _max(e.get("rss") for e in items),
+            "max_traced_peak": _max(e.get("traced_peak") for e in items),
+        }
+
+    processes = {
+        str(pid): {
+            "events": len(items),
+            "max_rss": _max(e.get("rss") for e in items),
+            "max_traced_peak": _max(e.get("traced_peak") for e in items),
+        }
+        for pid, items in by_pid.items()
+    }
+
+    elapsed = 0.0
+    if events:
+        elapsed = (max(e["ts"] + e["dur"] for e in events) - events[0]["ts"]) / 1e6
+
+    return {
+        "elapsed_seconds": elapsed,
+        "stages": stages,
+        "processes": processes,
+    }
+
+
+def write_chrome_trace(events: List[dict], path: str | Path) -> None:
+    """Trace Event Format file for chrome://tracing or ui.perfetto.dev."""
+    t0 = events[0]["ts"] if events else 0
+    trace = []
+    for event in events:
+        ts = event["ts"] - t0
+        trace.append({
+            "name": event["stage"],
+            "cat": "render",
+            "ph": "X",
+            "ts": ts,
+            "dur": event["dur"],
+            "pid": event["pid"],
+            "tid": event["tid"],
+            "args": event.get("args", {}),
+        })
+
+        memory = {}
+        if event.get("rss") is not None:
+            memory["rss_mb"] = event["rss"] / 1e6
+        if event.get("traced") is not None:
+            memory["traced_mb"] = event["traced"] / 1e6
+        if memory:
+            trace.append({
+                "name": "memory",
+                "ph": "C",
+                "ts": ts + event["dur"],
+                "pid": event["pid"],
+                "args": memory,
+            })
+
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
@@ -7,6 +7,8 @@ from PIL import Image
 from matplotlib.pyplot import cm
 from typing import Sequence
 
+from rohbau3d.misc.colorize import colorize_instances
+
 
 def euclidean_distance(point, vector):
     """
@@ -66,24 +68,19 @@ def instance_colors(
     inst = np.asarray(instance_ids).reshape(-1)
     classes_arr = None if classes is None else np.asarray(classes).reshape(-1)
 
-    rgb = np.zeros((len(inst), 3), dtype=np.uint8)
-    unique_ids = np.unique(inst)
-
-    for inst_id in unique_ids:
-        mask = inst == inst_id
-        local_seed = (int(inst_id) * 73856093 + seed * 19349663) % (2**32 - 1)
-        rng = np.random.default_rng(local_seed)
-        color = rng.integers(0, 256, size=3, dtype=np.uint8)
-        rgb[mask] = color
+    rgb = colorize_instances(
+        inst,
+        seed=seed,
+        background_id=background_instance_id,
+        background_color=background_color,
+    )
 
-    background_mask = inst == background_instance_id
     if classes_arr is not None:
         if classes_arr.shape[0] != inst.shape[0]:
             raise ValueError(
                 "classes must have the same length as instance_ids")
-        background_mask |= classes_arr == background_class_id
-
-    rgb[background_mask] = np.asarray(background_color, dtype=np.uint8)
+        rgb[classes_arr == background_class_id] = np.asarray(
+            background_color, dtype=np.uint8)
     return rgb
 
 
@@ -1,3 +1,17 @@
-from rohbau3d.render.projection_renderer import render_from_config
+from rohbau3d.render.correspondence import CorrespondenceMap, load_map, open_map
+from rohbau3d.render.projection_renderer import PinholeCamera, cameras_from_array, render_from_config
+from rohbau3d.render.service import RenderRequest, RenderService
+from rohbau3d.render.writer import ImageCodec, ImageWriter
 
-__all__ = ["render_from_config"]
+__all__ = [
+    "CorrespondenceMap",
+    "ImageCodec",
+    "ImageWriter",
+    "PinholeCamera",
+    "RenderRequest",
+    "RenderService",
+    "cameras_from_array",
+    "load_map",
+    "open_map",
+    "render_from_config",
+]
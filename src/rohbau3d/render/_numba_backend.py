@@ -0,0 +1,235 @@
+"""
+Numba kernels for the projection renderer (render.engine: numba).
+
+The kernels reproduce the float32 arithmetic of the numpy engine operation
+by operation, so the outputs are bit-identical. The transcendental functions
+(arctan2, arcsin) are left to numpy: numpy and numba ship different
+implementations whose results differ in the last ulp, which would move
+points across pixel borders.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Tuple
+
+import numba as nb
+import numpy as np
+
+from rohbau3d.misc.tracing import span
+
+_EPS = np.float32(1e-12)
+_PI = np.float32(np.pi)
+_TWO_PI = np.float32(2.0 * np.pi)
+_HALF_PI = np.float32(np.pi / 2.0)
+
+_launch_lock = threading.Lock()
+_configured = False
+
+
+def configure_threading() -> None:
+    """
+    Parallel kernels are launched from render threads with
+    render.parallel.backend: thread. The TBB layer then hangs at interpreter
+    exit and the workqueue layer rejects concurrent launches, so TBB is tried
+    last and launches are serialized; each launch is multi-threaded anyway.
+
+    This changes numba's process-wide layer priority, so it is only called
+    once render.engine: numba is in use, and NUMBA_THREADING_LAYER wins.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    if "NUMBA_THREADING_LAYER" not in os.environ:
+        nb.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+
+
+@nb.njit(parallel=True, cache=True)
+def _equirect_prepare(coord, r, rr, q):
+    for i in nb.prange(coord.shape[0]):
+        ri = r[i] + _EPS
+        rr[i] = ri
+        qi = coord[i, 2] / ri
+        if qi < np.float32(-1.0):
+            qi = np.float32(-1.0)
+        elif qi > np.float32(1.0):
+            qi = np.float32(1.0)
+        q[i] = qi
+
+
+@nb.njit(parallel=True, cache=True)
+def _equirect_pixels(yaw, pitch, width, height, u, v):
+    wm1 = np.float32(width - 1)
+    hm1 = np.float32(height - 1)
+    for i in nb.prange(yaw.shape[0]):
+        ui = np.int32((yaw[i] + _PI) / _TWO_PI * wm1)
+        vi = np.int32((_HALF_PI - pitch[i]) / _PI * hm1)
+        u[i] = min(max(ui, 0), width - 1)
+        v[i] = min(max(vi, 0), height - 1)
+
+
+@nb.njit(parallel=True, cache=True)
+def _cube_pixels(coord, size, face_idx, u, v):
+    sm1 = np.float32(size - 1)
+    for i in nb.prange(coord.shape[0]):
+        x = coord[i, 0]
+        y = coord[i, 1]
+        z = coord[i, 2]
+        ax = abs(x)
+        ay = abs(y)
+        az = abs(z)
+
+        # first maximum wins, like np.argmax over (ax, ay, az)
+        if ax >= ay and ax >= az:
+            if x >= 0:
+                f = 0
+                uc = -y / (ax + _EPS)
+            else:
+                f = 1
+                uc = y / (ax + _EPS)
+            vc = -z / (ax + _EPS)
+        elif ay >= az:
+            if y >= 0:
+                f = 2
+                uc = x / (ay + _EPS)
+            else:
+                f = 3
+                uc = -x / (ay + _EPS)
+            vc = -z / (ay + _EPS)
+        else:
+            uc = x / (az + _EPS)
+            if z >= 0:
+                f = 4
+                vc = y / (az + _EPS)
+            else:
+                f = 5
+                vc = -y / (az + _EPS)
+
+        ui = np.int32((uc + np.float32(1.0)) * np.float32(0.5) * sm1)
+        vi = np.int32((vc + np.float32(1.0)) * np.float32(0.5) * sm1)
+        face_idx[i] = f
+        u[i] = min(max(ui, 0), size - 1)
+        v[i] = min(max(vi, 0), size - 1)
+
+
+# The z-buffer merge stays a serial loop: CPU numba has no atomic min, and
+# a single pass without temporaries is already memory-bound.
+
+@nb.njit(cache=True)
+def _scatter_min(zbuffer, u, v, width, depth_bits, start):
+    for i in range(u.shape[0]):
+        pix = np.int64(v[i]) * width + u[i]
+        key = (np.uint64(depth_bits[i]) << np.uint64(32)) | np.uint64(start + i)
+        if key < zbuffer[pix]:
+            zbuffer[pix] = key
+
+
+@nb.njit(cache=True)
+def _scatter_min_faces(zbuffer, face_idx, u, v, size, depth_bits, start):
+    face_pixels = np.int64(size) * size
+    for i in range(u.shape[0]):
+        pix = face_idx[i] * face_pixels + np.int64(v[i]) * size + u[i]
+        key = (np.uint64(depth_bits[i]) << np.uint64(32)) | np.uint64(start + i)
+        if key < zbuffer[pix]:
+            zbuffer[pix] = key
+
+
+# Every view owns its own z-buffer range, so views run in parallel.
+
+@nb.njit(parallel=True, cache=True)
+def _scatter_views(zbuffer, direction, depth_bits, rotation, intrinsics,
+                   sizes, offsets, near, start):
+    for k in nb.prange(rotation.shape[0]):
+        fx = intrinsics[k, 0]
+        cx = intrinsics[k, 1]
+        cy = intrinsics[k, 2]
+        width = sizes[k, 0]
+        height = sizes[k, 1]
+        for i in range(direction.shape[0]):
+            d0 = direction[i, 0]
+            d1 = direction[i, 1]
+            d2 = direction[i, 2]
+            z = d0 * rotation[k, 2, 0] + d1 * rotation[k, 2, 1] + d2 * rotation[k, 2, 2]
+            if not z > near:
+                continue
+            x = d0 * rotation[k, 0, 0] + d1 * rotation[k, 0, 1] + d2 * rotation[k, 0, 2]
+            y = d0 * rotation[k, 1, 0] + d1 * rotation[k, 1, 1] + d2 * rotation[k, 1, 2]
+            uf = cx + fx * x / z
+            vf = cy - fx * y / z
+            if not (uf >= 0 and uf < width and vf >= 0 and vf < height):
+                continue
+            pix = offsets[k] + np.int64(vf) * width + np.int64(uf)
+            key = (np.uint64(depth_bits[i]) << np.uint64(32)) | np.uint64(start + i)
+            if key < zbuffer[pix]:
+                zbuffer[pix] = key
+
+
+def project_views_into(
+        zbuffer: np.ndarray,
+        direction: np.ndarray,
+        r: np.ndarray,
+        rotation: np.ndarray,
+        intrinsics: np.ndarray,
+        sizes: np.ndarray,
+        offsets: np.ndarray,
+        near: float,
+        start: int) -> None:
+    direction = np.ascontiguousarray(direction, dtype=np.float32)
+    depth = np.ascontiguousarray(r, dtype=np.float32)
+    # projection and z-buffer merge are fused in this kernel
+    with span("zbuffer"), _launch_lock:
+        _scatter_views(zbuffer, direction, depth.view(np.uint32), rotation,
+                       intrinsics, sizes, offsets, np.float32(near), start)
+
+
+def project_equirectangular_into(
+        zbuffer: np.ndarray,
+        coord: np.ndarray,
+        r: np.ndarray,
+        width: int,
+        height: int,
+        start: int) -> Tuple[np.ndarray, np.ndarray]:
+    n = coord.shape[0]
+    coord = np.ascontiguousarray(coord, dtype=np.float32)
+    r = np.ascontiguousarray(r, dtype=np.float32)
+
+    with span("project"):
+        rr = np.empty((n,), dtype=np.float32)
+        q = np.empty((n,), dtype=np.float32)
+        with _launch_lock:
+            _equirect_prepare(coord, r, rr, q)
+
+        yaw = np.arctan2(coord[:, 1], coord[:, 0])
+        pitch = np.arcsin(q)
+
+        u = np.empty((n,), dtype=np.int32)
+        v = np.empty((n,), dtype=np.int32)
+        with _launch_lock:
+            _equirect_pixels(yaw, pitch, width, height, u, v)
+
+    with span("zbuffer"):
+        _scatter_min(zbuffer, u, v, width, rr.view(np.uint32), start)
+    return u, v
+
+
+def project_cube_into(
+        zbuffer: np.ndarray,
+        coord: np.ndarray,
+        r: np.ndarray,
+        size: int,
+        start: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n = coord.shape[0]
+    coord = np.ascontiguousarray(coord, dtype=np.float32)
+    depth = np.ascontiguousarray(r, dtype=np.float32)
+
+    face_idx = np.empty((n,), dtype=np.int32)
+    u = np.empty((n,), dtype=np.int32)
+    v = np.empty((n,), dtype=np.int32)
+    with span("project"), _launch_lock:
+        _cube_pixels(coord, size, face_idx, u, v)
+
+    with span("zbuffer"):
+        _scatter_min_faces(zbuffer, face_idx, u, v, size,
+                           depth.view(np.uint32), start)
+    return face_idx, u, v
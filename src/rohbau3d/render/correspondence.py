@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import zstandard as zstd
+
+from rohbau3d.misc.tracing import span
+
+MAPS_VERSION = 1
+MAPS_SPEC_FILE = "maps.json"
+MAP_ENCODINGS = ("compact", "zstd", "legacy")
+
+# approximate number of values per zstd frame; a read decompresses whole frames
+_FRAME_VALUES = 1 << 20
+_EMPTY_ID = 0xFFFFFFFF
+
+
+def _kind(name: str) -> str:
+    for kind in ("pixel_to_point", "point_to_face_pixel", "point_to_pixel"):
+        if name.startswith(kind):
+            return kind
+    raise ValueError(f"Unknown correspondence map '{name}'.")
+
+
+def _logical_dtype(kind: str) -> np.dtype:
+    return np.dtype(np.int64 if kind == "pixel_to_point" else np.int32)
+
+
+def storage_dtype(name: str, extent: int, encoding: str = "compact") -> np.dtype:
+    """
+    Smallest on-disk dtype of a map whose pixel coordinates are < extent:
+    uint32 point ids, uint16 pixel coordinates where they fit and a
+    structured (face uint8, u, v) record for cube maps.
+    """
+    kind = _kind(name)
+    if encoding == "legacy":
+        return _logical_dtype(kind)
+    if kind == "pixel_to_point":
+        return np.dtype(np.uint32)
+
+    uv = np.uint16 if extent <= np.iinfo(np.uint16).max + 1 else np.uint32
+    if kind == "point_to_pixel":
+        return np.dtype(uv)
+    return np.dtype([("face", np.uint8), ("u", uv), ("v", uv)])
+
+
+def _encode(values: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    if dtype.names is None:
+        # -1 (empty pixel) wraps to the uint32 sentinel
+        return values.astype(dtype)
+    out = np.empty((values.shape[0],), dtype=dtype)
+    for i, field in enumerate(dtype.names):
+        out[field] = values[:, i]
+    return out
+
+
+def _decode(rows: np.ndarray, kind: str) -> np.ndarray:
+    if rows.dtype.names is not None:
+        return np.stack([rows[f] for f in rows.dtype.names],
+                        axis=-1).astype(np.int32)
+    if rows.dtype == _logical_dtype(kind):
+        return rows
+    out = rows.astype(_logical_dtype(kind))
+    if kind == "pixel_to_point":
+        out[rows == _EMPTY_ID] = -1
+    return out
+
+
+def read_maps_spec(directory: str | Path) -> Dict[str, dict]:
+    p = Path(directory) / MAPS_SPEC_FILE
+    if not p.exists():
+        return {}
+    with open(p, "r") as f:
+        return json.load(f).get("maps", {})
+
+
+def _write_spec_entry(directory: Path, name: str, entry: dict) -> None:
+    maps = read_maps_spec(directory)
+    maps[name] = entry
+    with open(directory / MAPS_SPEC_FILE, "w") as f:
+        json.dump({"version": MAPS_VERSION, "maps": maps}, f, indent=2)
+
+
+# -----------------------------
+# Writer
+# -----------------------------
+
+class MapWriter:
+    """
+    Writes one correspondence map in row order. ``write`` takes the logical
+    values (int64 point ids with -1 for empty pixels, int32 pixel
+    coordinates) and encodes them for storage.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        name: str,
+        shape: Tuple[int, ...],
+        *,
+        extent: int,
+        encoding: str = "compact",
+        level: int = 3,
+    ) -> None:
+        if encoding not in MAP_ENCODINGS:
+            raise ValueError(
+                f"Map encoding must be one of: {', '.join(map(repr, MAP_ENCODINGS))}.")
+
+        self.directory = Path(directory)
+        self.name = name
+        self.encoding = encoding
+        self.dtype = storage_dtype(name, extent, encoding)
+        # structured cube records drop the trailing (face, u, v) axis
+        self.shape = tuple(shape[:1]) if self.dtype.names else tuple(shape)
+
+        row_values = int(np.prod(self.shape[1:], dtype=np.int64))
+        self.chunk_rows = max(1, _FRAME_VALUES // max(row_values, 1))
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        npy_path = self.directory / f"{name}.npy"
+        zst_path = self.directory / f"{name}.zst"
+        # drop the file of a previous render with another encoding
+        (npy_path if encoding == "zstd" else zst_path).unlink(missing_ok=True)
+
+        self._rows = 0
+        if encoding == "zstd":
+            self._file = open(zst_path, "wb")
+            self._compressor = zstd.ZstdCompressor(level=level)
+            self._pending: List[np.ndarray] = []
+            self._pending_rows = 0
+            self._offsets = [0]
+        else:
+            self._out = np.lib.format.open_memmap(
+                npy_path, mode="w+", dtype=self.dtype, shape=self.shape)
+
+    def write(self, start: int, values: np.ndarray) -> None:
+        if start != self._rows:
+            raise ValueError(
+                f"{self.name}: rows must be written in order "
+                f"(expected row {self._rows}, got {start}).")
+
+        with span("maps"):
+            encoded = _encode(np.asarray(values), self.dtype)
+            self._rows += encoded.shape[0]
+
+            if self.encoding != "zstd":
+                self._out[start:self._rows] = encoded
+                return
+
+            self._pending.append(encoded)
+            self._pending_rows += encoded.shape[0]
+            while self._pending_rows >= self.chunk_rows:
+                self._flush_frame(self.chunk_rows)
+
+    def _flush_frame(self, rows: int) -> None:
+        buf = np.concatenate(self._pending) if len(
+            self._pending) > 1 else self._pending[0]
+        frame, rest = buf[:rows], buf[rows:]
+        self._pending = [rest] if rest.shape[0] else []
+        self._pending_rows = rest.shape[0]
+
+        self._file.write(self._compressor.compress(
+            np.ascontiguousarray(frame).tobytes()))
+        self._offsets.append(self._file.tell())
+
+    def close(self) -> None:
+        if self._rows != self.shape[0]:
+            raise ValueError(
+                f"{self.name}: wrote {self._rows} of {self.shape[0]} rows.")
+
+        entry = {
+            "encoding": self.encoding,
+            "dtype": np.lib.format.dtype_to_descr(self.dtype),
+            "shape": list(self.shape),
+        }
+
+        with span("maps"):
+            if self.encoding == "zstd":
+                if self._pending_rows:
+                    self._flush_frame(self._pending_rows)
+                self._file.close()
+                entry["chunk_rows"] = self.chunk_rows
+                entry["offsets"] = self._offsets
+            else:
+                self._out.flush()
+                del self._out
+
+        _write_spec_entry(self.directory, self.name, entry)
+
+    def __enter__(self) -> MapWriter:
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        elif self.encoding == "zstd":
+            self._file.close()
+
+
+def save_map(
+        directory: str | Path,
+        name: str,
+        values: np.ndarray,
+        *,
+        extent: int,
+        encoding: str = "compact") -> None:
+    with MapWriter(directory, name, values.shape,
+                   extent=extent, encoding=encoding) as writer:
+        writer.write(0, values)
+
+
+# -----------------------------
+# Reader
+# -----------------------------
+
+class _ZstdRows:
+    """Row access to a memory-mapped file of independent zstd frames."""
+
+    def __init__(self, path: Path, spec: dict) -> None:
+        self.data = np.memmap(path, dtype=np.uint8, mode="r") \
+            if path.stat().st_size else np.zeros((0,), dtype=np.uint8)
+        self.dtype = np.lib.format.descr_to_dtype(
+            _descr_from_json(spec["dtype"]))
+        self.shape = tuple(spec["shape"])
+        self.chunk_rows = int(spec["chunk_rows"])
+        self.offsets = spec["offsets"]
+        self._decompressor = zstd.ZstdDecompressor()
+
+    def frame(self, i: int) -> np.ndarray:
+        blob = self.data[self.offsets[i]:self.offsets[i + 1]]
+        rows = min(self.chunk_rows, self.shape[0] - i * self.chunk_rows)
+        raw = self._decompressor.decompress(blob.tobytes())
+        return np.frombuffer(raw, dtype=self.dtype).reshape(
+            (rows,) + self.shape[1:])
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        out = np.empty((rows.shape[0],) + self.shape[1:], dtype=self.dtype)
+        frames = rows // self.chunk_rows
+        order = np.argsort(frames, kind="stable")
+        bounds = np.flatnonzero(np.diff(frames[order])) + 1
+        for sel in np.split(order, bounds):
+            if sel.shape[0] == 0:
+                continue
+            f = int(frames[sel[0]])
+            out[sel] = self.frame(f)[rows[sel] - f * self.chunk_rows]
+        return out
+
+    def all(self) -> np.ndarray:
+        if len(self.offsets) == 1:
+            return np.empty(self.shape, dtype=self.dtype)
+        return np.concatenate([self.frame(i) for i in range(len(self.offsets) - 1)])
+
+
+def _descr_from_json(descr):
+    # json turns the (name, type) tuples of structured descrs into lists
+    if isinstance(descr, list):
+        return [tuple(field) for field in descr]
+    return descr
+
+
+class CorrespondenceMap:
+    """
+    Read-only, array-like view of a stored map that decodes on access to
+    the logical arrays of the legacy format: int64 point ids with -1 for
+    empty pixels, int32 (u, v) or (face, u, v) pixel coordinates.
+    """
+
+    def __init__(self, data: np.ndarray | _ZstdRows, kind: str) -> None:
+        self.data = data
+        self.kind = kind
+        self.dtype = _logical_dtype(kind)
+        shape = tuple(data.shape)
+        self.shape = shape + (3,) if data.dtype.names else shape
+        self.ndim = len(self.shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def _take(self, idx) -> np.ndarray:
+        if not isinstance(self.data, _ZstdRows):
+            return self.data[idx]
+
+        n = self.shape[0]
+        if isinstance(idx, (int, np.integer)):
+            return self.data.take(np.array([idx % n]))[0]
+        if isinstance(idx, slice):
+            r = range(n)[idx]
+            return self.data.take(np.arange(r.start, r.stop, r.step))
+        rows = np.asarray(idx)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return self.data.take(np.where(rows < 0, rows + n, rows).astype(np.int64))
+
+    def __getitem__(self, idx) -> np.ndarray:
+        if isinstance(idx, tuple):
+            return self[idx[0]][(slice(None),) + idx[1:]]
+        return _decode(np.asarray(self._take(idx)), self.kind)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        rows = self.data.all() if isinstance(
+            self.data, _ZstdRows) else np.asarray(self.data)
+        out = _decode(rows, self.kind)
+        return out if dtype is None else out.astype(dtype)
+
+
+def open_map(
+        directory: str | Path,
+        name: str,
+        *,
+        mmap_mode: str | None = "r") -> CorrespondenceMap | None:
+    """
+    Open a correspondence map of a panorama or cube map directory, e.g.
+    ``open_map(scene_out / "panorama", "pixel_to_point")``. Maps written
+    before the compact formats (plain int64/int32 .npy) are read as well.
+    """
+    directory = Path(directory)
+    kind = _kind(name)
+    spec = read_maps_spec(directory).get(name, {})
+
+    if spec.get("encoding") == "zstd":
+        p = directory / f"{name}.zst"
+        if not p.exists():
+            return None
+        return CorrespondenceMap(_ZstdRows(p, spec), kind)
+
+    p = directory / f"{name}.npy"
+    if not p.exists():
+        return None
+    return CorrespondenceMap(np.load(p, mmap_mode=mmap_mode), kind)
+
+
+def map_exists(directory: str | Path, name: str) -> bool:
+    directory = Path(directory)
+    return (directory / f"{name}.npy").exists() or (directory / f"{name}.zst").exists()
+
+
+def load_map(directory: str | Path, name: str) -> np.ndarray | None:
+    view = open_map(directory, name, mmap_mode=None)
+    return None if view is None else np.asarray(view)
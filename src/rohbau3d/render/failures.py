@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+FAILURE_REPORT_FILE = "render_failures.json"
+
+
+@dataclass(frozen=True)
+class ErrorPolicy:
+    """
+    What to do when a scene fails to render.
+
+    abort:    stop the run at the first failure (default).
+    skip:     record the failure and continue with the other scenes.
+    retry:N:  render a failed scene up to N more times, then skip it.
+    """
+    mode: str = "abort"
+    retries: int = 0
+
+    @classmethod
+    def parse(cls, value: str | None) -> ErrorPolicy:
+        text = "abort" if value is None else str(value).strip().lower()
+
+        if text in ("abort", "skip"):
+            return cls(mode=text)
+
+        if text.startswith("retry"):
+            _, _, n = text.partition(":")
+            try:
+                retries = int(n) if n else 1
+            except ValueError:
+                retries = -1
+            if retries >= 1:
+                return cls(mode="retry", retries=retries)
+
+        raise ValueError(
+            "render.on_error must be 'abort', 'skip' or 'retry:N' with N >= 1.")
+
+    def should_retry(self, attempts: int) -> bool:
+        return self.mode == "retry" and attempts <= self.retries
+
+    def __str__(self) -> str:
+        return f"retry:{self.retries}" if self.mode == "retry" else self.mode
+
+
+class FailureReport:
+    """
+    Structured record of failed scenes, written as render_failures.json
+    into the output root. A later run can restrict itself to the scenes
+    listed there (see ``failed_scenes``).
+    """
+
+    def __init__(self, path: str | Path, *, config: str | Path | None = None) -> None:
+        self.path = Path(path)
+        self.config = None if config is None else str(config)
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.failures: List[Dict] = []
+
+    def add(self, scene_dir: Path, exc: BaseException, attempts: int) -> None:
+        self.failures.append({
+            "site": scene_dir.parent.name,
+            "scene": scene_dir.name,
+            "scene_dir": str(scene_dir),
+            "attempts": attempts,
+            "error": type(exc).__name__,
+            "message": str(exc),
+            "traceback": "".join(traceback.format_exception(
+                type(exc), exc, exc.__traceback__)),
+        })
+
+    def write(self, *, total: int, completed: int, aborted: bool = False) -> None:
+        """Write the report; a run without failures removes a stale one."""
+        if not self.failures:
+            self.path.unlink(missing_ok=True)
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({
+                "config": self.config,
+                "started": self.started,
+                "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "aborted": aborted,
+                "total": total,
+                "completed": completed,
+                "failed": self.failures,
+            }, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def failed_scenes(path: str | Path) -> List[Path]:
+    """Scene directories listed in a failure report."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"No failure report found: {path}")
+
+    with open(path, "r") as f:
+        report = json.load(f)
+    return [Path(item["scene_dir"]) for item in report.get("failed", [])]
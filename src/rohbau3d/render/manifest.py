@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE = "render_manifest.json"
+FINGERPRINT_MODES = ("stat", "hash")
+
+_HASH_BLOCK = 16 * 1024 * 1024
+
+
+def _file_fingerprint(path: Path, mode: str) -> list | str:
+    if mode == "stat":
+        st = path.stat()
+        return [st.st_size, st.st_mtime_ns]
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def input_fingerprint(
+        scene_dir: str | Path,
+        name: str,
+        *,
+        subsampled: bool = False,
+        mode: str = "stat") -> Dict[str, list | str]:
+    """
+    Fingerprints of the files a feature is read from: the raw and compact
+    .npy and, for subsampled renders, sample_idx.npy. Empty if the feature
+    does not exist.
+    """
+    scene_dir = Path(scene_dir)
+    files = [f"{name}.npy", f"{name}.compact.npy"]
+    out = {f: _file_fingerprint(scene_dir / f, mode)
+           for f in files if (scene_dir / f).exists()}
+
+    if out and subsampled and (scene_dir / "sample_idx.npy").exists():
+        out["sample_idx.npy"] = _file_fingerprint(
+            scene_dir / "sample_idx.npy", mode)
+    return out
+
+
+def _jsonable(value):
+    # tuples and Paths compare equal to what a manifest reads back
+    return json.loads(json.dumps(value, default=str))
+
+
+class SceneManifest:
+    """
+    Per-scene record of what was rendered from which inputs and options,
+    stored as render_manifest.json in the scene's output directory.
+
+    Each projection (e.g. "panorama", "cube_map") holds its options, the
+    coord fingerprint and one entry per feature with the feature's input
+    fingerprint and output codec. ``subsampled`` tells which cloud the
+    directory holds; a manifest of the other one is ignored.
+    """
+
+    def __init__(self, scene_out_dir: str | Path, *,
+                 subsampled: bool = False) -> None:
+        self.path = Path(scene_out_dir) / MANIFEST_FILE
+        self.subsampled = subsampled
+        self.projections: Dict[str, dict] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            if (data.get("version") == MANIFEST_VERSION
+                    and data.get("subsampled", subsampled) == subsampled):
+                self.projections = data.get("projections", {})
+
+    def stale_features(
+        self,
+        projection: str,
+        options: Mapping,
+        coord: Mapping,
+        features: Mapping[str, dict],
+        exists: Callable[[str | None], bool],
+    ) -> List[str]:
+        """
+        Features of a projection that must be rendered again.
+        ``exists(None)`` checks the projection's maps, ``exists(feature)``
+        the images of one feature.
+        """
+        renderable = [f for f, entry in features.items() if entry["input"]]
+        if not self.maps_valid(projection, options, coord, exists):
+            return renderable
+
+        state = self.projections[projection]
+
+        stale = []
+        for feat in renderable:
+            stored = state["features"].get(feat)
+            current = _jsonable(features[feat])
+            if (stored is None
+                    or {k: stored.get(k) for k in current} != current
+                    or (stored.get("rendered", True) and not exists(feat))):
+                stale.append(feat)
+        return stale
+
+    def maps_valid(
+        self,
+        projection: str,
+        options: Mapping,
+        coord: Mapping,
+        exists: Callable[[str | None], bool],
+    ) -> bool:
+        """
+        The stored correspondence maps of a projection were rendered from
+        the current coord with the current options, so the visibility they
+        encode can be reused for other features.
+        """
+        state = self.projections.get(projection)
+        return (state is not None
+                and state["options"] == _jsonable(options)
+                and state["coord"] == _jsonable(coord)
+                and exists(None))
+
+    def invalidate(self, projections: Iterable[str]) -> None:
+        for projection in projections:
+            self.projections.pop(projection, None)
+        self.save()
+
+    def update(
+        self,
+        projection: str,
+        options: Mapping,
+        coord: Mapping,
+        features: Mapping[str, dict],
+    ) -> None:
+        self.projections[projection] = _jsonable({
+            "options": options,
+            "coord": coord,
+            "features": features,
+        })
+        self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": MANIFEST_VERSION,
+                       "subsampled": self.subsampled,
+                       "projections": self.projections}, f, indent=2)
+        os.replace(tmp, self.path)
@@ -1,17 +1,50 @@
 from __future__ import annotations
 
+import json
 import os
+import shutil
+import sys
+import threading
 import time
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import resource_tracker
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    BrokenExecutor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 import logging
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
 
 import numpy as np
-from PIL import Image
 
+from rohbau3d.data.cache import SceneCache
+from rohbau3d.data.scene import load_feature, open_feature
+from rohbau3d.misc.colorize import apply_lut, colorize_instances, hex_to_rgb, label_lut
 from rohbau3d.misc.config import load_config
+from rohbau3d.misc.metrics import JobMetrics, MetricsExporter
+from rohbau3d.misc.tracing import (
+    TraceSettings,
+    collect_trace,
+    span,
+    start_tracing,
+    stop_tracing,
+    summarize_trace,
+    traced,
+    write_chrome_trace,
+)
+from rohbau3d.render.correspondence import MAP_ENCODINGS, MapWriter, map_exists, open_map, save_map
+from rohbau3d.render.failures import FAILURE_REPORT_FILE, ErrorPolicy, FailureReport, failed_scenes
+from rohbau3d.render.manifest import FINGERPRINT_MODES, SceneManifest, input_fingerprint
+from rohbau3d.render.scheduler import MemoryScheduler, SceneJob, estimate_scene_job, parse_bytes
+from rohbau3d.render.sharding import LeaseStore, default_node_name, default_run_id, run_tag, shard_scenes
+from rohbau3d.render.shared import SharedArrays, SharedLayout
+from rohbau3d.render.tiles import TilePyramid, TileSettings, tile_dirs
+from rohbau3d.render.writer import ImageCodec, ImageWriter, WriteSession, codec_for, codecs_from_config
 
 ROHBAU3D_HEADER = """
     ____        __    __               _____ ____     __  __      __
@@ -45,6 +78,23 @@ ROHBAU3D_COLOR_MAP = {
 
 _CUBE_FACES = ("pos_x", "neg_x", "pos_y", "neg_y", "pos_z", "neg_z")
 _PROGRESS_EVERY = 10
+# block size of the memory-mapped context of feature-only re-renders
+_GATHER_CHUNK = 4_000_000
+
+TRACE_REPORT_FILE = "render_trace.json"
+TRACE_CHROME_FILE = "render_trace.chrome.json"
+# per-process event files while tracing; merged and removed at the end
+_TRACE_DIR = ".render_trace"
+# subsampled outputs of a scene, below its full-resolution outputs
+SUBSAMPLED_DIR = "subsampled"
+
+
+def _tagged(name: str, tag: str | None) -> str:
+    """Run file of one node of a distributed run, e.g. render_failures.<tag>.json."""
+    if tag is None:
+        return name
+    base, ext = os.path.splitext(name)
+    return f"{base}.{tag}{ext}"
 
 
 @dataclass
@@ -69,6 +119,29 @@ class RenderOptions:
     pano_height: int
     cube_size: int
     selected_features: tuple
+    subsampled: bool = False
+    pano_resolutions: tuple = ()
+    chunk_size: int | None = None
+    engine: str = "numpy"
+    image_codecs: Dict[str, ImageCodec] | None = None
+    image_writers: int = 2
+    map_encoding: str = "compact"
+    fingerprint: str = "stat"
+    force: bool = False
+    reuse_maps: bool = True
+    cameras: tuple = ()
+    trace: TraceSettings | None = None
+    tiles: TileSettings | None = None
+
+
+def _scene_output_dir(
+        output_root: Path, scene_dir: Path, subsampled: bool) -> Path:
+    """
+    Outputs of a scene. Subsampled renders get their own directory below
+    the full-resolution outputs, so that neither overwrites the other.
+    """
+    scene_out = Path(output_root) / scene_dir.parent.name / scene_dir.name
+    return scene_out / SUBSAMPLED_DIR if subsampled else scene_out
 
 
 def _format_duration(seconds: float) -> str:
@@ -84,17 +157,70 @@ def _format_duration(seconds: float) -> str:
     return f"{seconds}s"
 
 
+def _written_bytes(scene_out: Path, since: float) -> int:
+    """Size of the files below scene_out modified since ``since`` (epoch)."""
+    total = 0
+    for root, _, files in os.walk(scene_out):
+        for name in files:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            if st.st_mtime >= since:
+                total += st.st_size
+    return total
+
+
 class _ProgressLogger:
-    def __init__(self, *, total: int, log: logging.Logger) -> None:
+    """
+    Logs progress every _PROGRESS_EVERY scenes and keeps the live JobMetrics
+    (throughput, worker slots, queue depth) published by a MetricsExporter.
+    """
+
+    def __init__(self, *, total: int, log: logging.Logger,
+                 workers: int = 1, output_root: Path | None = None,
+                 subsampled: bool = False) -> None:
         self.total = total
         self.log = log
         self.start_time = time.monotonic()
+        self.output_root = output_root
+        self.subsampled = subsampled
+        self.metrics = JobMetrics("render", total=total, unit="scenes", workers=workers)
+        # scene -> (worker slot, wall time the attempt started)
+        self._running: Dict[Path, tuple[int, float]] = {}
+
+    def started(self, scene_dir: Path, slot: int | None = None) -> None:
+        self._running[scene_dir] = (self.metrics.start(slot), time.time())
+
+    def claimed_elsewhere(self) -> None:
+        """A selected scene that another node renders."""
+        self.total -= 1
+        self.metrics.drop()
+
+    def finished(self, scene_dir: Path, *, ok: bool | None) -> None:
+        """ok: True rendered, False failed, None failed but retried."""
+        slot, since = self._running.pop(scene_dir, (None, 0.0))
+        if not ok or self.output_root is None:
+            self.metrics.finish(slot, ok=ok)
+            return
+
+        # outputs older than the attempt were skipped; file times come from a
+        # coarse kernel clock that may lag time.time() by a tick
+        written = _written_bytes(
+            _scene_output_dir(self.output_root, scene_dir, self.subsampled),
+            since - 0.05)
+        points = 0
+        if written:
+            coord = open_feature(scene_dir, "coord", subsampled=self.subsampled)
+            points = 0 if coord is None else int(coord.shape[0])
+        self.metrics.finish(
+            slot, ok=True, skipped=not written, points=points, bytes_written=written)
 
     def maybe_log(self, *, done: int, failed: int) -> None:
-        if done <= 0:
+        if done + failed <= 0:
             return
 
-        if done % _PROGRESS_EVERY != 0:
+        if (done + failed) % _PROGRESS_EVERY != 0:
             return
 
         self._log_progress(done=done, failed=failed)
@@ -115,9 +241,10 @@ class _ProgressLogger:
     def _log_progress(self, *, done: int, failed: int) -> None:
         elapsed = time.monotonic() - self.start_time
         rate = done / elapsed if elapsed > 0 else 0.0
-        remaining = max(self.total - done, 0)
+        remaining = max(self.total - done - failed, 0)
         eta = remaining / rate if rate > 0 else 0.0
-        percent = 100.0 * done / self.total if self.total else 100.0
+        processed = done + failed
+        percent = 100.0 * processed / self.total if self.total else 100.0
 
         self.log.info(
             "Progress: %d/%d scenes completed, %d failed, %.1f%%, %.2f scenes/s, elapsed %s, ETA %s.",
@@ -131,38 +258,31 @@ class _ProgressLogger:
         )
 
 
-def _hex_to_rgb(hex_color: str) -> np.ndarray:
-    h = hex_color.lstrip("#")
-    return np.array([int(h[0:2], 16), int(h[2:4], 16),
-                    int(h[4:6], 16)], dtype=np.uint8)
-
+_CLASS_LUT = label_lut(
+    {k: hex_to_rgb(v) for k, v in ROHBAU3D_COLOR_MAP.items()})
+_BACKGROUND_COLOR = hex_to_rgb(ROHBAU3D_COLOR_MAP[0])
 
-def _build_class_lut() -> Dict[int, np.ndarray]:
-    return {k: _hex_to_rgb(v) for k, v in ROHBAU3D_COLOR_MAP.items()}
 
-
-def _stable_instance_color(instance_id: int) -> np.ndarray:
-    if instance_id == 0:
-        return _hex_to_rgb(ROHBAU3D_COLOR_MAP[0])
-    rng = np.random.default_rng(seed=int(instance_id))
-    return rng.integers(32, 256, size=3, dtype=np.uint8)
-
-
-def _to_uint8_rgb(color: np.ndarray) -> np.ndarray:
+def _to_uint8_rgb(color: np.ndarray,
+                  cmax: float | None = None) -> np.ndarray:
     if color.dtype == np.uint8:
         return color
     c = color.astype(np.float32)
-    if c.max() <= 1.0:
+    if (c.max() if cmax is None else cmax) <= 1.0:
         c = c * 255.0
     return np.clip(c, 0.0, 255.0).astype(np.uint8)
 
 
-def _normalize_to_uint8(values: np.ndarray) -> np.ndarray:
+def _normalize_to_uint8(
+        values: np.ndarray,
+        vmin: float | None = None,
+        vmax: float | None = None) -> np.ndarray:
     v = values.astype(np.float32).reshape(-1)
     if v.size == 0:
         return np.zeros((0,), dtype=np.uint8)
-    vmin = float(np.nanmin(v))
-    vmax = float(np.nanmax(v))
+    if vmin is None or vmax is None:
+        vmin = float(np.nanmin(v))
+        vmax = float(np.nanmax(v))
     if not np.isfinite(vmin) or not np.isfinite(
             vmax) or abs(vmax - vmin) < 1e-12:
         return np.zeros_like(v, dtype=np.uint8)
@@ -170,24 +290,6 @@ def _normalize_to_uint8(values: np.ndarray) -> np.ndarray:
     return np.clip(np.round(out * 255.0), 0.0, 255.0).astype(np.uint8)
 
 
-def _colorize_class(class_ids: np.ndarray,
-                    lut: Dict[int, np.ndarray]) -> np.ndarray:
-    ids = class_ids.astype(np.int64).reshape(-1)
-    out = np.zeros((ids.shape[0], 3), dtype=np.uint8)
-    for cid in np.unique(ids):
-        out[ids == cid] = lut.get(int(cid), np.array(
-            [255, 255, 255], dtype=np.uint8))
-    return out
-
-
-def _colorize_instance(instance_ids: np.ndarray) -> np.ndarray:
-    ids = instance_ids.astype(np.int64).reshape(-1)
-    out = np.zeros((ids.shape[0], 3), dtype=np.uint8)
-    for iid in np.unique(ids):
-        out[ids == iid] = _stable_instance_color(int(iid))
-    return out
-
-
 def _discover_scenes(
         data_root: Path,
         site: str | None,
@@ -221,65 +323,117 @@ def _discover_scenes(
     return scenes
 
 
-def _load_scene(scene_dir: Path) -> SceneData:
-    def _load(name: str) -> np.ndarray | None:
-        p = scene_dir / f"{name}.npy"
-        return np.load(p) if p.exists() else None
+def _load_scene(
+        scene_dir: Path,
+        cache: SceneCache | None = None,
+        subsampled: bool = False,
+        mmap: bool = False) -> SceneData:
+    """
+    With mmap=True features stay on disk and coord keeps its stored dtype;
+    the streaming render path casts it block by block. Raw features are
+    memory-mapped, compact ones decode and subsampled ones gather only the
+    rows that are read, so no encoding is materialized as a whole.
+    """
+    def _load(name: str):
+        if cache is not None:
+            return cache.get(scene_dir, name, subsampled=subsampled)
+        if mmap:
+            return open_feature(scene_dir, name, subsampled=subsampled)
+        return load_feature(scene_dir, name, subsampled=subsampled)
+
+    with span("load"):
+        coord = _load("coord")
+        if coord is None:
+            raise FileNotFoundError(f"Missing coord.npy in {scene_dir}")
+
+        site_name = scene_dir.parent.name
+
+        return SceneData(
+            site_name=site_name,
+            scene_name=scene_dir.name,
+            scene_dir=scene_dir,
+            coord=coord if mmap else coord.astype(np.float32),
+            color=_load("color"),
+            intensity=_load("intensity"),
+            normal=_load("normal"),
+            class_id=_load("class"),
+            instance_id=_load("instance"),
+        )
 
-    coord = _load("coord")
-    if coord is None:
-        raise FileNotFoundError(f"Missing coord.npy in {scene_dir}")
 
-    site_name = scene_dir.parent.name
+_EMPTY_KEY = np.uint64(np.iinfo(np.uint64).max)
+_ID_BITS = np.uint64(32)
+_ID_MASK = np.uint64(0xFFFFFFFF)
 
-    return SceneData(
-        site_name=site_name,
-        scene_name=scene_dir.name,
-        scene_dir=scene_dir,
-        coord=coord.astype(np.float32),
-        color=_load("color"),
-        intensity=_load("intensity"),
-        normal=_load("normal"),
-        class_id=_load("class"),
-        instance_id=_load("instance"),
-    )
 
+def _pack_depth_keys(depth: np.ndarray, point_ids: np.ndarray) -> np.ndarray:
+    # non-negative float32 bit patterns order like the values themselves,
+    # so (depth bits << 32 | point id) compares by depth, then by point id
+    bits = np.ascontiguousarray(depth, dtype=np.float32).view(np.uint32)
+    keys = bits.astype(np.uint64) << _ID_BITS
+    keys |= point_ids.astype(np.uint64, copy=False)
+    return keys
 
-def _save_png(path: Path, image: np.ndarray) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    Image.fromarray(image).save(path)
 
+def _new_zbuffer(num_pixels: int) -> np.ndarray:
+    return np.full((num_pixels,), _EMPTY_KEY, dtype=np.uint64)
 
-def _best_point_per_pixel(
+
+def _zbuffer_update(
+        zbuffer: np.ndarray,
         linear_pix: np.ndarray,
         depth: np.ndarray,
-        num_pixels: int) -> np.ndarray:
-    best_depth = np.full((num_pixels,), np.inf, dtype=np.float32)
-    best_point = np.full((num_pixels,), -1, dtype=np.int64)
+        point_ids: np.ndarray) -> None:
+    np.minimum.at(zbuffer, linear_pix, _pack_depth_keys(depth, point_ids))
 
-    order = np.argsort(depth)
-    sorted_pix = linear_pix[order]
-    _, first_pos = np.unique(sorted_pix, return_index=True)
 
-    selected = order[first_pos]
-    pix = linear_pix[selected]
+def _zbuffer_points(zbuffer: np.ndarray) -> np.ndarray:
+    best_point = (zbuffer & _ID_MASK).astype(np.int64)
+    best_point[zbuffer == _EMPTY_KEY] = -1
+    return best_point
 
-    best_point[pix] = selected
-    best_depth[pix] = depth[selected]
 
-    return best_point
+def _zbuffer_depth(zbuffer: np.ndarray) -> np.ndarray:
+    depth = (zbuffer >> _ID_BITS).astype(np.uint32).view(np.float32)
+    depth[zbuffer == _EMPTY_KEY] = np.inf
+    return depth
+
+
+def _best_point_per_pixel(
+        linear_pix: np.ndarray,
+        depth: np.ndarray,
+        num_pixels: int) -> np.ndarray:
+    """
+    Linear-time z-buffer: one scatter-min of packed (depth, point id) keys.
+    Ties in depth resolve to the lowest point id.
+    """
+    if depth.shape[0] > int(_ID_MASK):
+        raise ValueError("The z-buffer supports at most 2**32 - 1 points.")
+
+    with span("zbuffer"):
+        zbuffer = _new_zbuffer(num_pixels)
+        _zbuffer_update(
+            zbuffer,
+            linear_pix,
+            depth,
+            np.arange(depth.shape[0], dtype=np.uint64),
+        )
+        return _zbuffer_points(zbuffer)
 
 
 def _project_equirectangular(
     coord: np.ndarray,
     width: int,
     height: int,
+    r: np.ndarray | None = None,
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     x = coord[:, 0]
     y = coord[:, 1]
     z = coord[:, 2]
 
-    r = np.linalg.norm(coord, axis=1) + 1e-12
+    if r is None:
+        r = np.linalg.norm(coord, axis=1)
+    r = r + 1e-12
     yaw = np.arctan2(y, x)
     pitch = np.arcsin(np.clip(z / r, -1.0, 1.0))
 
@@ -293,7 +447,8 @@ def _project_equirectangular(
 
 
 def _project_cube(coord: np.ndarray,
-                  size: int) -> Tuple[np.ndarray,
+                  size: int,
+                  r: np.ndarray | None = None) -> Tuple[np.ndarray,
                                       np.ndarray,
                                       np.ndarray,
                                       np.ndarray]:
@@ -351,169 +506,1713 @@ def _project_cube(coord: np.ndarray,
     u = np.clip(u, 0, size - 1)
     v = np.clip(v, 0, size - 1)
 
-    depth = np.linalg.norm(coord, axis=1).astype(np.float32)
+    if r is None:
+        r = np.linalg.norm(coord, axis=1)
+    depth = r.astype(np.float32, copy=False)
 
     return face_idx, u, v, depth
 
 
-def _make_feature_arrays(scene: SceneData) -> Dict[str, np.ndarray]:
-    features: Dict[str, np.ndarray] = {}
-    n = scene.coord.shape[0]
+_ENGINES = ("numpy", "numba")
 
-    features["depth"] = scene.coord
 
-    if scene.color is not None and scene.color.shape[0] == n:
-        features["color"] = _to_uint8_rgb(scene.color[:, :3])
+def _resolve_engine(engine: str) -> str:
+    engine = str(engine).lower()
+    if engine not in _ENGINES:
+        raise ValueError(
+            f"render.engine must be one of: {', '.join(map(repr, _ENGINES))}.")
+
+    if engine == "numba":
+        try:
+            _numba_kernels()
+        except ImportError:
+            logging.getLogger(__name__).warning(
+                "render.engine=numba requested but numba is not installed; "
+                "falling back to numpy.")
+            return "numpy"
+
+    return engine
+
+
+def _numba_kernels():
+    """The numba backend, with its threading layer selected on first use."""
+    from rohbau3d.render import _numba_backend
+    _numba_backend.configure_threading()
+    return _numba_backend
+
+
+def _project_equirectangular_into(
+        zbuffer: np.ndarray,
+        coord: np.ndarray,
+        r: np.ndarray,
+        width: int,
+        height: int,
+        start: int,
+        engine: str = "numpy") -> Tuple[np.ndarray, np.ndarray]:
+    """Project a block of points and merge it into the panorama z-buffer."""
+    if engine == "numba":
+        return _numba_kernels().project_equirectangular_into(
+            zbuffer, coord, r, width, height, start)
+
+    with span("project"):
+        u, v, depth = _project_equirectangular(
+            coord, width=width, height=height, r=r)
+    with span("zbuffer"):
+        _zbuffer_update(
+            zbuffer,
+            v * width + u,
+            depth,
+            np.arange(start, start + depth.shape[0], dtype=np.uint64),
+        )
+    return u, v
 
-    if scene.intensity is not None and scene.intensity.shape[0] == n:
-        g = _normalize_to_uint8(scene.intensity.reshape(-1))
-        features["intensity"] = np.stack([g, g, g], axis=1)
 
-    if scene.normal is not None and scene.normal.shape[0] == n:
-        normal_rgb = np.clip(
-            (scene.normal[:, :3].astype(np.float32) + 1.0) * 127.5,
+def _project_cube_into(
+        zbuffer: np.ndarray,
+        coord: np.ndarray,
+        r: np.ndarray,
+        size: int,
+        start: int,
+        engine: str = "numpy") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Project a block of points and merge it into the combined six-face
+    z-buffer, indexed by face * size^2 + v * size + u.
+    """
+    if engine == "numba":
+        return _numba_kernels().project_cube_into(zbuffer, coord, r, size, start)
+
+    with span("project"):
+        face_idx, u, v, depth = _project_cube(coord, size=size, r=r)
+    with span("zbuffer"):
+        _zbuffer_update(
+            zbuffer,
+            face_idx.astype(np.int64) * size * size + v * size + u,
+            depth,
+            np.arange(start, start + depth.shape[0], dtype=np.uint64),
+        )
+    return face_idx, u, v
+
+
+_STATS_CHUNK = 4_000_000
+
+
+def _feature_source(scene: SceneData, name: str) -> np.ndarray | None:
+    source = {
+        "color": scene.color,
+        "intensity": scene.intensity,
+        "normal": scene.normal,
+        "class": scene.class_id,
+        "instance": scene.instance_id,
+    }.get(name)
+
+    if source is None or source.shape[0] != scene.coord.shape[0]:
+        return None
+    return source
+
+
+def _colorize_feature(
+        name: str,
+        values: np.ndarray,
+        stats: Tuple[float, float] | None = None) -> np.ndarray:
+    """
+    uint8 RGB colors of raw per-point feature values. ``stats`` carries the
+    scene-wide value range when only a subset of the points is colorized.
+    """
+    if name == "color":
+        return _to_uint8_rgb(
+            values[:, :3], None if stats is None else stats[1])
+
+    if name == "intensity":
+        vmin, vmax = (None, None) if stats is None else stats
+        g = _normalize_to_uint8(values.reshape(-1), vmin, vmax)
+        return np.stack([g, g, g], axis=1)
+
+    if name == "normal":
+        return np.clip(
+            (values[:, :3].astype(np.float32) + 1.0) * 127.5,
             0.0,
             255.0,
         ).astype(np.uint8)
-        features["normal"] = normal_rgb
 
-    if scene.class_id is not None and scene.class_id.shape[0] == n:
-        features["class"] = _colorize_class(
-            scene.class_id.reshape(-1), _build_class_lut())
+    if name == "class":
+        return apply_lut(values, _CLASS_LUT)
 
-    if scene.instance_id is not None and scene.instance_id.shape[0] == n:
-        features["instance"] = _colorize_instance(
-            scene.instance_id.reshape(-1))
+    if name == "instance":
+        return colorize_instances(
+            values, low=32, background_color=_BACKGROUND_COLOR)
 
-    return features
+    raise ValueError(f"Unknown feature '{name}'.")
 
 
-def _render_panorama(
-    scene: SceneData,
-    out_dir: Path,
+def _value_range(values: np.ndarray) -> Tuple[float, float]:
+    vmin = np.float32(np.nan)
+    vmax = np.float32(np.nan)
+    for start in range(0, values.shape[0], _STATS_CHUNK):
+        block = np.asarray(values[start:start + _STATS_CHUNK],
+                           dtype=np.float32)
+        vmin = np.fmin(vmin, np.fmin.reduce(block, axis=None))
+        vmax = np.fmax(vmax, np.fmax.reduce(block, axis=None))
+    return float(vmin), float(vmax)
+
+
+class RenderContext:
+    """
+    Per-scene state shared by all projections of one scene.
+
+    Ranges, unit directions and the per-point feature colors are computed
+    lazily on first use and then reused, and only the selected features are
+    ever materialized. With ``chunk_size`` the context streams instead: the
+    projections walk ``coord`` block by block and colors are computed only
+    for the visible points, so memory is bounded by image and chunk size.
+    """
+
+    def __init__(self, scene: SceneData,
+                 selected_features: Iterable[str],
+                 chunk_size: int | None = None,
+                 stats: Dict[str, Tuple[float, float]] | None = None) -> None:
+        # stats: value ranges of the streamed features; pass a dict to share
+        # them between contexts of the same scene
+        self.scene = scene
+        self.selected_features = tuple(selected_features)
+        self.chunk_size = chunk_size
+        self._range: np.ndarray | None = None
+        self._direction: np.ndarray | None = None
+        self._features: Dict[str, np.ndarray | None] = {}
+        self._stats: Dict[str, Tuple[float, float]] = {} if stats is None else stats
+
+    @property
+    def streaming(self) -> bool:
+        return self.chunk_size is not None
+
+    @property
+    def coord(self) -> np.ndarray:
+        return self.scene.coord
+
+    @property
+    def num_points(self) -> int:
+        return self.scene.coord.shape[0]
+
+    @property
+    def range(self) -> np.ndarray:
+        if self._range is None:
+            with span("project"):
+                self._range = np.linalg.norm(self.scene.coord, axis=1)
+        return self._range
+
+    @property
+    def direction(self) -> np.ndarray:
+        if self._direction is None:
+            r = self.range
+            with span("project"):
+                self._direction = self.scene.coord / (r[:, None] + 1e-12)
+        return self._direction
+
+    def blocks(self) -> Iterable[Tuple[int, int, np.ndarray, np.ndarray]]:
+        """Yield (start, stop, coord, range) blocks covering all points."""
+        if not self.streaming:
+            yield 0, self.num_points, self.coord, self.range
+            return
+
+        for start in range(0, self.num_points, self.chunk_size):
+            stop = min(start + self.chunk_size, self.num_points)
+            with span("load"):
+                coord = np.asarray(self.coord[start:stop], dtype=np.float32)
+            with span("project"):
+                r = np.linalg.norm(coord, axis=1)
+            yield start, stop, coord, r
+
+    def has_feature(self, name: str) -> bool:
+        if name not in self.selected_features:
+            return False
+        return name == "depth" or _feature_source(
+            self.scene, name) is not None
+
+    def feature(self, name: str) -> np.ndarray | None:
+        """Per-point uint8 RGB colors of a selected feature, or None."""
+        if not self.has_feature(name) or name == "depth":
+            return None
+        if name not in self._features:
+            self._features[name] = _colorize_feature(
+                name, _feature_source(self.scene, name))
+        return self._features[name]
+
+    def colors(self, name: str, point_ids: np.ndarray) -> np.ndarray:
+        """uint8 RGB colors of a selected feature for the given points."""
+        if not self.streaming:
+            return self.feature(name)[point_ids]
+
+        source = _feature_source(self.scene, name)
+        values = np.asarray(source[point_ids])
+
+        stats = None
+        if name in ("color", "intensity") and source.dtype != np.uint8:
+            if name not in self._stats:
+                self._stats[name] = _value_range(source)
+            stats = self._stats[name]
+
+        return _colorize_feature(name, values, stats)
+
+
+def _feature_image(
+    ctx: RenderContext,
+    zbuffer: np.ndarray,
+    best: np.ndarray,
+    height: int,
     width: int,
+    feat: str,
+) -> np.ndarray:
+    """uint8 image of a feature; ``best`` holds the visible point per pixel."""
+    valid = best >= 0
+
+    with span("colorize"):
+        if feat == "depth":
+            depth_img = np.where(valid, _zbuffer_depth(zbuffer), 0.0)
+            depth_img = depth_img.astype(np.float32).reshape(height, width)
+            return _normalize_to_uint8(
+                depth_img.reshape(-1)).reshape(height, width)
+
+        img = np.zeros((height, width, 3), dtype=np.uint8)
+        img.reshape(-1, 3)[valid] = ctx.colors(feat, best[valid])
+        return img
+
+
+def _save_feature_images(
+    ctx: RenderContext,
+    zbuffer: np.ndarray,
     height: int,
-    selected_features: Iterable[str],
+    width: int,
+    stem_for: Callable[[str], Path],
+    session: WriteSession,
+    features: Sequence[str] | None = None,
+    tiles: TileSettings | None = None,
+    tiles_dir: Path | None = None,
+    pyramid: TilePyramid | None = None,
+) -> None:
+    """
+    With ``tiles``, also write the Deep Zoom pyramid of every image; pass
+    the ``pyramid`` if it was already built from this z-buffer.
+    """
+    with span("zbuffer"):
+        best = _zbuffer_points(zbuffer)
+        if tiles is None:
+            pyramid = None
+        elif pyramid is None:
+            pyramid = TilePyramid.from_zbuffer(zbuffer.reshape(height, width))
+
+    for feat in ctx.selected_features if features is None else features:
+        if not ctx.has_feature(feat):
+            continue
+
+        img = _feature_image(ctx, zbuffer, best, height, width, feat)
+        session.write(stem_for(feat), feat, img)
+        if pyramid is not None:
+            _save_tiles(pyramid, img, tiles, tiles_dir, feat, session)
+
+
+def _save_tiles(
+    pyramid: TilePyramid,
+    image: np.ndarray,
+    tiles: TileSettings,
+    tiles_dir: Path,
+    feat: str,
+    session: WriteSession,
 ) -> None:
-    u, v, depth = _project_equirectangular(
-        scene.coord, width=width, height=height)
-    linear = v * width + u
+    """
+    Stream the tiles of every level to the writer threads, which encode
+    them in parallel; the descriptor is written once all of them are on
+    disk, so an existing .dzi marks a complete pyramid.
+    """
+    descriptor, files_dir = tile_dirs(tiles_dir, feat)
+    # tiles of an earlier size or format must not be left behind
+    descriptor.unlink(missing_ok=True)
+    shutil.rmtree(files_dir, ignore_errors=True)
 
-    best = _best_point_per_pixel(linear, depth, width * height)
-    point_pixel = np.stack([u, v], axis=1).astype(np.int32)
+    for level, level_img in pyramid.levels(image):
+        for col, row, tile in tiles.tiles(level_img):
+            session.write(
+                files_dir / str(level) / f"{col}_{row}", feat, tile, tiles.codec)
 
-    pano_dir = out_dir / scene.site_name / scene.scene_name / "panorama"
-    pano_dir.mkdir(parents=True, exist_ok=True)
+    session.on_complete(lambda: descriptor.write_text(
+        tiles.descriptor(pyramid.width, pyramid.height)))
 
-    np.save(pano_dir / "point_to_pixel.npy", point_pixel)
-    np.save(pano_dir / "pixel_to_point.npy", best.reshape(height, width))
 
-    features = _make_feature_arrays(scene)
+def _downsample_zbuffer(
+        zbuffer: np.ndarray,
+        height: int,
+        width: int,
+        factor: int) -> np.ndarray:
+    """
+    Depth-aware min-reduction of factor x factor pixel blocks. The packed keys
+    compare by depth first, so every coarse pixel keeps the nearest point.
+    """
+    blocks = zbuffer.reshape(height // factor, factor, width // factor, factor)
+    return blocks.min(axis=(1, 3)).reshape(-1)
 
-    for feat in selected_features:
-        if feat not in features:
-            continue
 
-        if feat == "depth":
-            depth_img = np.zeros((height, width), dtype=np.float32)
-            valid = best >= 0
-            depth_img.reshape(-1)[valid] = depth[best[valid]]
+def _panorama_levels(
+        width: int,
+        height: int,
+        resolutions: Sequence[Tuple[int, int]] = ()) -> List[Tuple[int, int]]:
+    return [(width, height)] + [
+        (w, h) for w, h in resolutions if (w, h) != (width, height)]
 
-            d8 = _normalize_to_uint8(
-                depth_img.reshape(-1)).reshape(height, width)
-            _save_png(pano_dir / "depth.png", d8)
-            continue
 
-        img = np.zeros((height, width, 3), dtype=np.uint8)
-        valid = best >= 0
-        img.reshape(-1, 3)[valid] = features[feat][best[valid]]
+def _level_zbuffers(
+        zbuffer: np.ndarray,
+        levels: Sequence[Tuple[int, int]]) -> Iterable[np.ndarray]:
+    """Yield the z-buffer of every level, each reduced from the next finer one."""
+    prev_width = levels[0][0]
+    for level, (level_width, level_height) in enumerate(levels):
+        if level > 0:
+            factor = prev_width // level_width
+            with span("zbuffer"):
+                zbuffer = _downsample_zbuffer(
+                    zbuffer,
+                    height=level_height * factor,
+                    width=level_width * factor,
+                    factor=factor,
+                )
+            prev_width = level_width
+        yield zbuffer
+
+
+def _panorama_dir(scene_out: Path, level: int,
+                  width: int, height: int) -> Path:
+    name = "panorama" if level == 0 else f"panorama_{width}x{height}"
+    return scene_out / name
+
+
+def _tiles_dir(pano_dir: Path) -> Path:
+    return pano_dir / "tiles"
 
-        _save_png(pano_dir / f"{feat}.png", img)
+
+def _render_panorama(
+    ctx: RenderContext,
+    scene_out: Path,
+    width: int,
+    height: int,
+    session: WriteSession,
+    resolutions: Sequence[Tuple[int, int]] = (),
+    engine: str = "numpy",
+    map_encoding: str = "compact",
+    features: Sequence[str] | None = None,
+    tiles: TileSettings | None = None,
+) -> None:
+    """
+    Render the panorama at width x height and every coarser level in
+    ``resolutions`` from the same projection; coarser levels are reduced from
+    the next finer z-buffer instead of being projected again. With ``tiles``
+    the full resolution is also written as a Deep Zoom tile pyramid.
+    """
+    levels = _panorama_levels(width, height, resolutions)
+    factors = [width // w for w, _ in levels]
+
+    pano_dirs = []
+    point_pixel_maps = []
+    for level, (level_width, level_height) in enumerate(levels):
+        pano_dir = _panorama_dir(scene_out, level, level_width, level_height)
+        pano_dir.mkdir(parents=True, exist_ok=True)
+        pano_dirs.append(pano_dir)
+        point_pixel_maps.append(MapWriter(
+            pano_dir,
+            "point_to_pixel",
+            (ctx.num_points, 2),
+            extent=max(level_width, level_height),
+            encoding=map_encoding,
+        ))
+
+    zbuffer = _new_zbuffer(width * height)
+
+    for start, _, coord, r in ctx.blocks():
+        u, v = _project_equirectangular_into(
+            zbuffer, coord, r, width, height, start, engine=engine)
+
+        for factor, point_pixel in zip(factors, point_pixel_maps):
+            point_pixel.write(start, np.stack([u // factor, v // factor], axis=1))
+
+    for point_pixel in point_pixel_maps:
+        point_pixel.close()
+
+    for level, zbuffer in enumerate(_level_zbuffers(zbuffer, levels)):
+        level_width, level_height = levels[level]
+        pano_dir = pano_dirs[level]
+        save_map(
+            pano_dir,
+            "pixel_to_point",
+            _zbuffer_points(zbuffer).reshape(level_height, level_width),
+            extent=max(level_width, level_height),
+            encoding=map_encoding,
+        )
+
+        _save_feature_images(
+            ctx,
+            zbuffer,
+            level_height,
+            level_width,
+            lambda feat: pano_dir / feat,
+            session,
+            features,
+            tiles=tiles if level == 0 else None,
+            tiles_dir=_tiles_dir(pano_dir),
+        )
 
 
 def _render_cube_map(
-    scene: SceneData,
-    out_dir: Path,
+    ctx: RenderContext,
+    scene_out: Path,
     size: int,
-    selected_features: Iterable[str],
+    session: WriteSession,
+    engine: str = "numpy",
+    map_encoding: str = "compact",
+    features: Sequence[str] | None = None,
 ) -> None:
-    face_idx, u, v, depth = _project_cube(scene.coord, size=size)
-    point_face_pixel = np.stack([face_idx, u, v], axis=1).astype(np.int32)
-
-    cube_dir = out_dir / scene.site_name / scene.scene_name / "cube_map"
+    cube_dir = scene_out / "cube_map"
     cube_dir.mkdir(parents=True, exist_ok=True)
 
-    np.save(cube_dir / "point_to_face_pixel.npy", point_face_pixel)
+    point_face_pixel = MapWriter(
+        cube_dir,
+        "point_to_face_pixel",
+        (ctx.num_points, 3),
+        extent=size,
+        encoding=map_encoding,
+    )
+
+    # one pass for all six faces over a combined face * size^2 + v * size + u key
+    face_pixels = size * size
+    zbuffer = _new_zbuffer(6 * face_pixels)
+
+    for start, _, coord, r in ctx.blocks():
+        face_idx, u, v = _project_cube_into(
+            zbuffer, coord, r, size, start, engine=engine)
+
+        point_face_pixel.write(start, np.stack([face_idx, u, v], axis=1))
 
-    features = _make_feature_arrays(scene)
+    point_face_pixel.close()
 
     for face_i, face_name in enumerate(_CUBE_FACES):
-        mask = face_idx == face_i
+        face_zbuffer = zbuffer[face_i * face_pixels:(face_i + 1) * face_pixels]
+
+        save_map(
+            cube_dir,
+            f"pixel_to_point_{face_name}",
+            _zbuffer_points(face_zbuffer).reshape(size, size),
+            extent=size,
+            encoding=map_encoding,
+        )
+
+        _save_feature_images(
+            ctx,
+            face_zbuffer,
+            size,
+            size,
+            lambda feat: cube_dir / f"{feat}_{face_name}",
+            session,
+            features,
+        )
+
 
-        linear = v[mask] * size + u[mask]
-        local_depth = depth[mask]
-        local_point_ids = np.where(mask)[0]
+@dataclass(frozen=True)
+class PinholeCamera:
+    """
+    Virtual perspective camera at the scanner origin.
 
-        best_local = _best_point_per_pixel(linear, local_depth, size * size)
+    yaw and pitch (degrees) aim the optical axis like the panorama angles:
+    yaw counter-clockwise from +x, pitch up from the horizon. roll turns the
+    camera about its axis, fov is the horizontal field of view. Pixels are
+    square and the principal point is the image center.
+    """
+    name: str
+    yaw: float
+    pitch: float
+    fov: float
+    width: int
+    height: int
+    roll: float = 0.0
+
+    def __post_init__(self) -> None:
+        # the name becomes the view's output directory
+        if (self.name in ("", ".") or ".." in self.name
+                or "/" in self.name or "\\" in self.name):
+            raise ValueError(
+                f"Camera name {self.name!r} must be a non-empty directory name "
+                "without path separators or '..'.")
+        if not 0.0 < self.fov < 180.0:
+            raise ValueError(f"Camera '{self.name}': fov must be in (0, 180) degrees.")
+        if self.width < 1 or self.height < 1:
+            raise ValueError(f"Camera '{self.name}': width and height must be >= 1.")
+
+    def rotation(self) -> np.ndarray:
+        """Rows are the camera's right, up and forward axes in scene coordinates."""
+        yaw, pitch, roll = np.radians([self.yaw, self.pitch, self.roll])
+        forward = np.array([np.cos(pitch) * np.cos(yaw),
+                            np.cos(pitch) * np.sin(yaw),
+                            np.sin(pitch)])
+        right = np.array([np.sin(yaw), -np.cos(yaw), 0.0])
+        up = np.cross(right, forward)
+
+        right, up = (np.cos(roll) * right + np.sin(roll) * up,
+                     np.cos(roll) * up - np.sin(roll) * right)
+        return np.stack([right, up, forward]).astype(np.float32)
+
+    def intrinsics(self) -> Tuple[float, float, float]:
+        """(focal length in pixels, cx, cy)."""
+        focal = 0.5 * self.width / np.tan(np.radians(self.fov) / 2.0)
+        return focal, 0.5 * self.width, 0.5 * self.height
+
+
+_VIEW_COLUMNS = ("yaw", "pitch", "fov", "width", "height", "roll")
+
+
+def cameras_from_array(
+        views: np.ndarray,
+        names: Sequence[str] | None = None) -> Tuple[PinholeCamera, ...]:
+    """
+    Cameras from rows of (yaw, pitch, fov, width, height[, roll]); views
+    are named view_000, view_001, ... unless ``names`` is given.
+    """
+    views = np.atleast_2d(np.asarray(views, dtype=np.float64))
+    if views.shape[1] not in (5, 6):
+        raise ValueError(
+            "Camera arrays need the columns yaw, pitch, fov, width, height[, roll].")
+    if names is None:
+        names = [f"view_{i:03d}" for i in range(views.shape[0])]
+
+    return tuple(
+        PinholeCamera(
+            name=str(name),
+            yaw=float(row[0]),
+            pitch=float(row[1]),
+            fov=float(row[2]),
+            width=int(row[3]),
+            height=int(row[4]),
+            roll=float(row[5]) if row.shape[0] > 5 else 0.0,
+        )
+        for name, row in zip(names, views)
+    )
 
-        best_global = np.full((size * size,), -1, dtype=np.int64)
-        valid = best_local >= 0
-        best_global[valid] = local_point_ids[best_local[valid]]
 
-        np.save(
-            cube_dir /
-            f"pixel_to_point_{face_name}.npy",
-            best_global.reshape(
-                size,
-                size))
+_NEAR = 1e-6
 
-        for feat in selected_features:
-            if feat not in features:
-                continue
 
-            if feat == "depth":
-                depth_img = np.zeros((size, size), dtype=np.float32)
-                valid = best_global >= 0
-                depth_img.reshape(-1)[valid] = depth[best_global[valid]]
+class _ViewBatch:
+    """Stacked camera parameters of a batch of views sharing one z-buffer."""
 
-                d8 = _normalize_to_uint8(
-                    depth_img.reshape(-1)).reshape(size, size)
-                _save_png(cube_dir / f"depth_{face_name}.png", d8)
-                continue
+    def __init__(self, cameras: Sequence[PinholeCamera]) -> None:
+        self.cameras = tuple(cameras)
+        self.rotation = np.stack([cam.rotation() for cam in self.cameras])
+        self.intrinsics = np.array(
+            [cam.intrinsics() for cam in self.cameras], dtype=np.float32)
+        self.sizes = np.array(
+            [(cam.width, cam.height) for cam in self.cameras], dtype=np.int64)
+        pixels = self.sizes[:, 0] * self.sizes[:, 1]
+        self.offsets = np.concatenate([[0], np.cumsum(pixels)[:-1]]).astype(np.int64)
+        self.num_pixels = int(pixels.sum())
+
+    def view_zbuffer(self, zbuffer: np.ndarray, k: int) -> np.ndarray:
+        width, height = self.sizes[k]
+        return zbuffer[self.offsets[k]:self.offsets[k] + width * height]
+
+
+def _project_views_into(
+        zbuffer: np.ndarray,
+        views: _ViewBatch,
+        direction: np.ndarray,
+        r: np.ndarray,
+        start: int,
+        engine: str = "numpy") -> None:
+    """
+    Project a block of unit directions into every view and merge the
+    visible points into the combined z-buffer of all views, indexed by
+    view offset + v * width + u. Depth is the range, as in the other
+    projections.
+    """
+    if engine == "numba":
+        _numba_kernels().project_views_into(
+            zbuffer, direction, r, views.rotation, views.intrinsics,
+            views.sizes, views.offsets, _NEAR, start)
+        return
+
+    d0 = direction[:, 0]
+    d1 = direction[:, 1]
+    d2 = direction[:, 2]
+    depth = r.astype(np.float32, copy=False)
+    point_ids = np.arange(start, start + direction.shape[0], dtype=np.uint64)
+
+    for k, rot in enumerate(views.rotation):
+        fx, cx, cy = views.intrinsics[k]
+        width, height = views.sizes[k]
+
+        with span("project"):
+            z = d0 * rot[2, 0] + d1 * rot[2, 1] + d2 * rot[2, 2]
+            front = np.flatnonzero(z > np.float32(_NEAR))
+            z = z[front]
+            x = d0[front] * rot[0, 0] + d1[front] * rot[0, 1] + d2[front] * rot[0, 2]
+            y = d0[front] * rot[1, 0] + d1[front] * rot[1, 1] + d2[front] * rot[1, 2]
+
+            uf = cx + fx * x / z
+            vf = cy - fx * y / z
+            inside = (uf >= 0) & (uf < width) & (vf >= 0) & (vf < height)
+            sel = front[inside]
+
+        with span("zbuffer"):
+            _zbuffer_update(
+                zbuffer,
+                views.offsets[k] + vf[inside].astype(np.int64) * width
+                + uf[inside].astype(np.int64),
+                depth[sel],
+                point_ids[sel],
+            )
+
+
+def _render_perspective(
+    ctx: RenderContext,
+    scene_out: Path,
+    cameras: Sequence[PinholeCamera],
+    session: WriteSession,
+    engine: str = "numpy",
+    map_encoding: str = "compact",
+    features: Sequence[str] | None = None,
+) -> None:
+    """
+    Render all views in one pass over the points: the unit directions are
+    computed once (and reused from the context when it holds the whole
+    scene) and every view is merged into one combined z-buffer.
+    """
+    persp_dir = scene_out / "perspective"
+    views = _ViewBatch(cameras)
+    zbuffer = _new_zbuffer(views.num_pixels)
+
+    for start, _, coord, r in ctx.blocks():
+        if ctx.streaming:
+            direction = coord / (r[:, None] + 1e-12)
+        else:
+            direction = ctx.direction
+        _project_views_into(zbuffer, views, direction, r, start, engine=engine)
+
+    for k, cam in enumerate(views.cameras):
+        view_dir = persp_dir / cam.name
+        view_dir.mkdir(parents=True, exist_ok=True)
+        view_zbuffer = views.view_zbuffer(zbuffer, k)
+
+        save_map(
+            view_dir,
+            "pixel_to_point",
+            _zbuffer_points(view_zbuffer).reshape(cam.height, cam.width),
+            extent=max(cam.width, cam.height),
+            encoding=map_encoding,
+        )
+
+        _save_feature_images(
+            ctx,
+            view_zbuffer,
+            cam.height,
+            cam.width,
+            lambda feat: view_dir / feat,
+            session,
+            features,
+        )
 
-            img = np.zeros((size, size, 3), dtype=np.uint8)
-            valid = best_global >= 0
-            img.reshape(-1, 3)[valid] = features[feat][best_global[valid]]
 
-            _save_png(cube_dir / f"{feat}_{face_name}.png", img)
+_writer: ImageWriter | None = None
+_writer_pid: int | None = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer(options: RenderOptions) -> ImageWriter:
+    """
+    One background image writer per process, shared by its threads. A
+    writer inherited through fork has no threads in the child and is
+    replaced.
+    """
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = ImageWriter(
+                options.image_codecs, workers=options.image_writers)
+            _writer_pid = os.getpid()
+        return _writer
+
+
+def _close_writer() -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+def _projection_options(options: RenderOptions) -> Dict[str, dict]:
+    """Options that determine the outputs of each projection."""
+    common = {"subsampled": options.subsampled, "maps": options.map_encoding}
+    projections = {}
+    if options.render_pano:
+        projections["panorama"] = {
+            "levels": [(options.pano_width, options.pano_height),
+                       *options.pano_resolutions],
+            **common,
+        }
+    if options.render_cube:
+        projections["cube_map"] = {"size": options.cube_size, **common}
+    if options.cameras:
+        projections["perspective"] = {
+            "views": [asdict(cam) for cam in options.cameras],
+            **common,
+        }
+    return projections
+
+
+def _outputs_exist(
+        options: RenderOptions,
+        scene_out: Path,
+        projection: str) -> Callable[[str | None], bool]:
+    """exists(None) checks the correspondence maps, exists(feat) the images."""
+    descriptors = []
+    if projection == "panorama":
+        levels = [(options.pano_width, options.pano_height),
+                  *options.pano_resolutions]
+        dirs = [_panorama_dir(scene_out, level, w, h)
+                for level, (w, h) in enumerate(levels)]
+        maps = [(d, name) for d in dirs
+                for name in ("point_to_pixel", "pixel_to_point")]
+        images = [lambda feat, d=d: d / feat for d in dirs]
+        if options.tiles is not None:
+            descriptors = [lambda feat: tile_dirs(_tiles_dir(dirs[0]), feat)[0]]
+    elif projection == "perspective":
+        dirs = [scene_out / "perspective" / cam.name for cam in options.cameras]
+        maps = [(d, "pixel_to_point") for d in dirs]
+        images = [lambda feat, d=d: d / feat for d in dirs]
+    else:
+        cube_dir = scene_out / "cube_map"
+        maps = [(cube_dir, "point_to_face_pixel")] + [
+            (cube_dir, f"pixel_to_point_{face}") for face in _CUBE_FACES]
+        images = [lambda feat, face=face: cube_dir / f"{feat}_{face}"
+                  for face in _CUBE_FACES]
+
+    def exists(feat: str | None) -> bool:
+        if feat is None:
+            return all(map_exists(d, name) for d, name in maps)
+        suffix = codec_for(options.image_codecs, feat).suffix
+        return (all(stem(feat).with_name(stem(feat).name + suffix).exists()
+                    for stem in images)
+                and all(path(feat).exists() for path in descriptors))
+
+    return exists
+
+
+@dataclass
+class _ScenePlan:
+    """
+    Projections and features of one scene that need to be rendered.
+    ``reusable`` projections have valid stored maps, so their features can
+    be gathered from pixel_to_point instead of projecting the scene.
+    """
+    manifest: SceneManifest
+    coord_fp: dict
+    entries: Dict[str, Dict[str, dict]]
+    projections: Dict[str, dict]
+    features: Dict[str, List[str]]
+    reusable: List[str] = field(default_factory=list)
+
+    def record(self, has_feature: Callable[[str], bool]) -> None:
+        for projection in self.features:
+            rendered = {
+                feat: {**entry, "rendered": has_feature(feat)}
+                for feat, entry in self.entries[projection].items()
+            }
+            self.manifest.update(
+                projection, self.projections[projection], self.coord_fp, rendered)
+
+
+def _feature_entries(
+        entries: Dict[str, dict],
+        projection: str,
+        options: RenderOptions) -> Dict[str, dict]:
+    """
+    Manifest entries of the features of one projection. The panorama tiles
+    are part of each feature's outputs, so enabling them (or changing their
+    settings) gathers the images from the stored maps again.
+    """
+    if projection != "panorama" or options.tiles is None:
+        return entries
+    tiles = asdict(options.tiles)
+    return {feat: {**entry, "tiles": tiles} for feat, entry in entries.items()}
+
+
+def _plan_scene(scene_dir: Path, options: RenderOptions) -> _ScenePlan:
+    """
+    Projections and features whose outputs are recorded in the scene's
+    render manifest with unchanged inputs and options are left out unless
+    options.force is set.
+    """
+    scene_out = _scene_output_dir(
+        options.output_root, scene_dir, options.subsampled)
+
+    manifest = SceneManifest(scene_out, subsampled=options.subsampled)
+    coord_fp = input_fingerprint(
+        scene_dir, "coord", subsampled=options.subsampled, mode=options.fingerprint)
+    entries = {
+        feat: {
+            "input": coord_fp if feat == "depth" else input_fingerprint(
+                scene_dir, feat, subsampled=options.subsampled,
+                mode=options.fingerprint),
+            "codec": asdict(codec_for(options.image_codecs, feat)),
+        }
+        for feat in options.selected_features
+    }
+
+    projections = _projection_options(options)
+    entries = {p: _feature_entries(entries, p, options) for p in projections}
+    plan = {}
+    reusable = []
+    for projection, proj_options in projections.items():
+        if options.force:
+            features = list(options.selected_features)
+        else:
+            exists = _outputs_exist(options, scene_out, projection)
+            features = manifest.stale_features(
+                projection, proj_options, coord_fp, entries[projection], exists)
+            if features and options.reuse_maps and manifest.maps_valid(
+                    projection, proj_options, coord_fp, exists):
+                reusable.append(projection)
+        if features:
+            plan[projection] = features
+
+    return _ScenePlan(manifest, coord_fp, entries, projections, plan, reusable)
+
+
+def _map_targets(
+        options: RenderOptions,
+        scene_out: Path,
+        projection: str) -> List[tuple]:
+    """(directory, pixel_to_point map, height, width, image stem) per image."""
+    if projection == "panorama":
+        levels = _panorama_levels(
+            options.pano_width, options.pano_height, options.pano_resolutions)
+        targets = []
+        for level, (w, h) in enumerate(levels):
+            d = _panorama_dir(scene_out, level, w, h)
+            targets.append((d, "pixel_to_point", h, w, lambda feat, d=d: d / feat))
+        return targets
+
+    if projection == "perspective":
+        return [
+            (scene_out / "perspective" / cam.name, "pixel_to_point",
+             cam.height, cam.width,
+             lambda feat, d=scene_out / "perspective" / cam.name: d / feat)
+            for cam in options.cameras
+        ]
+
+    cube_dir = scene_out / "cube_map"
+    size = options.cube_size
+    return [
+        (cube_dir, f"pixel_to_point_{face}", size, size,
+         lambda feat, face=face: cube_dir / f"{feat}_{face}")
+        for face in _CUBE_FACES
+    ]
+
+
+def _zbuffer_from_map(
+        ctx: RenderContext,
+        best: np.ndarray,
+        with_depth: bool) -> np.ndarray:
+    """
+    The z-buffer a stored pixel_to_point map was taken from. Depth keys are
+    only needed for depth images and are recomputed for the visible points.
+    """
+    zbuffer = _new_zbuffer(best.shape[0])
+    valid = best >= 0
+    point_ids = best[valid]
+
+    depth = np.zeros(point_ids.shape, dtype=np.float32)
+    if with_depth:
+        with span("load"):
+            coord = np.asarray(ctx.coord[point_ids], dtype=np.float32)
+        with span("project"):
+            depth = np.linalg.norm(coord, axis=1)
+    zbuffer[valid] = _pack_depth_keys(depth, point_ids)
+    return zbuffer
+
+
+def _gather_projection(
+        ctx: RenderContext,
+        scene_out: Path,
+        projection: str,
+        options: RenderOptions,
+        session: WriteSession,
+        features: Sequence[str]) -> bool:
+    """
+    Write the feature images of a projection from its stored pixel_to_point
+    maps: a gather of the visible points, without projecting the scene.
+    False (nothing written) if a map is missing or does not fit the scene.
+    """
+    with span("maps"):
+        maps = []
+        for directory, name, height, width, _ in _map_targets(
+                options, scene_out, projection):
+            view = open_map(directory, name, mmap_mode=None)
+            if view is None or view.shape != (height, width):
+                return False
+            best = np.asarray(view).reshape(-1)
+            if best.shape[0] and int(best.max()) >= ctx.num_points:
+                return False
+            maps.append(best)
+
+    targets = _map_targets(options, scene_out, projection)
+    for i, (best, (directory, _, height, width, stem_for)) in enumerate(
+            zip(maps, targets)):
+        # the tile pyramid picks the nearest point of each block by depth
+        tiles = options.tiles if projection == "panorama" and i == 0 else None
+        with span("zbuffer"):
+            zbuffer = _zbuffer_from_map(
+                ctx, best, "depth" in features or tiles is not None)
+        _save_feature_images(
+            ctx, zbuffer, height, width, stem_for, session, features,
+            tiles=tiles, tiles_dir=_tiles_dir(directory))
+    return True
+
+
+def _gather_reusable(
+        scene_dir: Path,
+        plan: _ScenePlan,
+        options: RenderOptions,
+        session: WriteSession) -> Tuple[List[str], RenderContext | None]:
+    """
+    Gather the stale features of the plan's reusable projections. Returns
+    the projections done this way and the (memory-mapped) context used.
+    """
+    if not plan.reusable:
+        return [], None
+
+    log = logging.getLogger(__name__)
+    scene_out = _scene_output_dir(
+        options.output_root, scene_dir, options.subsampled)
+
+    # streaming, so that only the visible points are read and colorized
+    ctx = RenderContext(
+        _load_scene(scene_dir, subsampled=options.subsampled, mmap=True),
+        options.selected_features,
+        chunk_size=options.chunk_size or _GATHER_CHUNK,
+    )
+
+    gathered = []
+    for projection in plan.reusable:
+        if _gather_projection(ctx, scene_out, projection, options, session,
+                              plan.features[projection]):
+            log.info("Gathered %s of %s/%s %s from the stored maps.",
+                     ", ".join(plan.features[projection]),
+                     scene_dir.parent.name, scene_dir.name, projection)
+            gathered.append(projection)
+        else:
+            log.info("Stored maps of %s/%s %s do not fit the scene, rendering it again.",
+                     scene_dir.parent.name, scene_dir.name, projection)
+    return gathered, ctx
 
 
 def _render_one_scene(
-        scene_dir: Path, options: RenderOptions) -> tuple[str, str]:
+        scene_dir: Path,
+        options: RenderOptions,
+        session: WriteSession | None = None) -> tuple[str, str]:
     """
     Must be a top-level function for ProcessPoolExecutor.
     Do not define this inside render_from_config().
+
+    Without a session the scene waits for its own images before returning;
+    the serial loop passes one and waits later, so that encoding overlaps
+    with the next scene.
+
+    Up-to-date outputs are skipped, see _plan_scene.
     """
-    scene_data = _load_scene(scene_dir)
+    with traced(options.trace, "scene",
+                scene=f"{scene_dir.parent.name}/{scene_dir.name}"):
+        return _render_scene(scene_dir, options, session)
 
-    if options.render_pano:
+
+def _render_scene(
+        scene_dir: Path,
+        options: RenderOptions,
+        session: WriteSession | None) -> tuple[str, str]:
+    log = logging.getLogger(__name__)
+    site_name, scene_name = scene_dir.parent.name, scene_dir.name
+    scene_out = _scene_output_dir(
+        options.output_root, scene_dir, options.subsampled)
+
+    plan = _plan_scene(scene_dir, options)
+    if not plan.features:
+        log.info("Up to date, skipping scene: %s/%s", site_name, scene_name)
+        return site_name, scene_name
+
+    # a crash mid-render must not leave the old entries claiming valid outputs
+    plan.manifest.invalidate(plan.features)
+
+    own_session = session is None
+    if own_session:
+        session = _get_writer(options).session()
+
+    gathered, ctx = _gather_reusable(scene_dir, plan, options, session)
+    render = [p for p in plan.features if p not in gathered]
+    if render:
+        ctx = RenderContext(
+            _load_scene(
+                scene_dir,
+                subsampled=options.subsampled,
+                mmap=options.chunk_size is not None,
+            ),
+            options.selected_features,
+            chunk_size=options.chunk_size,
+        )
+
+    if "panorama" in render:
         _render_panorama(
-            scene=scene_data,
-            out_dir=options.output_root,
+            ctx,
+            scene_out=scene_out,
             width=options.pano_width,
             height=options.pano_height,
-            selected_features=list(options.selected_features),
+            session=session,
+            resolutions=options.pano_resolutions,
+            engine=options.engine,
+            map_encoding=options.map_encoding,
+            features=plan.features["panorama"],
+            tiles=options.tiles,
         )
 
-    if options.render_cube:
+    if "cube_map" in render:
         _render_cube_map(
-            scene=scene_data,
-            out_dir=options.output_root,
+            ctx,
+            scene_out=scene_out,
             size=options.cube_size,
-            selected_features=list(options.selected_features),
+            session=session,
+            engine=options.engine,
+            map_encoding=options.map_encoding,
+            features=plan.features["cube_map"],
+        )
+
+    if "perspective" in render:
+        _render_perspective(
+            ctx,
+            scene_out=scene_out,
+            cameras=options.cameras,
+            session=session,
+            engine=options.engine,
+            map_encoding=options.map_encoding,
+            features=plan.features["perspective"],
         )
 
-    return scene_data.site_name, scene_data.scene_name
+    # entries are only recorded once all images are on disk
+    session.on_complete(lambda: plan.record(ctx.has_feature))
+
+    if own_session:
+        session.wait()
+
+    return site_name, scene_name
+
+
+# -----------------------------
+# Intra-scene parallelism
+# -----------------------------
+
+_SHARED_FEATURES = {
+    "color": "color",
+    "intensity": "intensity",
+    "normal": "normal",
+    "class": "class_id",
+    "instance": "instance_id",
+}
+
+
+def _share_scene(scene: SceneData, features: Iterable[str]) -> SharedArrays:
+    """Copy coord (as float32) and the given raw features into shared memory."""
+    sources = {"coord": scene.coord}
+    for feat in features:
+        source = _feature_source(scene, feat)
+        if source is not None:
+            sources[feat] = source
+
+    shared = SharedArrays.create({
+        name: (source.shape, np.float32 if name == "coord" else source.dtype)
+        for name, source in sources.items()
+    })
+    with span("load"):
+        for name, source in sources.items():
+            out = shared[name]
+            for start in range(0, source.shape[0], _STATS_CHUNK):
+                out[start:start + _STATS_CHUNK] = source[start:start + _STATS_CHUNK]
+    return shared
+
+
+def _shared_scene_data(shared: SharedArrays, scene_dir: Path) -> SceneData:
+    return SceneData(
+        site_name=scene_dir.parent.name,
+        scene_name=scene_dir.name,
+        scene_dir=scene_dir,
+        coord=shared["coord"],
+        **{field: shared.get(feat) for feat, field in _SHARED_FEATURES.items()},
+    )
+
+
+def _project_part(
+        scene: SharedArrays,
+        buffers: SharedArrays,
+        projection: str,
+        part: int,
+        start: int,
+        stop: int,
+        options: RenderOptions) -> None:
+    coord_all = scene["coord"]
+    zbuffer = buffers[f"{projection}_zbuffer"][part]
+    pixels = buffers[f"{projection}_pixels"]
+    zbuffer.fill(_EMPTY_KEY)
+
+    step = options.chunk_size or max(stop - start, 1)
+    for block_start in range(start, stop, step):
+        block_stop = min(block_start + step, stop)
+        coord = coord_all[block_start:block_stop]
+        r = np.linalg.norm(coord, axis=1)
+
+        if projection == "panorama":
+            pixels[block_start:block_stop] = np.stack(_project_equirectangular_into(
+                zbuffer, coord, r, options.pano_width, options.pano_height,
+                block_start, engine=options.engine), axis=1)
+        else:
+            pixels[block_start:block_stop] = np.stack(_project_cube_into(
+                zbuffer, coord, r, options.cube_size, block_start,
+                engine=options.engine), axis=1)
+
+
+def _intra_project(
+        scene_layout: SharedLayout,
+        buffers_layout: SharedLayout,
+        projection: str,
+        part: int,
+        start: int,
+        stop: int,
+        options: RenderOptions) -> None:
+    """
+    Worker entry point: project points [start, stop) of a shared scene into
+    z-buffer slot ``part`` and record their pixels. Must be a top-level
+    function for ProcessPoolExecutor.
+    """
+    with traced(options.trace, "task", task=f"project {projection}", part=part):
+        scene = SharedArrays.attach(scene_layout)
+        buffers = SharedArrays.attach(buffers_layout)
+        try:
+            _project_part(scene, buffers, projection, part, start, stop, options)
+        finally:
+            buffers.close()
+            scene.close()
+
+
+def _feature_images(
+        scene: SharedArrays,
+        zbuffers: SharedArrays,
+        scene_dir: Path,
+        projection: str,
+        feature: str,
+        options: RenderOptions) -> None:
+    ctx = RenderContext(
+        _shared_scene_data(scene, scene_dir), options.selected_features)
+    scene_out = _scene_output_dir(
+        options.output_root, scene_dir, options.subsampled)
+    session = _get_writer(options).session()
+
+    if projection == "panorama":
+        levels = _panorama_levels(
+            options.pano_width, options.pano_height, options.pano_resolutions)
+        pyramid = None
+        if options.tiles is not None:
+            shapes = TilePyramid.choice_shapes(options.pano_width, options.pano_height)
+            pyramid = TilePyramid(
+                [zbuffers[f"panorama_tiles_{i}"] for i in range(len(shapes))],
+                options.pano_height, options.pano_width)
+        for level, (width, height) in enumerate(levels):
+            pano_dir = _panorama_dir(scene_out, level, width, height)
+            _save_feature_images(
+                ctx,
+                zbuffers[f"panorama_{level}"],
+                height,
+                width,
+                lambda feat: pano_dir / feat,
+                session,
+                (feature,),
+                tiles=options.tiles if level == 0 else None,
+                tiles_dir=_tiles_dir(pano_dir),
+                pyramid=pyramid,
+            )
+    else:
+        size = options.cube_size
+        cube_dir = scene_out / "cube_map"
+        zbuffer = zbuffers["cube_map"]
+        for face_i, face_name in enumerate(_CUBE_FACES):
+            _save_feature_images(
+                ctx,
+                zbuffer[face_i * size * size:(face_i + 1) * size * size],
+                size,
+                size,
+                lambda feat: cube_dir / f"{feat}_{face_name}",
+                session,
+                (feature,),
+            )
+
+    session.wait()
+
+
+def _intra_feature_images(
+        scene_layout: SharedLayout,
+        zbuffers_layout: SharedLayout,
+        scene_dir: Path,
+        projection: str,
+        feature: str,
+        options: RenderOptions) -> None:
+    """
+    Worker entry point: write the images of one feature of one projection
+    from the final shared z-buffers. Must be a top-level function for
+    ProcessPoolExecutor.
+    """
+    with traced(options.trace, "task", task=f"images {projection}/{feature}"):
+        scene = SharedArrays.attach(scene_layout)
+        zbuffers = SharedArrays.attach(zbuffers_layout)
+        try:
+            _feature_images(
+                scene, zbuffers, scene_dir, projection, feature, options)
+        finally:
+            zbuffers.close()
+            scene.close()
+
+
+def _perspective_views(
+        scene: SharedArrays,
+        scene_dir: Path,
+        cameras: Sequence[PinholeCamera],
+        features: Sequence[str],
+        options: RenderOptions) -> None:
+    ctx = RenderContext(
+        _shared_scene_data(scene, scene_dir),
+        options.selected_features,
+        chunk_size=options.chunk_size,
+    )
+    session = _get_writer(options).session()
+    _render_perspective(
+        ctx,
+        scene_out=_scene_output_dir(
+            options.output_root, scene_dir, options.subsampled),
+        cameras=cameras,
+        session=session,
+        engine=options.engine,
+        map_encoding=options.map_encoding,
+        features=features,
+    )
+    session.wait()
+
+
+def _intra_perspective(
+        scene_layout: SharedLayout,
+        scene_dir: Path,
+        cameras: Sequence[PinholeCamera],
+        features: Sequence[str],
+        options: RenderOptions) -> None:
+    """
+    Worker entry point: render a group of perspective views of a shared
+    scene. Must be a top-level function for ProcessPoolExecutor.
+    """
+    with traced(options.trace, "task", task="perspective", views=len(cameras)):
+        scene = SharedArrays.attach(scene_layout)
+        try:
+            _perspective_views(scene, scene_dir, cameras, features, options)
+        finally:
+            scene.close()
+
+
+def _run_all(executor, calls: Sequence[tuple]) -> None:
+    """
+    Run all (fn, *args) calls on the executor; on failure, wait for the
+    others to finish and raise.
+    """
+    futures = [executor.submit(*call) for call in calls]
+    try:
+        for future in futures:
+            future.result()
+    finally:
+        # workers must be done with the shared buffers before they go away
+        for future in futures:
+            future.cancel()
+        wait(futures)
+
+
+def _reduce_zbuffers(
+        buffers: SharedArrays,
+        zbuffers: SharedArrays,
+        scene_out: Path,
+        projections: Iterable[str],
+        options: RenderOptions) -> None:
+    """
+    Merge the per-part z-buffers into the final ones and write the
+    correspondence maps of the given projections.
+    """
+    num_points = buffers[next(iter(projections)) + "_pixels"].shape[0]
+
+    if "panorama" in projections:
+        levels = _panorama_levels(
+            options.pano_width, options.pano_height, options.pano_resolutions)
+        np.minimum.reduce(
+            buffers["panorama_zbuffer"], axis=0, out=zbuffers["panorama_0"])
+
+        pano_dirs = []
+        point_pixel_maps = []
+        for level, (width, height) in enumerate(levels):
+            pano_dir = _panorama_dir(scene_out, level, width, height)
+            pano_dir.mkdir(parents=True, exist_ok=True)
+            pano_dirs.append(pano_dir)
+            point_pixel_maps.append(MapWriter(
+                pano_dir,
+                "point_to_pixel",
+                (num_points, 2),
+                extent=max(width, height),
+                encoding=options.map_encoding,
+            ))
+
+        pixels = buffers["panorama_pixels"]
+        for start in range(0, num_points, _STATS_CHUNK):
+            uv = pixels[start:start + _STATS_CHUNK]
+            for (width, _), point_pixel in zip(levels, point_pixel_maps):
+                point_pixel.write(start, uv // (options.pano_width // width))
+        for point_pixel in point_pixel_maps:
+            point_pixel.close()
+
+        if options.tiles is not None:
+            with span("zbuffer"):
+                pyramid = TilePyramid.from_zbuffer(zbuffers["panorama_0"].reshape(
+                    options.pano_height, options.pano_width))
+            for i, choice in enumerate(pyramid.choices):
+                zbuffers[f"panorama_tiles_{i}"][:] = choice
+
+        for level, zbuffer in enumerate(
+                _level_zbuffers(zbuffers["panorama_0"], levels)):
+            width, height = levels[level]
+            if level > 0:
+                zbuffers[f"panorama_{level}"][:] = zbuffer
+            save_map(
+                pano_dirs[level],
+                "pixel_to_point",
+                _zbuffer_points(zbuffer).reshape(height, width),
+                extent=max(width, height),
+                encoding=options.map_encoding,
+            )
+
+    if "cube_map" in projections:
+        size = options.cube_size
+        cube_dir = scene_out / "cube_map"
+        cube_dir.mkdir(parents=True, exist_ok=True)
+        np.minimum.reduce(
+            buffers["cube_map_zbuffer"], axis=0, out=zbuffers["cube_map"])
+
+        with MapWriter(
+                cube_dir,
+                "point_to_face_pixel",
+                (num_points, 3),
+                extent=size,
+                encoding=options.map_encoding) as point_face_pixel:
+            pixels = buffers["cube_map_pixels"]
+            for start in range(0, num_points, _STATS_CHUNK):
+                point_face_pixel.write(start, pixels[start:start + _STATS_CHUNK])
+
+        zbuffer = zbuffers["cube_map"]
+        for face_i, face_name in enumerate(_CUBE_FACES):
+            save_map(
+                cube_dir,
+                f"pixel_to_point_{face_name}",
+                _zbuffer_points(
+                    zbuffer[face_i * size * size:(face_i + 1) * size * size]
+                ).reshape(size, size),
+                extent=size,
+                encoding=options.map_encoding,
+            )
+
+
+def _render_scene_shared(
+        scene_dir: Path,
+        options: RenderOptions,
+        executor,
+        workers: int) -> None:
+    """
+    Render one scene with all workers of the pool. The scene is loaded once
+    into shared memory; the workers project contiguous point ranges into
+    private z-buffer slots, which are min-reduced into the final z-buffers
+    (point ids are global, so the result equals a single-process render),
+    and then write the images of one feature each. Perspective views are
+    rendered in groups of cameras alongside the projection parts.
+    """
+    log = logging.getLogger(__name__)
+    site_name, scene_name = scene_dir.parent.name, scene_dir.name
+    scene_out = _scene_output_dir(
+        options.output_root, scene_dir, options.subsampled)
+
+    plan = _plan_scene(scene_dir, options)
+    if not plan.features:
+        log.info("Up to date, skipping scene: %s/%s", site_name, scene_name)
+        return
+
+    plan.manifest.invalidate(plan.features)
+
+    # feature-only changes are gathered here, the rest is projected below;
+    # the writer threads must be idle before the pool forks its workers
+    session = _get_writer(options).session()
+    gathered, ctx = _gather_reusable(scene_dir, plan, options, session)
+    session.wait()
+
+    features = {p: f for p, f in plan.features.items() if p not in gathered}
+    if not features:
+        plan.record(ctx.has_feature)
+        return
+
+    # memory-mapped, so only the shared copy is resident
+    source = RenderContext(
+        _load_scene(scene_dir, subsampled=options.subsampled, mmap=True),
+        options.selected_features,
+    )
+    needed = {feat for feats in features.values() for feat in feats}
+
+    pano_pixels = options.pano_width * options.pano_height
+    cube_pixels = 6 * options.cube_size ** 2
+    parts = max(1, min(workers, source.num_points))
+    bounds = np.linspace(0, source.num_points, parts + 1).astype(np.int64)
+
+    buffer_specs = {}
+    zbuffer_specs = {}
+    if "panorama" in features:
+        buffer_specs["panorama_zbuffer"] = ((parts, pano_pixels), np.uint64)
+        buffer_specs["panorama_pixels"] = ((source.num_points, 2), np.int32)
+        levels = _panorama_levels(
+            options.pano_width, options.pano_height, options.pano_resolutions)
+        for level, (width, height) in enumerate(levels):
+            zbuffer_specs[f"panorama_{level}"] = ((width * height,), np.uint64)
+        if options.tiles is not None:
+            # the tile pyramid is built once and shared by the feature tasks
+            for i, shape in enumerate(TilePyramid.choice_shapes(
+                    options.pano_width, options.pano_height)):
+                zbuffer_specs[f"panorama_tiles_{i}"] = (shape, np.uint8)
+    if "cube_map" in features:
+        buffer_specs["cube_map_zbuffer"] = ((parts, cube_pixels), np.uint64)
+        buffer_specs["cube_map_pixels"] = ((source.num_points, 3), np.int32)
+        zbuffer_specs["cube_map"] = ((cube_pixels,), np.uint64)
+
+    projections = [p for p in ("panorama", "cube_map") if p in features]
+    camera_groups = []
+    if "perspective" in features:
+        camera_groups = [
+            group for group in (options.cameras[i::workers] for i in range(workers))
+            if group]
+
+    with _share_scene(source.scene, needed) as scene, \
+            SharedArrays.create(zbuffer_specs) as zbuffers:
+        with SharedArrays.create(buffer_specs) as buffers:
+            _run_all(executor, [
+                (_intra_perspective, scene.layout, scene_dir, group,
+                 features["perspective"], options)
+                for group in camera_groups
+            ] + [
+                (_intra_project, scene.layout, buffers.layout, projection,
+                 part, int(bounds[part]), int(bounds[part + 1]), options)
+                for projection in projections
+                for part in range(parts)
+            ])
+            if projections:
+                _reduce_zbuffers(
+                    buffers, zbuffers, scene_out, projections, options)
+
+        _run_all(executor, [
+            (_intra_feature_images, scene.layout, zbuffers.layout, scene_dir,
+             projection, feat, options)
+            for projection in projections
+            for feat in features[projection]
+            if source.has_feature(feat)
+        ])
+
+    plan.record(source.has_feature)
+
+
+def _get_pano_resolutions(cfg) -> Tuple[Tuple[int, int], ...]:
+    """
+    Panorama levels, finest first. panorama.resolutions takes [width, height]
+    pairs or "WIDTHxHEIGHT" strings; without it, width/height is the only level.
+    """
+    pano_cfg = cfg.panorama
+    raw = getattr(pano_cfg, "resolutions", None)
+
+    if not raw:
+        return ((int(pano_cfg.width), int(pano_cfg.height)),)
+
+    levels = []
+    for item in raw:
+        if isinstance(item, str):
+            w, h = item.lower().split("x")
+        else:
+            w, h = item
+        levels.append((int(w), int(h)))
+
+    levels = sorted(set(levels), key=lambda wh: wh[0], reverse=True)
+    width, height = levels[0]
+
+    for w, h in levels[1:]:
+        if width % w or height % h or width // w != height // h:
+            raise ValueError(
+                f"panorama.resolutions: {w}x{h} is not an integer downscale "
+                f"of the finest level {width}x{height}.")
+
+    for (w_fine, _), (w, _) in zip(levels, levels[1:]):
+        if w_fine % w:
+            raise ValueError(
+                f"panorama.resolutions: {w} must divide the next finer width {w_fine}.")
+
+    return tuple(levels)
+
+
+def _get_tile_settings(cfg, default: ImageCodec) -> TileSettings | None:
+    """
+    panorama.tiles, or None if disabled. Tiles are encoded like the other
+    images unless a format is given; npy images get png tiles.
+    """
+    tiles_cfg = getattr(cfg.panorama, "tiles", None)
+    if tiles_cfg is None or not bool(getattr(tiles_cfg, "enabled", False)):
+        return None
+
+    base_format = "png" if default.format == "npy" else default.format
+    return TileSettings(
+        size=int(getattr(tiles_cfg, "size", 256)),
+        overlap=int(getattr(tiles_cfg, "overlap", 0)),
+        codec=ImageCodec(
+            format=str(getattr(tiles_cfg, "format", None) or base_format).lower(),
+            compress_level=default.compress_level,
+            palette=default.palette,
+        ),
+    )
+
+
+def _get_perspective_cameras(cfg) -> Tuple[PinholeCamera, ...]:
+    """
+    Cameras listed in perspective.views and/or read from perspective.views_file
+    (.npy, or a text/.csv file with one view per row, see cameras_from_array).
+    """
+    persp_cfg = getattr(cfg, "perspective", None)
+
+    cameras = []
+    for i, view in enumerate(getattr(persp_cfg, "views", None) or []):
+        cameras.append(PinholeCamera(
+            name=str(getattr(view, "name", f"view_{i:03d}")),
+            yaw=float(getattr(view, "yaw", 0.0)),
+            pitch=float(getattr(view, "pitch", 0.0)),
+            fov=float(view.fov),
+            width=int(view.width),
+            height=int(view.height),
+            roll=float(getattr(view, "roll", 0.0)),
+        ))
+
+    views_file = getattr(persp_cfg, "views_file", None)
+    if views_file:
+        path = Path(views_file).expanduser()
+        if not path.exists():
+            raise FileNotFoundError(f"perspective.views_file not found: {path}")
+        if path.suffix == ".npy":
+            views = np.load(path)
+        else:
+            views = np.loadtxt(
+                path, delimiter="," if path.suffix == ".csv" else None, ndmin=2)
+        views = np.atleast_2d(views)
+        offset = len(cameras)
+        cameras.extend(cameras_from_array(
+            views, names=[f"view_{offset + i:03d}" for i in range(views.shape[0])]))
+
+    if not cameras:
+        raise ValueError(
+            "render.perspective is enabled but perspective.views and "
+            "perspective.views_file list no cameras.")
+
+    names = [cam.name for cam in cameras]
+    if len(set(names)) != len(names):
+        raise ValueError("perspective: view names must be unique.")
+
+    return tuple(cameras)
+
+
+def _get_trace_settings(
+        cfg,
+        output_root: Path,
+        tag: str | None = None) -> tuple[TraceSettings | None, bool]:
+    """(settings, chrome) of render.trace; settings is None when disabled."""
+    trace_cfg = getattr(cfg.render, "trace", None)
+    if trace_cfg is None or not bool(getattr(trace_cfg, "enabled", False)):
+        return None, False
+
+    settings = TraceSettings(
+        directory=output_root / _tagged(_TRACE_DIR, tag),
+        memory=str(getattr(trace_cfg, "memory", "rss")).lower(),
+    )
+    return settings, bool(getattr(trace_cfg, "chrome", False))
+
+
+def _write_trace(
+        log: logging.Logger,
+        trace: TraceSettings,
+        chrome: bool,
+        tag: str | None = None) -> None:
+    """Merge the events of all processes into the report files."""
+    stop_tracing()
+    events = collect_trace(trace.directory)
+    output_root = trace.directory.parent
+
+    report = summarize_trace(events)
+    report["memory"] = trace.memory
+    path = output_root / _tagged(TRACE_REPORT_FILE, tag)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    log.info("Wrote trace report: %s", path)
+
+    if chrome:
+        chrome_path = output_root / _tagged(TRACE_CHROME_FILE, tag)
+        write_chrome_trace(events, chrome_path)
+        log.info("Wrote Chrome trace: %s", chrome_path)
+
+    shutil.rmtree(trace.directory, ignore_errors=True)
+
+
+def _get_schedule_settings(cfg) -> tuple[int | None, int | None]:
+    """render.parallel.memory_budget in bytes and max_tasks_per_child."""
+    parallel_cfg = getattr(cfg.render, "parallel", None)
+    if parallel_cfg is None:
+        return None, None
+
+    memory_budget = parse_bytes(getattr(parallel_cfg, "memory_budget", None))
+    if memory_budget is not None and memory_budget <= 0:
+        raise ValueError("render.parallel.memory_budget must be > 0 or null.")
+
+    max_tasks = getattr(parallel_cfg, "max_tasks_per_child", None)
+    if max_tasks is not None:
+        max_tasks = int(max_tasks)
+        if max_tasks < 1:
+            raise ValueError(
+                "render.parallel.max_tasks_per_child must be >= 1 or null.")
+        if sys.version_info < (3, 11):
+            raise ValueError(
+                "render.parallel.max_tasks_per_child requires Python 3.11 or newer "
+                f"(running {sys.version_info.major}.{sys.version_info.minor}); "
+                "set it to null.")
+
+    return memory_budget, max_tasks
+
+
+_PARALLEL_MODES = ("scenes", "intra", "auto")
+
+
+def _get_parallel_mode(cfg) -> str:
+    """
+    render.parallel.mode: "scenes" renders one scene per worker, "intra"
+    spreads every scene over all workers, "auto" uses intra when fewer
+    scenes than workers are selected.
+    """
+    parallel_cfg = getattr(cfg.render, "parallel", None)
+    mode = str(getattr(parallel_cfg, "mode", "scenes")).lower()
+    if mode not in _PARALLEL_MODES:
+        raise ValueError(
+            f"render.parallel.mode must be one of: {', '.join(map(repr, _PARALLEL_MODES))}.")
+    return mode
 
 
 def _get_parallel_settings(cfg) -> tuple[str, int]:
@@ -545,7 +2244,27 @@ def _get_parallel_settings(cfg) -> tuple[str, int]:
     return backend, workers
 
 
-def render_from_config(config_path: str | Path) -> None:
+def render_from_config(
+        config_path: str | Path,
+        force: bool = False,
+        failed_only: bool = False,
+        shard: tuple[int, int] | None = None,
+        claim: bool = False,
+        node: str | None = None,
+        run_id: str | None = None) -> int:
+    """
+    Render all selected scenes and return the number of failed scenes.
+    Outputs that the per-scene render manifest records as up to date are
+    skipped; ``force`` renders everything again. ``failed_only`` restricts
+    the selection to the scenes listed in the last failure reports.
+
+    Several nodes can share one output tree: ``shard=(i, N)`` renders the
+    i-th of N fixed parts of the selection, and ``claim`` makes the nodes
+    take scenes one at a time through lease files (``node`` names this
+    node in the leases and in its run files). Nodes with the same
+    ``run_id`` (by default: the same configuration file and options)
+    render every scene once.
+    """
     log = logging.getLogger(__name__)
 
     cfg = load_config(config_path)
@@ -561,10 +2280,13 @@ def render_from_config(config_path: str | Path) -> None:
 
     render_pano = bool(cfg.render.panorama)
     render_cube = bool(cfg.render.cube_map)
+    render_persp = bool(getattr(cfg.render, "perspective", False))
 
-    if not render_pano and not render_cube:
+    if not render_pano and not render_cube and not render_persp:
         raise ValueError(
-            "Both render.panorama and render.cube_map are disabled.")
+            "render.panorama, render.cube_map and render.perspective are all disabled.")
+
+    cameras = _get_perspective_cameras(cfg) if render_persp else ()
 
     selected_features = tuple(cfg.render.features)
 
@@ -572,17 +2294,100 @@ def render_from_config(config_path: str | Path) -> None:
     if not scenes:
         raise FileNotFoundError("No scenes found for the provided selection.")
 
+    subsampled = bool(getattr(cfg.render, "subsampled", False))
+
+    claim_cfg = getattr(cfg.render, "claim", None)
+    claim = claim or bool(getattr(claim_cfg, "enabled", False))
+
+    # nodes of a distributed run keep their run files apart
+    tags = []
+    if shard is not None:
+        tags.append(f"shard{shard[0]}of{shard[1]}")
+        # partitioned before --failed-only, so every scene keeps its shard
+        scenes = shard_scenes(scenes, *shard, subsampled=subsampled)
+        if not scenes:
+            log.info("No scenes in shard %d/%d.", *shard)
+            return 0
+    if claim and node is None:
+        node = default_node_name()
+    if node is not None:
+        tags.append(run_tag(node))
+    tag = ".".join(tags) or None
+
+    if failed_only:
+        # the reports of all nodes; any node may render a failed scene again
+        reports = sorted(output_root.glob(_tagged(FAILURE_REPORT_FILE, "*")))
+        if (output_root / FAILURE_REPORT_FILE).exists():
+            reports.insert(0, output_root / FAILURE_REPORT_FILE)
+        if not reports:
+            raise FileNotFoundError(
+                f"No failure report found: {output_root / FAILURE_REPORT_FILE}")
+        retry_dirs = {p.resolve() for path in reports for p in failed_scenes(path)}
+        scenes = [p for p in scenes if p.resolve() in retry_dirs]
+        if not scenes:
+            log.info("No failed scenes to render again.")
+            return 0
+
+    policy = ErrorPolicy.parse(getattr(cfg.render, "on_error", "abort"))
+
     backend, workers = _get_parallel_settings(cfg)
-    workers = min(workers, len(scenes))
+    parallel_mode = _get_parallel_mode(cfg)
+    intra_scene = backend != "serial" and workers > 1 and (
+        parallel_mode == "intra"
+        or (parallel_mode == "auto" and len(scenes) < workers))
+    if not intra_scene:
+        workers = min(workers, len(scenes))
+    memory_budget, max_tasks_per_child = _get_schedule_settings(cfg)
+
+    pano_levels = _get_pano_resolutions(cfg) if render_pano else ((0, 0),)
+
+    chunk_size = getattr(cfg.render, "chunk_size", None)
+    if chunk_size is not None:
+        chunk_size = int(chunk_size)
+        if chunk_size < 1:
+            raise ValueError("render.chunk_size must be >= 1 or null.")
+
+    images_cfg = getattr(cfg.output, "images", None)
+    image_codecs = codecs_from_config(images_cfg)
+    tiles = _get_tile_settings(cfg, image_codecs["default"]) if render_pano else None
+
+    fingerprint = str(getattr(cfg.render, "fingerprint", "stat")).lower()
+    if fingerprint not in FINGERPRINT_MODES:
+        raise ValueError(
+            f"render.fingerprint must be one of: {', '.join(map(repr, FINGERPRINT_MODES))}.")
+
+    map_encoding = str(getattr(cfg.output, "maps", "compact")).lower()
+    if map_encoding not in MAP_ENCODINGS:
+        raise ValueError(
+            f"output.maps must be one of: {', '.join(map(repr, MAP_ENCODINGS))}.")
+
+    trace, trace_chrome = _get_trace_settings(cfg, output_root, tag)
+    if trace is not None:
+        # events of an earlier, aborted run
+        shutil.rmtree(trace.directory, ignore_errors=True)
 
     options = RenderOptions(
         output_root=output_root,
         render_pano=render_pano,
         render_cube=render_cube,
-        pano_width=int(cfg.panorama.width),
-        pano_height=int(cfg.panorama.height),
+        pano_width=pano_levels[0][0],
+        pano_height=pano_levels[0][1],
         cube_size=int(cfg.cube_map.size),
         selected_features=selected_features,
+        subsampled=subsampled,
+        pano_resolutions=pano_levels[1:],
+        chunk_size=chunk_size,
+        engine=_resolve_engine(getattr(cfg.render, "engine", "numpy")),
+        image_codecs=image_codecs,
+        image_writers=int(getattr(images_cfg, "writers", 2)
+                          if images_cfg is not None else 2),
+        map_encoding=map_encoding,
+        fingerprint=fingerprint,
+        force=force,
+        reuse_maps=bool(getattr(cfg.render, "reuse_maps", True)),
+        cameras=cameras,
+        trace=trace,
+        tiles=tiles,
     )
 
     log.info("--- CONFIGURATION ------------------------------")
@@ -591,68 +2396,410 @@ def render_from_config(config_path: str | Path) -> None:
     log.info("  Site Selection:     %s", str(site))
     log.info("  Scene Selection:    %s", str(scene))
     log.info("  Feature Selection:  %s", str(options.selected_features))
+    log.info("  Subsampled:         %s", str(options.subsampled))
+    log.info("  Chunk Size:         %s", str(options.chunk_size))
+    log.info("  Engine:             %s", options.engine)
+    log.info("  Map Encoding:       %s", options.map_encoding)
+    log.info("  Fingerprint:        %s", options.fingerprint)
+    log.info("  Force:              %s", str(options.force))
+    log.info("  Reuse Maps:         %s", str(options.reuse_maps))
+    log.info("  On Error:           %s", str(policy))
+    log.info("  Parallel Mode:      %s", "intra" if intra_scene else "scenes")
+    if memory_budget is not None:
+        log.info("  Memory Budget:      %.2f GB", memory_budget / 1e9)
+    if max_tasks_per_child is not None:
+        log.info("  Tasks per Worker:   %d", max_tasks_per_child)
+    if failed_only:
+        log.info("  Failed Only:        %d scenes", len(scenes))
+    if shard is not None:
+        log.info("  Shard:              %d/%d, %d scenes", shard[0], shard[1], len(scenes))
+    if trace is not None:
+        log.info("  Trace:              memory=%s%s", trace.memory,
+                 ", chrome" if trace_chrome else "")
+    log.info("  Image Writers:      %s", options.image_writers)
+    for feat, codec in options.image_codecs.items():
+        log.info("    Image Codec:      %s=%s%s, level %d", feat, codec.format,
+                 " (palette)" if codec.palette else "", codec.compress_level)
     log.info("  Render Panorama:    %s", str(options.render_pano))
     log.info("  Render Cube Map:    %s", str(options.render_cube))
     if options.render_pano:
         log.info("    Panorama Width:   %s", options.pano_width)
         log.info("    Panorama Height:  %s", options.pano_height)
+        for w, h in options.pano_resolutions:
+            log.info("    Panorama Level:   %sx%s", w, h)
+        if options.tiles is not None:
+            log.info("    Panorama Tiles:   %dpx, overlap %d, %s", options.tiles.size,
+                     options.tiles.overlap, options.tiles.codec.format)
     if options.render_cube:
         log.info("    Cube Map Size:    %s", options.cube_size)
+    log.info("  Render Perspective: %s", str(bool(options.cameras)))
+    for cam in options.cameras:
+        log.info("    View:             %s yaw %g, pitch %g, roll %g, fov %g, %dx%d",
+                 cam.name, cam.yaw, cam.pitch, cam.roll, cam.fov,
+                 cam.width, cam.height)
+    leases = None
+    if claim:
+        if run_id is None:
+            run_id = getattr(claim_cfg, "run_id", None)
+        if run_id is None:
+            run_id = default_run_id(config_path, force, failed_only, shard)
+        leases = LeaseStore(
+            output_root, node, run_id=str(run_id),
+            lease_seconds=float(getattr(claim_cfg, "lease_seconds", 600.0)))
+        log.info("  Claim Scenes:       node %s, run %s, leases of %gs",
+                 node, leases.run_id, leases.lease_seconds)
     log.info("------------------------------------------------")
 
     log.info(
-        "Rendering %d scenes using backend=%s with workers=%d.",
+        "Rendering %d scenes using backend=%s with workers=%d%s.",
         len(scenes),
         backend,
         workers,
+        " per scene" if intra_scene else "",
     )
 
-    progress = _ProgressLogger(total=len(scenes), log=log)
+    progress = _ProgressLogger(
+        total=len(scenes),
+        log=log,
+        workers=1 if backend == "serial" else workers,
+        subsampled=options.subsampled,
+    )
+    exporter = MetricsExporter.from_config(
+        getattr(cfg, "metrics", None), progress.metrics).start()
+    if exporter.enabled:
+        # bytes written and points rendered are only exported, and measuring
+        # them walks the outputs of every finished scene
+        progress.output_root = output_root
+    report = FailureReport(
+        output_root / _tagged(FAILURE_REPORT_FILE, tag), config=config_path)
+    attempts: Dict[Path, int] = {}
 
     done = 0
     failed = 0
-
-    if workers == 1 or backend == "serial":
-        for scene_dir in scenes:
+    elsewhere = 0
+
+    if leases is not None:
+        leases.start()
+
+    def _claim(scene_dir: Path) -> bool:
+        """True if this node renders the scene; always without --claim."""
+        nonlocal elsewhere
+        if leases is None or leases.try_claim(scene_dir):
+            return True
+        elsewhere += 1
+        progress.claimed_elsewhere()
+        return False
+
+    def _release(scene_dir: Path, *, failed: bool = False) -> None:
+        """Mark a finished scene, so no node of this run renders it again."""
+        if leases is not None:
+            leases.finish(scene_dir, failed=failed)
+
+    def _success(scene_dir: Path) -> None:
+        nonlocal done
+        done += 1
+        progress.finished(scene_dir, ok=True)
+        _release(scene_dir)
+        progress.maybe_log(done=done, failed=failed)
+
+    def _failure(scene_dir: Path, exc: Exception) -> bool:
+        """Handle a failed attempt; True if the scene should be rendered again."""
+        nonlocal failed
+        attempts[scene_dir] = attempts.get(scene_dir, 0) + 1
+
+        retry = policy.should_retry(attempts[scene_dir])
+        progress.finished(scene_dir, ok=None if retry else False)
+
+        if retry:
+            log.warning(
+                "Rendering failed for scene: %s (attempt %d of %d), retrying. %s: %s",
+                scene_dir,
+                attempts[scene_dir],
+                policy.retries + 1,
+                type(exc).__name__,
+                exc,
+            )
+            return True
+
+        failed += 1
+        log.error("Rendering failed for scene: %s", scene_dir, exc_info=exc)
+        report.add(scene_dir, exc, attempts[scene_dir])
+
+        if policy.mode == "abort":
+            # released by _end_run, so other nodes may try it again
+            report.write(total=progress.total, completed=done, aborted=True)
+            raise exc
+
+        _release(scene_dir, failed=True)
+        progress.maybe_log(done=done, failed=failed)
+        return False
+
+    def _retry_now(scene_dir: Path) -> None:
+        while True:
+            progress.started(scene_dir, slot=0)
             try:
                 _render_one_scene(scene_dir, options)
-            except Exception:
-                failed += 1
-                log.exception("Rendering failed for scene: %s", scene_dir)
-                raise
+            except Exception as exc:
+                if _failure(scene_dir, exc):
+                    continue
+                return
+            _success(scene_dir)
+            return
 
-            done += 1
-            progress.maybe_log(done=done, failed=failed)
+    def _end_run() -> None:
+        _close_writer()
+        if leases is not None:
+            # an aborted run hands its scenes back at once
+            leases.close()
+            if elsewhere:
+                log.info("%d scenes were claimed or finished by other nodes.", elsewhere)
+        if trace is not None:
+            _write_trace(log, trace, trace_chrome, tag)
+        exporter.close()
 
-        progress.finish(done=done, failed=failed)
-        return
+    if workers == 1 or backend == "serial":
+        writer = _get_writer(options)
+        pending = None
+
+        try:
+            for scene_dir in [*scenes, None]:
+                session = None
+                if scene_dir is not None and not _claim(scene_dir):
+                    scene_dir = None
+                if scene_dir is not None:
+                    session = writer.session()
+                    progress.started(scene_dir, slot=0)
+                    try:
+                        _render_one_scene(scene_dir, options, session=session)
+                    except Exception as exc:
+                        session = None
+                        if _failure(scene_dir, exc):
+                            _retry_now(scene_dir)
+
+                # images of the previous scene were encoded meanwhile
+                if pending is not None:
+                    (pending_dir, pending_session), pending = pending, None
+                    try:
+                        pending_session.wait()
+                    except Exception as exc:
+                        if _failure(pending_dir, exc):
+                            _retry_now(pending_dir)
+                    else:
+                        _success(pending_dir)
+
+                pending = None if session is None else (scene_dir, session)
+        except BaseException:
+            # on abort, still record the previous scene once its images are written
+            if pending is not None:
+                try:
+                    pending[1].wait()
+                except Exception:
+                    pass
+            raise
+        finally:
+            _end_run()
+
+        return _finish_run(log, progress, report, progress.total, done, failed)
 
     executor_cls = {
         "process": ProcessPoolExecutor,
         "thread": ThreadPoolExecutor,
     }[backend]
 
-    with executor_cls(max_workers=workers) as executor:
-        futures = {
-            executor.submit(_render_one_scene, scene_dir, options): scene_dir
-            for scene_dir in scenes
-        }
-
-        for future in as_completed(futures):
-            scene_dir = futures[future]
-
-            try:
-                future.result()
-            except Exception:
-                failed += 1
-                log.exception("Rendering failed for scene: %s", scene_dir)
-
-                for pending_future in futures:
-                    pending_future.cancel()
-
-                raise
-
-            done += 1
-            progress.maybe_log(done=done, failed=failed)
-
+    def _new_executor():
+        if backend == "process" and max_tasks_per_child:
+            # recycle workers to limit heap fragmentation of long runs
+            return executor_cls(
+                max_workers=workers, max_tasks_per_child=max_tasks_per_child)
+        return executor_cls(max_workers=workers)
+
+    def _replace_executor() -> None:
+        # a worker died (e.g. killed for running out of memory), which
+        # breaks the pool and fails every task in flight on it
+        nonlocal executor
+        log.warning("Worker pool is broken, starting a new one.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = _new_executor()
+
+    if intra_scene:
+        # workers attach to the shared scenes and register them with the
+        # resource tracker; a tracker of their own would unlink the blocks
+        # when a worker exits
+        resource_tracker.ensure_running()
+        executor = _new_executor()
+        try:
+            for scene_dir in scenes:
+                if not _claim(scene_dir):
+                    continue
+                while True:
+                    progress.started(scene_dir)
+                    try:
+                        with traced(options.trace, "scene",
+                                    scene=f"{scene_dir.parent.name}/{scene_dir.name}"):
+                            _render_scene_shared(
+                                scene_dir, options, executor, workers)
+                    except Exception as exc:
+                        # all workers render this scene, so a crash is its attempt
+                        if isinstance(exc, BrokenExecutor):
+                            _replace_executor()
+                        if _failure(scene_dir, exc):
+                            continue
+                    else:
+                        _success(scene_dir)
+                    break
+        finally:
+            executor.shutdown(wait=True)
+            _end_run()
+
+        return _finish_run(log, progress, report, progress.total, done, failed)
+
+    pixels = 0
+    if options.render_pano:
+        pixels += sum(w * h for w, h in [(options.pano_width, options.pano_height),
+                                         *options.pano_resolutions])
+    if options.render_cube:
+        pixels += 6 * options.cube_size ** 2
+    pixels += sum(cam.width * cam.height for cam in options.cameras)
+
+    jobs = []
+    for scene_dir in scenes:
+        try:
+            job = estimate_scene_job(
+                scene_dir,
+                features=options.selected_features,
+                subsampled=options.subsampled,
+                chunk_size=options.chunk_size,
+                pixels=pixels,
+            )
+        except (OSError, ValueError) as exc:
+            # unreadable inputs fail in the worker, subject to render.on_error
+            log.warning("Cannot estimate the size of scene %s: %s", scene_dir, exc)
+            job = SceneJob(scene_dir=scene_dir, num_points=0, est_bytes=0)
+        jobs.append(job)
+    scheduler = MemoryScheduler(
+        jobs, budget=memory_budget, max_running=workers)
+
+    largest = max(jobs, key=lambda job: job.est_bytes)
+    log.info(
+        "Scheduling scenes longest-first; largest scene %s/%s with %d points, "
+        "estimated %.2f GB.",
+        largest.scene_dir.parent.name,
+        largest.scene_dir.name,
+        largest.num_points,
+        largest.est_bytes / 1e9,
+    )
+    if memory_budget is not None and largest.est_bytes > memory_budget:
+        log.warning(
+            "The largest scene exceeds render.parallel.memory_budget and "
+            "will be rendered alone.")
+
+    executor = _new_executor()
+    futures: Dict[Future, SceneJob] = {}
+    # scenes in flight when a worker died along with others; each of them
+    # runs alone until it finished once, so a further crash is pinned on it
+    suspects: set = set()
+
+    def _submit(job: SceneJob) -> bool:
+        try:
+            future = executor.submit(_render_one_scene, job.scene_dir, options)
+        except BrokenExecutor:
+            if futures:
+                # the scenes in flight report the break, see below
+                scheduler.release(job)
+                scheduler.push(job)
+                return False
+            _replace_executor()
+            future = executor.submit(_render_one_scene, job.scene_dir, options)
+        progress.started(job.scene_dir)
+        futures[future] = job
+        return True
+
+    def _fill() -> None:
+        if any(job.scene_dir in suspects for job in futures.values()):
+            return
+        job = scheduler.next_job()
+        while job is not None:
+            if job.scene_dir in suspects and futures:
+                # wait until the pool is drained
+                scheduler.release(job)
+                scheduler.push(job)
+                return
+            if not _claim(job.scene_dir):
+                scheduler.release(job)
+            elif not _submit(job) or job.scene_dir in suspects:
+                return
+            job = scheduler.next_job()
+
+    def _failed(job: SceneJob, exc: Exception) -> None:
+        try:
+            retry = _failure(job.scene_dir, exc)
+        except Exception:
+            for pending_future in futures:
+                pending_future.cancel()
+            raise
+        if retry:
+            scheduler.push(job)
+
+    try:
+        _fill()
+
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            if any(isinstance(f.exception(), BrokenExecutor) for f in finished):
+                # every scene in flight fails with the pool; collect them all
+                wait(futures)
+                finished = set(futures)
+                _replace_executor()
+
+            crashed = []
+            for future in finished:
+                job = futures.pop(future)
+                scheduler.release(job)
+
+                exc = future.exception()
+                if exc is None:
+                    suspects.discard(job.scene_dir)
+                    _success(job.scene_dir)
+                elif isinstance(exc, BrokenExecutor):
+                    crashed.append((job, exc))
+                else:
+                    _failed(job, exc)
+
+            if len(crashed) == 1:
+                # the only scene in flight took its worker down
+                _failed(*crashed[0])
+            elif crashed:
+                # the worker that died cannot be told apart; no scene loses
+                # an attempt, and each is rendered alone next
+                log.warning(
+                    "A worker died while %d scenes were in flight; rendering "
+                    "them again one at a time.", len(crashed))
+                for job, _ in crashed:
+                    suspects.add(job.scene_dir)
+                    progress.finished(job.scene_dir, ok=None)
+                    scheduler.push(job)
+
+            _fill()
+    finally:
+        executor.shutdown(wait=True)
+        # thread workers share this process' image writer
+        _end_run()
+
+    return _finish_run(log, progress, report, progress.total, done, failed)
+
+
+def _finish_run(
+        log: logging.Logger,
+        progress: _ProgressLogger,
+        report: FailureReport,
+        total: int,
+        done: int,
+        failed: int) -> int:
+    report.write(total=total, completed=done)
     progress.finish(done=done, failed=failed)
+
+    if failed:
+        log.warning(
+            "%d scenes failed, see %s. Re-run with --failed-only to render "
+            "only these scenes.", failed, report.path)
+    return failed
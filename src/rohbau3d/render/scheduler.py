@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import bisect
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+from rohbau3d.data.scene import open_feature
+
+# Rough peak working set per point on top of the loaded features: projection
+# temporaries (range, pixel coordinates, packed z-buffer keys, point ids) and
+# the cached per-point colors.
+_BYTES_PER_POINT = 64
+# per rendered pixel: z-buffer keys, best-point ids, image and mask buffers
+_BYTES_PER_PIXEL = 32
+
+_UNITS = {
+    "": 1, "b": 1,
+    "kb": 10**3, "mb": 10**6, "gb": 10**9, "tb": 10**12,
+    "kib": 2**10, "mib": 2**20, "gib": 2**30, "tib": 2**40,
+}
+
+
+def parse_bytes(value: int | float | str | None) -> int | None:
+    """Byte count from an int or a string like "48GB" or "512MiB"."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    m = re.fullmatch(r"\s*([0-9.]+)\s*([a-zA-Z]*)\s*", str(value))
+    if m is None or m.group(2).lower() not in _UNITS:
+        raise ValueError(f"Invalid byte size: {value!r}")
+    return int(float(m.group(1)) * _UNITS[m.group(2).lower()])
+
+
+@dataclass(frozen=True)
+class SceneJob:
+    scene_dir: Path
+    num_points: int
+    est_bytes: int
+
+
+def _feature_bytes(feature, num_points: int) -> int:
+    if feature is None:
+        return 0
+    per_point = int(np.prod(feature.shape[1:], dtype=np.int64))
+    return num_points * per_point * np.dtype(feature.dtype).itemsize
+
+
+def estimate_scene_job(
+        scene_dir: Path,
+        *,
+        features: Sequence[str],
+        subsampled: bool = False,
+        chunk_size: int | None = None,
+        pixels: int = 0) -> SceneJob:
+    """
+    Point count and estimated peak memory of rendering one scene, read from
+    the .npy headers only. With chunk_size, features stay memory-mapped and
+    only one block of points is resident at a time.
+    """
+    coord = open_feature(scene_dir, "coord", subsampled=subsampled)
+    if coord is None:
+        raise FileNotFoundError(f"Missing coord.npy in {scene_dir}")
+    n = int(coord.shape[0])
+
+    if chunk_size is None:
+        loaded = _feature_bytes(coord, n) + sum(
+            _feature_bytes(open_feature(scene_dir, f, subsampled=subsampled), n)
+            for f in features if f != "depth")
+        per_point = n * _BYTES_PER_POINT
+    else:
+        block = min(n, chunk_size)
+        loaded = _feature_bytes(coord, block)
+        per_point = block * _BYTES_PER_POINT
+
+    return SceneJob(
+        scene_dir=scene_dir,
+        num_points=n,
+        est_bytes=loaded + per_point + pixels * _BYTES_PER_PIXEL,
+    )
+
+
+class MemoryScheduler:
+    """
+    Longest-job-first admission of scene jobs against a memory budget.
+
+    ``next_job`` hands out the most expensive pending job that fits into the
+    remaining budget, so large scenes start early and small ones fill the
+    gaps instead of forming a tail at the end. A job larger than the whole
+    budget is started as soon as the running jobs have drained and then runs
+    alone. Without a budget only ``max_running`` applies.
+    """
+
+    def __init__(
+        self,
+        jobs: Iterable[SceneJob],
+        *,
+        budget: int | None = None,
+        max_running: int = 1,
+    ) -> None:
+        if max_running < 1:
+            raise ValueError("max_running must be >= 1.")
+
+        self.budget = budget
+        self.max_running = max_running
+        self.in_use = 0
+        self.running = 0
+
+        # ascending by cost, so the most expensive job is at the end
+        self._pending: List[SceneJob] = []
+        self._keys: List[int] = []
+        for job in jobs:
+            self.push(job)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def push(self, job: SceneJob) -> None:
+        i = bisect.bisect_left(self._keys, job.est_bytes)
+        self._keys.insert(i, job.est_bytes)
+        self._pending.insert(i, job)
+
+    def next_job(self) -> SceneJob | None:
+        if not self._pending or self.running >= self.max_running:
+            return None
+
+        i = len(self._pending) - 1
+        if self.budget is not None:
+            if self._keys[i] > self.budget:
+                # oversized jobs run alone: drain, then start it next
+                if self.running:
+                    return None
+            else:
+                i = bisect.bisect_right(
+                    self._keys, self.budget - self.in_use) - 1
+                if i < 0:
+                    return None
+
+        job = self._pending.pop(i)
+        self._keys.pop(i)
+        self.in_use += job.est_bytes
+        self.running += 1
+        return job
+
+    def release(self, job: SceneJob) -> None:
+        self.in_use -= job.est_bytes
+        self.running -= 1
@@ -0,0 +1,650 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Mapping, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from rohbau3d.data.cache import SceneCache
+from rohbau3d.data.scene import SCENE_FEATURES, resolve_data_root
+from rohbau3d.render.manifest import input_fingerprint
+from rohbau3d.render.projection_renderer import (
+    _CUBE_FACES,
+    PinholeCamera,
+    RenderContext,
+    SceneData,
+    _feature_image,
+    _new_zbuffer,
+    _project_cube_into,
+    _project_equirectangular_into,
+    _project_views_into,
+    _resolve_engine,
+    _ViewBatch,
+    _zbuffer_points,
+)
+from rohbau3d.render.scheduler import parse_bytes
+from rohbau3d.render.writer import ImageCodec, codec_for, codecs_from_config
+
+PROJECTIONS = ("panorama", "cube", "perspective")
+FEATURES = ("color", "depth", "intensity", "normal", "class", "instance")
+
+_CONTENT_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "npy": "application/octet-stream",
+}
+_SCENE_FIELDS = {
+    "color": "color",
+    "intensity": "intensity",
+    "normal": "normal",
+    "class": "class_id",
+    "instance": "instance_id",
+}
+_NAME_RE = re.compile(r"[A-Za-z0-9_.-]+")
+
+
+class ByteLRU:
+    """
+    Thread-safe LRU of numpy arrays or bytes, bounded by their total size.
+    Values larger than the whole budget are not cached.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        if max_bytes < 0:
+            raise ValueError("Cache budgets must be >= 0.")
+        self.max_bytes = int(max_bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[Hashable, np.ndarray | bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(value: np.ndarray | bytes) -> int:
+        return value.nbytes if isinstance(value, np.ndarray) else len(value)
+
+    def get(self, key: Hashable) -> np.ndarray | bytes | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> np.ndarray | bytes | None:
+        """Like ``get``, without counting the lookup or refreshing the entry."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: Hashable, value: np.ndarray | bytes) -> None:
+        size = self._size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= self._size(old)
+            self._entries[key] = value
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self.bytes -= self._size(old)
+                self.evictions += 1
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self.bytes -= self._size(self._entries.pop(key))
+
+    def to_dict(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class _SingleFlight:
+    """Concurrent calls with the same key wait for one computation."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+
+        if not leader:
+            return call.result()
+
+        try:
+            call.set_result(fn())
+        except BaseException as exc:
+            call.set_exception(exc)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+
+def _query_value(query: Mapping[str, list], name: str, default=None):
+    values = query.get(name)
+    return default if not values else values[-1]
+
+
+def _number(query: Mapping[str, list], name: str, cast, default=None):
+    value = _query_value(query, name, default)
+    if value is None:
+        raise ValueError(f"Missing parameter '{name}'.")
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {value!r}.") from None
+
+
+@dataclass(frozen=True)
+class RenderRequest:
+    """
+    One image of a scene: a feature of the panorama (width x height), of a
+    cube map face (width = height = size) or of a perspective view.
+    """
+    site: str
+    scene: str
+    projection: str
+    feature: str
+    width: int
+    height: int
+    face: str = ""
+    yaw: float = 0.0
+    pitch: float = 0.0
+    roll: float = 0.0
+    fov: float = 90.0
+    format: str | None = None
+
+    def __post_init__(self) -> None:
+        for label, name in (("site", self.site), ("scene", self.scene)):
+            if not _NAME_RE.fullmatch(name) or name.startswith("."):
+                raise ValueError(f"Invalid {label} name: {name!r}.")
+        if self.projection not in PROJECTIONS:
+            raise ValueError(
+                f"projection must be one of: {', '.join(map(repr, PROJECTIONS))}.")
+        if self.feature not in FEATURES:
+            raise ValueError(
+                f"feature must be one of: {', '.join(map(repr, FEATURES))}.")
+        if self.width < 1 or self.height < 1:
+            raise ValueError("width, height and size must be >= 1.")
+        if self.projection == "cube" and self.face not in _CUBE_FACES:
+            raise ValueError(
+                f"face must be one of: {', '.join(map(repr, _CUBE_FACES))}.")
+        if self.projection == "perspective":
+            # validates the view
+            self.camera()
+        if self.format is not None and self.format not in _CONTENT_TYPES:
+            raise ValueError(
+                f"format must be one of: {', '.join(map(repr, _CONTENT_TYPES))}.")
+
+    @classmethod
+    def from_query(cls, query: Mapping[str, list]) -> RenderRequest:
+        """From parsed query parameters (``urllib.parse.parse_qs``)."""
+        projection = str(_query_value(query, "projection", "panorama")).lower()
+        if projection == "cube":
+            width = height = _number(query, "size", int)
+        else:
+            width = _number(query, "width", int)
+            height = _number(query, "height", int)
+
+        fmt = _query_value(query, "format")
+        return cls(
+            site=str(_query_value(query, "site", "")),
+            scene=str(_query_value(query, "scene", "")),
+            projection=projection,
+            feature=str(_query_value(query, "feature", "")).lower(),
+            width=width,
+            height=height,
+            face=str(_query_value(query, "face", "")).lower() if projection == "cube" else "",
+            yaw=_number(query, "yaw", float, 0.0),
+            pitch=_number(query, "pitch", float, 0.0),
+            roll=_number(query, "roll", float, 0.0),
+            fov=_number(query, "fov", float, 90.0),
+            format=None if fmt is None else str(fmt).lower(),
+        )
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height * (6 if self.projection == "cube" else 1)
+
+    def camera(self) -> PinholeCamera:
+        return PinholeCamera(
+            name="view", yaw=self.yaw, pitch=self.pitch, fov=self.fov,
+            width=self.width, height=self.height, roll=self.roll)
+
+    def projection_key(self) -> tuple:
+        """The geometry of the z-buffer; equal for all features and cube faces."""
+        if self.projection == "panorama":
+            return ("panorama", self.width, self.height)
+        if self.projection == "cube":
+            return ("cube", self.width)
+        return ("perspective", self.yaw, self.pitch, self.roll, self.fov,
+                self.width, self.height)
+
+
+class RenderService:
+    """
+    Renders single images on demand and keeps what repeated requests need:
+
+    - scene arrays in a SceneCache (only coord and the requested features),
+    - the z-buffers of recent projections, so that the other features and
+      the other cube faces of a projection skip the projection,
+    - the encoded images.
+
+    All caches are LRUs bounded in bytes. Entries are keyed by the input
+    file fingerprints, so a scene whose files change is loaded again.
+    Identical concurrent requests are rendered once; at most ``workers``
+    images are rendered at the same time. Images are identical to the
+    ones written by the batch renderer with the same codec.
+    """
+
+    def __init__(
+            self,
+            data_root: str | Path,
+            *,
+            engine: str = "numpy",
+            subsampled: bool = False,
+            codecs: Dict[str, ImageCodec] | None = None,
+            workers: int = 4,
+            scene_cache_bytes: int = 8 * 1024 ** 3,
+            projection_cache_bytes: int = 1024 ** 3,
+            image_cache_bytes: int = 512 * 1024 ** 2,
+            chunk_size: int = 4_000_000,
+            max_pixels: int = 64 * 1024 ** 2) -> None:
+        if workers < 1:
+            raise ValueError("service.workers must be >= 1.")
+        if chunk_size < 1:
+            raise ValueError("service.chunk_size must be >= 1.")
+
+        self.data_root = resolve_data_root(data_root)
+        self.engine = _resolve_engine(engine)
+        self.subsampled = subsampled
+        self.codecs = codecs or {"default": ImageCodec()}
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_pixels = max_pixels
+
+        self.scenes = SceneCache(scene_cache_bytes)
+        self.projections = ByteLRU(projection_cache_bytes)
+        self.images = ByteLRU(image_cache_bytes)
+
+        self.requests = 0
+        self.rendered = 0
+        self.errors = 0
+        self.render_seconds = 0.0
+        self.start_time = time.time()
+
+        self._slots = threading.BoundedSemaphore(workers)
+        self._flight = _SingleFlight()
+        # scene dir -> input fingerprints last seen, value ranges of features
+        self._versions: Dict[str, str] = {}
+        self._stats: Dict[Tuple[str, str], Dict[str, Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg) -> RenderService:
+        """From a renderer config with a ``service`` section."""
+        service_cfg = getattr(cfg, "service", None)
+
+        def _get(key, default):
+            value = getattr(service_cfg, key, None) if service_cfg is not None else None
+            return default if value is None else value
+
+        return cls(
+            cfg.data.root,
+            engine=str(getattr(cfg.render, "engine", "numpy")),
+            subsampled=bool(getattr(cfg.render, "subsampled", False)),
+            codecs=codecs_from_config(getattr(cfg.output, "images", None)),
+            workers=int(_get("workers", 4)),
+            scene_cache_bytes=parse_bytes(_get("scene_cache", "8GB")),
+            projection_cache_bytes=parse_bytes(_get("projection_cache", "1GB")),
+            image_cache_bytes=parse_bytes(_get("image_cache", "512MB")),
+            chunk_size=int(_get("chunk_size", 4_000_000)),
+            max_pixels=int(_get("max_pixels", 64 * 1024 ** 2)),
+        )
+
+    # -----------------------------
+    # Requests
+    # -----------------------------
+
+    def scene_dir(self, site: str, scene: str) -> Path:
+        scene_dir = self.data_root / site / scene
+        if not (scene_dir / "coord.npy").exists() and not (
+                scene_dir / "coord.compact.npy").exists():
+            raise FileNotFoundError(f"Unknown scene: {site}/{scene}")
+        return scene_dir
+
+    def codec(self, request: RenderRequest) -> ImageCodec:
+        codec = codec_for(self.codecs, request.feature)
+        if request.format is not None and request.format != codec.format:
+            codec = ImageCodec(format=request.format)
+        return codec
+
+    def _version(self, scene_dir: Path) -> str:
+        """Input fingerprints of the scene; drops cached arrays on change."""
+        version = json.dumps({
+            name: input_fingerprint(scene_dir, name, subsampled=self.subsampled)
+            for name in SCENE_FEATURES
+        }, sort_keys=True)
+
+        key = str(scene_dir)
+        with self._lock:
+            previous = self._versions.get(key)
+            self._versions[key] = version
+            if previous is not None and previous != version:
+                self._stats = {k: v for k, v in self._stats.items() if k[0] != key}
+        if previous is not None and previous != version:
+            log = logging.getLogger(__name__)
+            log.info("Inputs of scene %s changed, reloading it.", scene_dir)
+            self.scenes.discard(scene_dir)
+            self.projections.discard(lambda k: k[0] == key and k[1] == previous)
+            self.images.discard(lambda k: k[0] == key and k[1] == previous)
+        return version
+
+    def render(self, request: RenderRequest | Mapping[str, list]) -> Tuple[bytes, str, bool]:
+        """
+        (encoded image, content type, served from the image cache) of a
+        request or of the parsed query string of a /render URL.
+        """
+        with self._lock:
+            self.requests += 1
+
+        try:
+            if not isinstance(request, RenderRequest):
+                # invalid queries count as errors, too
+                request = RenderRequest.from_query(request)
+            if request.pixels > self.max_pixels:
+                raise ValueError(
+                    f"The request has {request.pixels} pixels, more than "
+                    f"service.max_pixels={self.max_pixels}.")
+
+            scene_dir = self.scene_dir(request.site, request.scene)
+            version = self._version(scene_dir)
+            codec = self.codec(request)
+            key = (str(scene_dir), version, request.projection_key(),
+                   request.face, request.feature, codec)
+
+            data = self.images.get(key)
+            hit = data is not None
+            if data is None:
+                data = self._flight.do(key, lambda: self._render_image(
+                    scene_dir, version, request, codec, key))
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        return data, _CONTENT_TYPES[codec.format], hit
+
+    def _scene_data(self, scene_dir: Path, feature: str) -> SceneData:
+        def _load(name: str) -> np.ndarray | None:
+            return self.scenes.get(scene_dir, name, subsampled=self.subsampled)
+
+        coord = _load("coord")
+        if coord is None:
+            raise FileNotFoundError(f"Missing coord.npy in {scene_dir}")
+
+        fields = dict.fromkeys(_SCENE_FIELDS.values())
+        if feature in _SCENE_FIELDS:
+            fields[_SCENE_FIELDS[feature]] = _load(feature)
+        return SceneData(
+            site_name=scene_dir.parent.name,
+            scene_name=scene_dir.name,
+            scene_dir=scene_dir,
+            coord=coord,
+            **fields,
+        )
+
+    def _render_image(
+            self,
+            scene_dir: Path,
+            version: str,
+            request: RenderRequest,
+            codec: ImageCodec,
+            key: tuple) -> bytes:
+        # a request that just finished may have cached it
+        data = self.images.peek(key)
+        if data is not None:
+            return data
+
+        with self._slots:
+            start = time.perf_counter()
+            scene = self._scene_data(scene_dir, request.feature)
+            with self._lock:
+                stats = self._stats.setdefault((str(scene_dir), version), {})
+            # streams coord block by block and colorizes only visible points
+            ctx = RenderContext(
+                scene, (request.feature,), chunk_size=self.chunk_size, stats=stats)
+            if not ctx.has_feature(request.feature):
+                raise LookupError(
+                    f"Scene {request.site}/{request.scene} has no feature "
+                    f"'{request.feature}'.")
+
+            zbuffer = self._zbuffer(ctx, str(scene_dir), version, request)
+            if request.projection == "cube":
+                face_pixels = request.width * request.height
+                face = _CUBE_FACES.index(request.face)
+                zbuffer = zbuffer[face * face_pixels:(face + 1) * face_pixels]
+
+            img = _feature_image(
+                ctx, zbuffer, _zbuffer_points(zbuffer),
+                request.height, request.width, request.feature)
+            data = codec.encode(img)
+
+            with self._lock:
+                self.rendered += 1
+                self.render_seconds += time.perf_counter() - start
+
+        self.images.put(key, data)
+        return data
+
+    def _zbuffer(
+            self,
+            ctx: RenderContext,
+            scene_key: str,
+            version: str,
+            request: RenderRequest) -> np.ndarray:
+        key = (scene_key, version, request.projection_key())
+        zbuffer = self.projections.get(key)
+        if zbuffer is not None:
+            return zbuffer
+
+        def _project() -> np.ndarray:
+            zbuffer = self.projections.peek(key)
+            if zbuffer is None:
+                zbuffer = _project_request(ctx, request, self.engine)
+                self.projections.put(key, zbuffer)
+            return zbuffer
+
+        return self._flight.do(("projection",) + key, _project)
+
+    # -----------------------------
+    # Warm-up and statistics
+    # -----------------------------
+
+    def warm_up(self) -> None:
+        """Compile the projection kernels before the first request."""
+        if self.engine != "numba":
+            return
+
+        coord = np.random.default_rng(0).normal(size=(64, 3)).astype(np.float32)
+        r = np.linalg.norm(coord, axis=1)
+        _project_equirectangular_into(_new_zbuffer(8 * 4), coord, r, 8, 4, 0, self.engine)
+        _project_cube_into(_new_zbuffer(6 * 4 * 4), coord, r, 4, 0, self.engine)
+        views = _ViewBatch([PinholeCamera("view", 0.0, 0.0, 90.0, 4, 4)])
+        _project_views_into(
+            _new_zbuffer(views.num_pixels), views, coord / r[:, None], r, 0, self.engine)
+
+    def preload(self, scenes, features=()) -> None:
+        """Load coord and ``features`` of scenes ("site/scene") into the scene cache."""
+        log = logging.getLogger(__name__)
+        for name in scenes:
+            site, _, scene = str(name).partition("/")
+            scene_dir = self.scene_dir(site, scene)
+            self._version(scene_dir)
+            for feature in ("coord", *features):
+                self.scenes.get(scene_dir, feature, subsampled=self.subsampled)
+            log.info("Preloaded scene %s", name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {
+                "uptime_seconds": time.time() - self.start_time,
+                "requests": self.requests,
+                "rendered": self.rendered,
+                "errors": self.errors,
+                "render_seconds": self.render_seconds,
+                "workers": self.workers,
+                "engine": self.engine,
+            }
+        return {
+            **counters,
+            "scene_cache": {
+                **self.scenes.stats.to_dict(),
+                "max_bytes": self.scenes.max_bytes,
+            },
+            "projection_cache": self.projections.to_dict(),
+            "image_cache": self.images.to_dict(),
+        }
+
+
+def _project_request(
+        ctx: RenderContext,
+        request: RenderRequest,
+        engine: str) -> np.ndarray:
+    """Z-buffer of the request's projection; all six faces of a cube map."""
+    if request.projection == "panorama":
+        zbuffer = _new_zbuffer(request.width * request.height)
+        for start, _, coord, r in ctx.blocks():
+            _project_equirectangular_into(
+                zbuffer, coord, r, request.width, request.height, start, engine=engine)
+        return zbuffer
+
+    if request.projection == "cube":
+        zbuffer = _new_zbuffer(6 * request.width * request.width)
+        for start, _, coord, r in ctx.blocks():
+            _project_cube_into(zbuffer, coord, r, request.width, start, engine=engine)
+        return zbuffer
+
+    views = _ViewBatch([request.camera()])
+    zbuffer = _new_zbuffer(views.num_pixels)
+    for start, _, coord, r in ctx.blocks():
+        direction = coord / (r[:, None] + 1e-12)
+        _project_views_into(zbuffer, views, direction, r, start, engine=engine)
+    return zbuffer
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+
+def _handler(service: RenderService) -> type:
+    log = logging.getLogger(__name__)
+
+    class _ServiceHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+
+            if url.path == "/render":
+                self._render(parse_qs(url.query))
+            elif url.path == "/stats":
+                body = json.dumps(service.stats(), indent=2).encode()
+                self._send(200, body, "application/json")
+            elif url.path == "/health":
+                self._send(200, b"ok\n", "text/plain; charset=utf-8")
+            else:
+                self._send(404, b"Not found\n", "text/plain; charset=utf-8")
+
+        def _render(self, query: Mapping[str, list]) -> None:
+            try:
+                data, content_type, hit = service.render(query)
+            except ValueError as exc:
+                self._send(400, f"{exc}\n".encode(), "text/plain; charset=utf-8")
+            except (FileNotFoundError, LookupError) as exc:
+                self._send(404, f"{exc}\n".encode(), "text/plain; charset=utf-8")
+            except Exception as exc:
+                log.error("Rendering failed for %s", self.path, exc_info=exc)
+                self._send(500, f"{type(exc).__name__}: {exc}\n".encode(),
+                           "text/plain; charset=utf-8")
+            else:
+                self._send(200, data, content_type,
+                           {"X-Render-Cache": "hit" if hit else "miss"})
+
+        def _send(self, status: int, body: bytes, content_type: str,
+                  headers: Mapping[str, str] | None = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self) -> str:
+            # Unix socket peers have no address
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, format, *args) -> None:
+            log.debug("%s %s", self.address_string(), format % args)
+
+    return _ServiceHandler
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(
+        service: RenderService,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        socket_path: str | Path | None = None) -> socketserver.BaseServer:
+    """HTTP server of the service on host:port, or on a Unix socket."""
+    handler = _handler(service)
+    if socket_path is None:
+        return ThreadingHTTPServer((host, int(port)), handler)
+
+    socket_path = Path(socket_path).expanduser()
+    if socket_path.exists():
+        # left behind by a service that did not shut down cleanly
+        socket_path.unlink()
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    server = _UnixHTTPServer(str(socket_path), handler)
+    os.chmod(socket_path, 0o660)
+    return server
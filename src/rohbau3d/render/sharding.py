@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from rohbau3d.data.scene import open_feature
+
+LEASE_DIR = ".render_leases"
+
+_LEASE_RE = re.compile(r"^(?P<scene>.+)\.(?P<gen>\d+)\.lease$")
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """(index, count) of a shard given as "i/N" with 0 <= i < N."""
+    m = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", str(text))
+    if m is None:
+        raise ValueError(f"Invalid shard {text!r}, expected i/N.")
+    index, count = int(m.group(1)), int(m.group(2))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {text!r}, expected 0 <= i < N.")
+    return index, count
+
+
+def _num_points(scene_dir: Path, subsampled: bool) -> int:
+    try:
+        coord = open_feature(scene_dir, "coord", subsampled=subsampled)
+    except (OSError, ValueError):
+        return 0
+    return 0 if coord is None else int(coord.shape[0])
+
+
+def shard_scenes(
+        scenes: Sequence[Path],
+        index: int,
+        count: int,
+        *,
+        subsampled: bool = False) -> List[Path]:
+    """
+    Scenes of shard ``index`` out of ``count``. Every node computes the same
+    partition: scenes are assigned largest first (by point count from the
+    .npy headers) to the shard with the fewest points so far, so shards take
+    about equally long. The result keeps the input order.
+    """
+    weights = [_num_points(p, subsampled) for p in scenes]
+    order = sorted(range(len(scenes)), key=lambda i: (-weights[i], i))
+
+    loads = [(0, shard) for shard in range(count)]
+    assigned = [0] * len(scenes)
+    for i in order:
+        load, shard = heapq.heappop(loads)
+        assigned[i] = shard
+        heapq.heappush(loads, (load + weights[i], shard))
+
+    return [p for p, shard in zip(scenes, assigned) if shard == index]
+
+
+def default_node_name() -> str:
+    return socket.gethostname()
+
+
+def default_run_id(config_path: str | Path, *options) -> str:
+    """Run id shared by the nodes started with the same configuration and options."""
+    digest = hashlib.sha1(Path(config_path).read_bytes())
+    digest.update(repr(options).encode())
+    return digest.hexdigest()[:16]
+
+
+def run_tag(name: str) -> str:
+    """File-name safe form of a node or shard name."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+class LeaseStore:
+    """
+    Dynamic work claiming between nodes that share the output tree.
+
+    A scene is claimed by atomically creating ``<site>/<scene>.<gen>.lease``
+    below ``.render_leases`` (hard link of a written temp file, which is
+    atomic on NFS as well) and released by removing it. The owner renews
+    its leases from a background thread; a lease that was not renewed for
+    ``lease_seconds`` belongs to a crashed node and is reclaimed by creating
+    the next generation, which exactly one node can win. Lease ages are
+    file mtimes compared to the local clock, so ``lease_seconds`` must be
+    well above the clock skew between the nodes.
+
+    A scene that is finished (rendered, or failed for good) is marked by
+    ``<site>/<scene>.done`` with the ``run_id``; no node of the same run
+    claims it again. Markers of other runs are ignored and overwritten.
+    """
+
+    def __init__(
+            self,
+            output_root: str | Path,
+            node: str,
+            *,
+            run_id: str = "",
+            lease_seconds: float = 600.0) -> None:
+        if lease_seconds <= 0:
+            raise ValueError("render.claim.lease_seconds must be > 0.")
+
+        self.root = Path(output_root) / LEASE_DIR
+        self.node = node
+        self.run_id = run_id
+        self.lease_seconds = float(lease_seconds)
+
+        self._held: Dict[Tuple[str, str], Path] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _site_dir(self, scene_dir: Path) -> Path:
+        return self.root / scene_dir.parent.name
+
+    def _done_path(self, scene_dir: Path) -> Path:
+        return self._site_dir(scene_dir) / f"{scene_dir.name}.done"
+
+    def is_done(self, scene_dir: Path) -> bool:
+        """True if a node of this run has finished the scene."""
+        try:
+            marker = json.loads(self._done_path(scene_dir).read_text())
+        except (OSError, ValueError):
+            return False
+        return isinstance(marker, dict) and marker.get("run") == self.run_id
+
+    def _generations(self, scene_dir: Path) -> List[Tuple[int, Path]]:
+        site_dir = self._site_dir(scene_dir)
+        try:
+            names = os.listdir(site_dir)
+        except FileNotFoundError:
+            return []
+
+        gens = []
+        for name in names:
+            m = _LEASE_RE.match(name)
+            if m is not None and m.group("scene") == scene_dir.name:
+                gens.append((int(m.group("gen")), site_dir / name))
+        return sorted(gens)
+
+    def _create(self, path: Path) -> bool:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{run_tag(self.node)}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({
+            "node": self.node,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "claimed": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }))
+        try:
+            os.link(tmp, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def try_claim(self, scene_dir: Path) -> bool:
+        """True if this node now holds the scene's lease."""
+        log = logging.getLogger(__name__)
+        with self._lock:
+            if (scene_dir.parent.name, scene_dir.name) in self._held:
+                # e.g. a retry of a failed attempt
+                return True
+
+        if self.is_done(scene_dir):
+            return False
+
+        gens = self._generations(scene_dir)
+
+        gen = 0
+        if gens:
+            latest, path = gens[-1]
+            try:
+                age = time.time() - path.stat().st_mtime
+            except FileNotFoundError:
+                # released meanwhile; the next attempt sees the new state
+                return False
+            if age < self.lease_seconds:
+                return False
+            gen = latest + 1
+
+        path = self._site_dir(scene_dir) / f"{scene_dir.name}.{gen}.lease"
+        if not self._create(path):
+            return False
+        if self.is_done(scene_dir):
+            # finished and released between the checks above
+            path.unlink(missing_ok=True)
+            return False
+
+        if gens:
+            log.warning(
+                "Reclaimed the expired lease of scene %s/%s (%.0fs old).",
+                scene_dir.parent.name, scene_dir.name, age)
+            for _, old in gens:
+                old.unlink(missing_ok=True)
+
+        with self._lock:
+            self._held[(scene_dir.parent.name, scene_dir.name)] = path
+        return True
+
+    def finish(self, scene_dir: Path, *, failed: bool = False) -> None:
+        """Mark the scene as done in this run and release its lease."""
+        path = self._done_path(scene_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{run_tag(self.node)}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({
+            "run": self.run_id,
+            "node": self.node,
+            "status": "failed" if failed else "rendered",
+            "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }))
+        # written before the lease is removed, so a node that finds the
+        # lease gone also finds the marker
+        os.replace(tmp, path)
+        self.release(scene_dir)
+
+    def release(self, scene_dir: Path) -> None:
+        """Give the scene back without finishing it, e.g. on abort."""
+        with self._lock:
+            path = self._held.pop((scene_dir.parent.name, scene_dir.name), None)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def renew(self) -> None:
+        log = logging.getLogger(__name__)
+        with self._lock:
+            held = list(self._held.items())
+
+        for (site, scene), path in held:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                log.warning(
+                    "Lease of scene %s/%s was reclaimed by another node; "
+                    "renew leases more often or raise render.claim.lease_seconds.",
+                    site, scene)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 4.0):
+            self.renew()
+
+    def start(self) -> LeaseStore:
+        self._thread = threading.Thread(
+            target=self._run, name="lease-renewal", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop renewing and release all leases still held."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            held = list(self._held.values())
+            self._held.clear()
+        for path in held:
+            path.unlink(missing_ok=True)
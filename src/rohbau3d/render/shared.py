@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Mapping, Tuple
+
+import numpy as np
+
+_ALIGN = 64
+
+
+@dataclass(frozen=True)
+class _ArrayLayout:
+    name: str
+    dtype: str
+    shape: Tuple[int, ...]
+    offset: int
+
+
+@dataclass(frozen=True)
+class SharedLayout:
+    """Picklable description of a SharedArrays block, passed to workers."""
+    shm_name: str
+    arrays: Tuple[_ArrayLayout, ...]
+
+
+class SharedArrays:
+    """
+    Named arrays in one shared memory block. The creating process owns the
+    block and unlinks it on close; workers ``attach`` by layout and see the
+    same memory without pickling the arrays.
+    """
+
+    def __init__(self, shm: SharedMemory, layout: SharedLayout, owner: bool) -> None:
+        self._shm = shm
+        self.layout = layout
+        self.owner = owner
+        self.arrays: Dict[str, np.ndarray] = {
+            a.name: np.ndarray(
+                a.shape, dtype=np.dtype(a.dtype), buffer=shm.buf, offset=a.offset)
+            for a in layout.arrays
+        }
+
+    @classmethod
+    def create(
+            cls,
+            specs: Mapping[str, Tuple[Tuple[int, ...], np.dtype | str]]) -> SharedArrays:
+        """Allocate uninitialized arrays of the given (shape, dtype)."""
+        arrays = []
+        offset = 0
+        for name, (shape, dtype) in specs.items():
+            dtype = np.dtype(dtype)
+            shape = tuple(int(s) for s in shape)
+            arrays.append(_ArrayLayout(name, dtype.str, shape, offset))
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            offset += -(-nbytes // _ALIGN) * _ALIGN
+
+        shm = SharedMemory(create=True, size=max(offset, 1))
+        return cls(shm, SharedLayout(shm.name, tuple(arrays)), owner=True)
+
+    @classmethod
+    def attach(cls, layout: SharedLayout) -> SharedArrays:
+        return cls(SharedMemory(name=layout.shm_name), layout, owner=False)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.arrays
+
+    def get(self, name: str) -> np.ndarray | None:
+        return self.arrays.get(name)
+
+    def close(self) -> None:
+        # views into the buffer must be gone before the mapping is closed
+        self.arrays = {}
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> SharedArrays:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
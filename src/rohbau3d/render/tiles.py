@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from rohbau3d.render.writer import ImageCodec
+
+TILE_SIZES = (256, 512)
+
+_TILE_FORMATS = ("png", "webp")
+
+
+@dataclass(frozen=True)
+class TileSettings:
+    """
+    Deep Zoom (DZI) tile pyramid of the full-resolution panorama.
+
+    size: tile edge in pixels, 256 or 512
+    overlap: pixels a tile repeats of each neighbour
+    codec: png or webp encoding of the tiles
+    """
+    size: int = 256
+    overlap: int = 0
+    codec: ImageCodec = ImageCodec()
+
+    def __post_init__(self) -> None:
+        if self.size not in TILE_SIZES:
+            raise ValueError(
+                f"panorama.tiles.size must be one of: {', '.join(map(str, TILE_SIZES))}.")
+        if not 0 <= self.overlap < self.size // 2:
+            raise ValueError(
+                f"panorama.tiles.overlap must be in [0, {self.size // 2 - 1}].")
+        if self.codec.format not in _TILE_FORMATS:
+            raise ValueError(
+                f"panorama.tiles.format must be one of: {', '.join(map(repr, _TILE_FORMATS))}.")
+
+    def tiles(self, image: np.ndarray) -> Iterable[Tuple[int, int, np.ndarray]]:
+        """(column, row, tile) of one level image, row by row."""
+        height, width = image.shape[:2]
+        for row in range(math.ceil(height / self.size)):
+            y0 = max(row * self.size - self.overlap, 0)
+            y1 = min((row + 1) * self.size + self.overlap, height)
+            for col in range(math.ceil(width / self.size)):
+                x0 = max(col * self.size - self.overlap, 0)
+                x1 = min((col + 1) * self.size + self.overlap, width)
+                yield col, row, np.ascontiguousarray(image[y0:y1, x0:x1])
+
+    def descriptor(self, width: int, height: int) -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008"'
+            f' Format="{self.codec.format}" Overlap="{self.overlap}"'
+            f' TileSize="{self.size}">\n'
+            f'  <Size Width="{width}" Height="{height}"/>\n'
+            '</Image>\n'
+        )
+
+
+def pyramid_levels(width: int, height: int) -> List[Tuple[int, int]]:
+    """(width, height) of the Deep Zoom levels, from 1 x 1 up to the image."""
+    levels = [(width, height)]
+    while levels[-1] != (1, 1):
+        w, h = levels[-1]
+        levels.append(((w + 1) // 2, (h + 1) // 2))
+    return levels[::-1]
+
+
+def tile_dirs(tiles_dir: Path, feature: str) -> Tuple[Path, Path]:
+    """The .dzi descriptor of a feature and the directory of its levels."""
+    return tiles_dir / f"{feature}.dzi", tiles_dir / f"{feature}_files"
+
+
+class TilePyramid:
+    """
+    Which pixel of the next finer level every pixel of a pyramid level
+    shows. Each level halves the one below (rounding up) and keeps, per
+    2 x 2 block, the pixel with the smallest z-buffer key, i.e. the nearest
+    point, exactly like the coarser panorama levels. Built once per
+    z-buffer; every feature image is then reduced with a gather, so all
+    levels share the colors (and depth shading) of the full image.
+    """
+
+    def __init__(self, choices: Sequence[np.ndarray],
+                 height: int, width: int) -> None:
+        # finest first: index 0..3 into the 2 x 2 block of the level below,
+        # shaped like the levels of choice_shapes()
+        self.choices = list(choices)
+        self.height = height
+        self.width = width
+
+    @classmethod
+    def from_zbuffer(cls, zbuffer: np.ndarray) -> TilePyramid:
+        keys = np.asarray(zbuffer)
+        height, width = keys.shape
+        choices = []
+        while keys.shape != (1, 1):
+            blocks = _blocks(keys, np.iinfo(keys.dtype).max)
+            choice = blocks.argmin(axis=2)
+            choices.append(choice.astype(np.uint8))
+            keys = np.take_along_axis(blocks, choice[..., None], axis=2)[..., 0]
+        return cls(choices, height, width)
+
+    @staticmethod
+    def choice_shapes(width: int, height: int) -> List[Tuple[int, int]]:
+        """(height, width) of the choice arrays, finest first."""
+        return [(h, w) for w, h in pyramid_levels(width, height)[-2::-1]]
+
+    @property
+    def max_level(self) -> int:
+        return len(self.choices)
+
+    def levels(self, image: np.ndarray) -> Iterable[Tuple[int, np.ndarray]]:
+        """
+        (level, image) from the full image (level ``max_level``) down to
+        1 x 1 (level 0); only one level image is derived at a time.
+        """
+        level = self.max_level
+        yield level, image
+        for choice in self.choices:
+            blocks = _blocks(image, 0)
+            index = choice.reshape(choice.shape + (1,) * (blocks.ndim - 2))
+            image = np.take_along_axis(blocks, index, axis=2)[:, :, 0]
+            level -= 1
+            yield level, image
+
+
+def _blocks(array: np.ndarray, fill) -> np.ndarray:
+    """(h/2, w/2, 4, ...) view of the 2 x 2 blocks, odd edges padded with fill."""
+    height, width = array.shape[:2]
+    pad_h, pad_w = height % 2, width % 2
+    if pad_h or pad_w:
+        pad = [(0, pad_h), (0, pad_w)] + [(0, 0)] * (array.ndim - 2)
+        array = np.pad(array, pad, constant_values=fill)
+    rest = array.shape[2:]
+    blocks = array.reshape(
+        (height + pad_h) // 2, 2, (width + pad_w) // 2, 2, *rest)
+    blocks = np.moveaxis(blocks, 2, 1)
+    return blocks.reshape(blocks.shape[0], blocks.shape[1], 4, *rest)
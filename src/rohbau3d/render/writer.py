@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import io
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping
+
+import numpy as np
+from PIL import Image
+
+from rohbau3d.misc.tracing import span
+
+_FORMATS = ("png", "webp", "npy")
+
+
+@dataclass(frozen=True)
+class ImageCodec:
+    """
+    Output encoding of one rendered image.
+
+    format: png | webp (always lossless) | npy (raw array)
+    compress_level: zlib level 0-9 for png, encoder effort 0-9 for webp
+    palette: png only, store images with <= 256 distinct colors in palette
+        mode; images with more colors fall back to RGB
+    """
+    format: str = "png"
+    compress_level: int = 6
+    palette: bool = False
+
+    def __post_init__(self) -> None:
+        if self.format not in _FORMATS:
+            raise ValueError(
+                f"Image format must be one of: {', '.join(map(repr, _FORMATS))}.")
+        if not 0 <= self.compress_level <= 9:
+            raise ValueError("compress_level must be in [0, 9].")
+
+    @property
+    def suffix(self) -> str:
+        return f".{self.format}"
+
+    def encode(self, image: np.ndarray) -> bytes:
+        buf = io.BytesIO()
+        if self.format == "npy":
+            np.save(buf, image)
+        elif self.format == "webp":
+            Image.fromarray(image).save(
+                buf,
+                format="WEBP",
+                lossless=True,
+                quality=100,
+                method=round(self.compress_level * 6 / 9),
+            )
+        else:
+            pil_image = _to_palette(image) if self.palette else None
+            if pil_image is None:
+                pil_image = Image.fromarray(image)
+            pil_image.save(
+                buf, format="PNG", compress_level=self.compress_level)
+        return buf.getvalue()
+
+    def save(self, stem: Path, image: np.ndarray) -> Path:
+        path = stem.with_name(stem.name + self.suffix)
+
+        with span("encode"):
+            data = self.encode(image)
+        with span("write"):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+
+        return path
+
+
+def _to_palette(image: np.ndarray) -> Image.Image | None:
+    if image.ndim != 3 or image.shape[2] != 3:
+        return None
+
+    rgb = image.reshape(-1, 3).astype(np.uint32)
+    keys = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    colors, index = np.unique(keys, return_inverse=True)
+    if colors.shape[0] > 256:
+        return None
+
+    palette = np.stack(
+        [colors >> 16, (colors >> 8) & 0xFF, colors & 0xFF], axis=1)
+    pil_image = Image.fromarray(
+        index.astype(np.uint8).reshape(image.shape[:2]), mode="P")
+    pil_image.putpalette(palette.astype(np.uint8).tobytes())
+    return pil_image
+
+
+def codec_for(codecs: Mapping[str, ImageCodec] | None, feature: str) -> ImageCodec:
+    codecs = codecs or {}
+    return codecs.get(feature, codecs.get("default", ImageCodec()))
+
+
+def codecs_from_config(images_cfg) -> Dict[str, ImageCodec]:
+    """
+    Per-feature codecs from an ``output.images`` config section. The
+    "default" entry applies to every feature without an override.
+    """
+    if images_cfg is None:
+        return {"default": ImageCodec()}
+
+    def _codec(cfg, base: ImageCodec) -> ImageCodec:
+        return ImageCodec(
+            format=str(getattr(cfg, "format", base.format)).lower(),
+            compress_level=int(
+                getattr(cfg, "compress_level", base.compress_level)),
+            palette=bool(getattr(cfg, "palette", base.palette)),
+        )
+
+    default = _codec(images_cfg, ImageCodec())
+    codecs = {"default": default}
+    for feature, feature_cfg in (getattr(images_cfg, "features", None) or {}).items():
+        codecs[str(feature)] = _codec(feature_cfg, default)
+    return codecs
+
+
+class WriteSession:
+    """
+    Images written for one scene; ``wait`` raises the first failed write and
+    otherwise runs the ``on_complete`` callbacks.
+    """
+
+    def __init__(self, writer: ImageWriter) -> None:
+        self._writer = writer
+        self._futures: List[Future] = []
+        self._callbacks: List[Callable[[], None]] = []
+
+    def write(self, stem: Path, feature: str, image: np.ndarray,
+              codec: ImageCodec | None = None) -> None:
+        future = self._writer.submit(stem, feature, image, codec)
+        if future is not None:
+            self._futures.append(future)
+
+    def on_complete(self, callback: Callable[[], None]) -> None:
+        self._callbacks.append(callback)
+
+    def wait(self) -> None:
+        futures, self._futures = self._futures, []
+        error = None
+        for future in futures:
+            exc = future.exception()
+            if exc is not None and error is None:
+                error = exc
+        if error is not None:
+            raise error
+
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class ImageWriter:
+    """
+    Encodes and writes rendered images on background threads, so that PNG
+    or WebP encoding overlaps with the projection of the next view or scene.
+    PIL releases the GIL while encoding. At most ``max_pending`` images are
+    queued; further submits block until a slot is free, which bounds memory.
+    With ``workers=0`` images are written synchronously.
+    """
+
+    def __init__(
+        self,
+        codecs: Mapping[str, ImageCodec] | None = None,
+        *,
+        workers: int = 2,
+        max_pending: int = 32,
+    ) -> None:
+        if workers < 0 or max_pending < 1:
+            raise ValueError("workers must be >= 0 and max_pending >= 1.")
+
+        self.codecs = dict(codecs or {"default": ImageCodec()})
+        self.codecs.setdefault("default", ImageCodec())
+        self.workers = int(workers)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="image-writer",
+        ) if workers > 0 else None
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def codec(self, feature: str) -> ImageCodec:
+        return codec_for(self.codecs, feature)
+
+    def session(self) -> WriteSession:
+        return WriteSession(self)
+
+    def submit(self, stem: Path, feature: str, image: np.ndarray,
+               codec: ImageCodec | None = None) -> Future | None:
+        """Encode with ``codec`` instead of the feature's codec if given."""
+        codec = codec or self.codec(feature)
+        if self._executor is None:
+            codec.save(stem, image)
+            return None
+
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(codec.save, stem, image)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> ImageWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+